@@ -134,9 +134,11 @@ setup(
         "requests",
         "openpyxl",
         "xlrd",
-        "tenacity",
-        "retry",
+        "aiohttp",
     ],
+    extras_require={
+        "zstd": ["zstandard"],
+    },
     license="Apache 2.0 license",
     zip_safe=False,
     classifiers=[
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from warn import aio, journal, utils
+from warn.cache import Cache
+
+aiohttp = pytest.importorskip("aiohttp")
+web = pytest.importorskip("aiohttp.web")
+
+
+async def _serve(handler):
+    """Start a local server that answers every request with the provided handler."""
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_async_client_retries():
+    """The asyncio client should retry passing failures and hand back a requests-style response."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.headers.get("User-Agent"))
+        if len(calls) == 1:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(text="hello")
+
+    async def main():
+        runner, url = await _serve(handler)
+        client = aio.AsyncHTTPClient(
+            limiter=utils.RateLimiter(0), retry_policy=utils.RetryPolicy(base_delay=0)
+        )
+        try:
+            return await client.get(f"{url}/page"), client
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    response, client = asyncio.run(main())
+    assert response.status_code == 200
+    assert response.text == "hello"
+    assert client.request_count == 2
+    assert calls == [utils.USER_AGENT, utils.USER_AGENT]
+
+
+def test_async_client_deadline():
+    """Requests that can't be made before the deadline should raise a DeadlineExceeded."""
+
+    async def main():
+        client = aio.AsyncHTTPClient(limiter=utils.RateLimiter(0))
+        try:
+            with utils.deadline(utils.Deadline.after(-1, "zz")):
+                await client.get("http://127.0.0.1:1/")
+        finally:
+            await client.close()
+
+    with pytest.raises(utils.DeadlineExceeded):
+        asyncio.run(main())
+    assert utils.get_deadline() is None
+
+
+def test_download_async(tmp_path):
+    """Downloads should be saved to the cache and asked for again only if they changed."""
+    seen = []
+
+    async def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=b"a,b\n1,2\n", headers={"ETag": '"v1"'})
+
+    async def main():
+        runner, url = await _serve(handler)
+        cache = Cache(tmp_path, index=False, compression=False)
+        try:
+            first = await cache.download_async("zz/data.csv", f"{url}/data.csv")
+            second = await cache.download_async("zz/data.csv", f"{url}/data.csv")
+        finally:
+            await aio.close_http_client()
+            await runner.cleanup()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == tmp_path / "zz" / "data.csv"
+    assert first.read_bytes() == b"a,b\n1,2\n"
+    assert seen == [None, '"v1"']
+
+
+def test_to_thread_keeps_context(tmp_path):
+    """Blocking work run off the event loop should see the task's journal."""
+    run_journal = journal.Journal(tmp_path / "journal.jsonl")
+
+    async def main():
+        with journal.active(run_journal, "zz"):
+            await aio.to_thread(journal.record_unit, "pages/2")
+
+    asyncio.run(main())
+    assert run_journal.get("zz", "pages/2") is not None
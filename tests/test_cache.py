@@ -1,7 +1,10 @@
+import io
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from requests import Response
+from requests.adapters import BaseAdapter
 
 from warn.cache import Cache
 
@@ -70,3 +73,270 @@ def test_read(cache_dir):
     cache = Cache(path=cache_dir)
     html = cache.read("fl/2021_page_1.html").strip()
     assert html == "<html><h1>2021 page 1</h1></html>"
+
+
+class ConditionalAdapter(BaseAdapter):
+    """A transport adapter that serves one file and honors If-None-Match."""
+
+    def __init__(self, body, etag):
+        """Initialize a new instance."""
+        super().__init__()
+        self.body = body
+        self.etag = etag
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        """Answer with a 304 if the client already has the current version."""
+        self.sent.append(request)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.headers["ETag"] = self.etag
+        if request.headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            response.raw = io.BytesIO(b"")
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(self.body)
+        return response
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+
+def test_download_if_modified(tmpdir, monkeypatch):
+    """Unchanged files should be answered with a 304 and left alone."""
+    from warn import cache as cache_module
+    from warn import utils
+    from warn.cache import Cache
+
+    client = utils.HTTPClient()
+    adapter = ConditionalAdapter(b"first", '"v1"')
+    client.session.mount("https://", adapter)
+    monkeypatch.setattr(utils, "get_http_client", lambda: client)
+    monkeypatch.setattr(cache_module, "get_http_client", lambda: client)
+
+    cache = Cache(tmpdir)
+    url = "https://example.com/data.csv"
+    path, changed = cache.download_if_modified("xx/data.csv", url)
+    assert changed
+    assert path.read_bytes() == b"first"
+    assert "If-None-Match" not in adapter.sent[-1].headers
+
+    # The second request is conditional and nothing is rewritten
+    path, changed = cache.download_if_modified("xx/data.csv", url)
+    assert not changed
+    assert path.read_bytes() == b"first"
+    assert adapter.sent[-1].headers["If-None-Match"] == '"v1"'
+    assert client.not_modified_count == 1
+
+    # A new version on the server is downloaded
+    adapter.body, adapter.etag = b"second", '"v2"'
+    assert cache.download("xx/data.csv", url).read_bytes() == b"second"
+
+    # The validators are kept out of the cache listing
+    assert cache.files() == [str(Path(tmpdir, "xx"))]
+
+
+def test_is_settled_year():
+    """Only years before last year are settled."""
+    from datetime import date
+
+    from warn.cache import is_settled_year
+
+    today = date(2024, 3, 1)
+    assert is_settled_year(2022, today)
+    assert is_settled_year("2022", today)
+    assert not is_settled_year(2023, today)
+    assert not is_settled_year(2024, today)
+    assert not is_settled_year(None, today)
+    assert not is_settled_year("ab12", today)
+
+
+def test_get_or_fetch(tmpdir, monkeypatch):
+    """Fresh pages come from the cache and stale ones are fetched again."""
+    from warn import cache as cache_module
+    from warn.cache import Cache
+
+    fetched = []
+
+    class FakeResponse:
+        text = "<html>new</html>"
+
+    def fake_get_url(url, **kwargs):
+        fetched.append(url)
+        return FakeResponse()
+
+    monkeypatch.setattr(cache_module, "get_url", fake_get_url)
+    cache = Cache(tmpdir)
+    cache.write("xx/2020.html", "<html>old</html>")
+
+    # Settled pages and pages younger than max_age are read from the cache
+    assert cache.is_fresh("xx/2020.html", immutable=True)
+    assert cache.is_fresh("xx/2020.html", max_age=60)
+    assert not cache.is_fresh("xx/2020.html")
+    assert not cache.is_fresh("xx/2021.html", immutable=True)
+    html = cache.get_or_fetch("xx/2020.html", "https://example.com", immutable=True)
+    assert html == "<html>old</html>"
+    assert fetched == []
+
+    # Anything else is fetched and cached
+    html = cache.get_or_fetch("xx/2020.html", "https://example.com")
+    assert html == "<html>new</html>"
+    assert cache.read("xx/2020.html") == "<html>new</html>"
+    assert fetched == ["https://example.com"]
+
+
+def test_cache_index(tmpdir):
+    """An indexed cache should answer lookups from its database."""
+    from warn.cache import Cache
+
+    Path(tmpdir, "xx").mkdir()
+    Path(tmpdir, "xx", "old.html").write_text("old")
+
+    # Files already on disk are added when the index is created
+    cache = Cache(tmpdir, index=True, compression=False)
+    assert cache.exists("xx/old.html")
+    cache.write("xx/2020.html", "<html></html>", url="https://example.com/2020")
+    cache.write("xx/pages/1.html", "<html></html>")
+    cache.write("yy/source.csv", "a,b")
+
+    entry = cache.index.get("xx/2020.html")
+    assert entry["url"] == "https://example.com/2020"
+    assert entry["size"] == 13
+    assert entry["scraper"] == "xx"
+    assert cache.is_fresh("xx/2020.html", max_age=60)
+
+    # Lookups come from the index, not the filesystem
+    Path(tmpdir, "zz.html").write_text("unindexed")
+    assert not cache.exists("zz.html")
+    assert cache.files() == [str(Path(tmpdir, "xx")), str(Path(tmpdir, "yy"))]
+    assert cache.files("xx", "*.html") == [
+        str(Path(tmpdir, "xx", "2020.html")),
+        str(Path(tmpdir, "xx", "old.html")),
+    ]
+    assert cache.files("xx/") == [
+        str(Path(tmpdir, "xx", "2020.html")),
+        str(Path(tmpdir, "xx", "old.html")),
+        str(Path(tmpdir, "xx", "pages")),
+    ]
+
+    # And the statistics can be summed up by scraper
+    stats = {s["scraper"]: s for s in cache.index.stats()}
+    assert stats["xx"]["files"] == 3
+    assert stats["yy"]["bytes"] == 3
+
+
+def test_cache_index_follows_disk(tmpdir):
+    """The index should skip internal files and drop files deleted behind its back."""
+    from warn.cache import Cache
+
+    for name in ["xx/page.html", "ks/packs/records.pack", "parsed_pdfs/fl.json"]:
+        Path(tmpdir, name).parent.mkdir(parents=True, exist_ok=True)
+        Path(tmpdir, name).write_text("x")
+    Path(tmpdir, "ks", ".meta", "checkpoints").mkdir(parents=True)
+    Path(tmpdir, "ks", ".meta", "checkpoints", "2020.csv").write_text("x")
+
+    cache = Cache(tmpdir, index=True, compression=False)
+    assert cache.index.keys() == ["xx/page.html"]
+
+    # Binary files saved through the cache are indexed too
+    cache.write_bytes("fl/2020.pdf", b"%PDF", url="https://example.com/2020.pdf")
+    assert cache.index.get("fl/2020.pdf")["url"] == "https://example.com/2020.pdf"
+    assert Path(tmpdir, "fl", "2020.pdf").read_bytes() == b"%PDF"
+
+    # A file deleted from disk is dropped, rather than read and not found
+    Path(tmpdir, "fl", "2020.pdf").unlink()
+    assert not cache.is_fresh("fl/2020.pdf", immutable=True)
+    Path(tmpdir, "xx", "page.html").unlink()
+    assert not cache.exists("xx/page.html")
+    assert cache.index.keys() == []
+
+
+def test_compressed_cache(tmpdir):
+    """Compressed pages should read back as if they weren't."""
+    from warn.cache import Cache
+
+    cache = Cache(tmpdir, compression="gzip")
+    cache.write("xx/page.html", "<html>é</html>")
+    cache.write("xx/rows.csv", "a,b\r\n1,2\r\n")
+    assert Path(tmpdir, "xx", "page.html.gz").exists()
+    assert not Path(tmpdir, "xx", "page.html").exists()
+    assert cache.exists("xx/page.html")
+    assert cache.read("xx/page.html") == "<html>é</html>"
+    assert cache.read_csv("xx/rows.csv") == [["a", "b"], ["1", "2"]]
+    assert cache.files("xx", "*.html") == [str(Path(tmpdir, "xx", "page.html"))]
+
+    # An uncompressed cache can still read it, and replaces it when writing
+    plain = Cache(tmpdir, compression=False)
+    assert plain.read("xx/page.html") == "<html>é</html>"
+    plain.write("xx/page.html", "<html>new</html>")
+    assert not Path(tmpdir, "xx", "page.html.gz").exists()
+    assert cache.read("xx/page.html") == "<html>new</html>"
+
+
+def test_cut_short_download_keeps_cached_copy(tmpdir, monkeypatch):
+    """A download that doesn't match its Content-Length shouldn't replace the cache."""
+    from warn import cache as cache_module
+    from warn import utils
+    from warn.cache import Cache
+
+    client = utils.HTTPClient()
+    adapter = ConditionalAdapter(b"complete", '"v1"')
+    client.session.mount("https://", adapter)
+    monkeypatch.setattr(utils, "get_http_client", lambda: client)
+    monkeypatch.setattr(cache_module, "get_http_client", lambda: client)
+
+    cache = Cache(tmpdir, index=False)
+    url = "https://example.com/data.pdf"
+    path = cache.download("xx/data.pdf", url)
+
+    # The server now promises more than it sends
+    send = adapter.send
+
+    def short_send(request, **kwargs):
+        response = send(request, **kwargs)
+        response.headers["Content-Length"] = "100"
+        return response
+
+    adapter.body, adapter.etag = b"partial", '"v2"'
+    monkeypatch.setattr(adapter, "send", short_send)
+    with pytest.raises(OSError, match="cut short"):
+        cache.download("xx/data.pdf", url)
+    assert path.read_bytes() == b"complete"
+    assert [p.name for p in Path(tmpdir, "xx").iterdir()] == ["data.pdf"]
+
+
+def test_concurrent_fetches_share_one_request(tmpdir, monkeypatch):
+    """Workers after the same page should wait for the first one to fetch it."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from warn import cache as cache_module
+    from warn.cache import Cache
+
+    fetched = []
+    lock = threading.Lock()
+
+    class FakeResponse:
+        text = "<html></html>"
+
+    def slow_get_url(url, **kwargs):
+        with lock:
+            fetched.append(url)
+        time.sleep(0.1)
+        return FakeResponse()
+
+    monkeypatch.setattr(cache_module, "get_url", slow_get_url)
+    cache = Cache(tmpdir, index=False, compression=False)
+    with ThreadPoolExecutor(4) as executor:
+        pages = list(
+            executor.map(
+                lambda _: cache.get_or_fetch("xx/page.html", "https://a", max_age=60),
+                range(4),
+            )
+        )
+    assert pages == ["<html></html>"] * 4
+    assert fetched == ["https://a"]
@@ -1,8 +1,12 @@
 import re
+import threading
+import time
+from datetime import date, timedelta
 from pathlib import Path
 
 import pytest
 
+from warn import utils
 from warn.platforms import JobCenterSite
 
 
@@ -140,3 +144,238 @@ def test_cached_detail_pages(tmp_path):
     assert len(record_files) == 2
     assert Path(cache_dir, "records").exists()
     assert Path(cache_dir, "search_results").exists()
+
+
+def test_detail_pages_keep_order(ok_site, monkeypatch):
+    """Detail pages fetched at the same time should stay in the order of their rows."""
+
+    def fake_get_page(url, params=None, use_cache=True):
+        number = int(url.rsplit("/", 1)[-1])
+        # Make the later rows finish first
+        time.sleep(0.01 * (5 - number))
+        return (
+            '<dt class="definition-list__title">Company Name</dt>'
+            f'<dd class="definition-list__definition">Company {number}</dd>'
+        )
+
+    monkeypatch.setattr(ok_site, "_get_page", fake_get_page)
+    data = [
+        {
+            "detail_page_url": f"https://okjobmatch.com/search/warn_lookups/{i}",
+            "detail": {"record_number": str(i)},
+        }
+        for i in range(5)
+    ]
+    ok_site._scrape_detail_pages(data, use_cache=True)
+    assert [row["detail"]["company_name"] for row in data] == [
+        f"Company {i}" for i in range(5)
+    ]
+    assert [row["detail"]["record_number"] for row in data] == [
+        str(i) for i in range(5)
+    ]
+
+
+def test_pagination_is_not_recursive(ok_site, monkeypatch):
+    """Walking more pages than the recursion limit should work."""
+    page_count = 1200
+    row = (
+        '<tr><td><a href="/search/warn_lookups/{n}">Employer {n}</a></td>'
+        "<td>City</td><td>12345</td><td>Area</td><td>Jan 1, 2020</td><td>WARN</td></tr>"
+    )
+    next_link = (
+        '<a class="next_page" href="/search/warn_lookups?commit=Search&page={n}'
+        '&q%5Bnotice_on_gteq%5D=2020-01-01&q%5Bnotice_on_lteq%5D=2020-12-31">Next</a>'
+    )
+
+    def fake_get_page(url, params=None, use_cache=True):
+        n = int(url.split("page=")[1].split("&")[0]) if "page=" in url else 1
+        html = "<table><tr><th>Header</th></tr>" + row.format(n=n) + "</table>"
+        if n < page_count:
+            html += next_link.format(n=n + 1)
+        return html
+
+    monkeypatch.setattr(ok_site, "_get_page", fake_get_page)
+    results_pages, data = ok_site.scrape(
+        start_date="2020-01-01", end_date="2020-12-31", detail_pages=False
+    )
+    assert len(data) == page_count
+    assert list(results_pages.keys()) == list(range(1, page_count + 1))
+    assert data[-1]["employer"] == f"Employer {page_count}"
+
+
+def test_iter_records_streams_flat_rows(ok_site, monkeypatch):
+    """Records should come back flattened and without any raw HTML."""
+    results = (
+        "<table><tr><th>Header</th></tr>"
+        '<tr><td><a href="/search/warn_lookups/7">Acme</a></td>'
+        "<td>Tulsa</td><td>74014</td><td>Area</td><td>Jan 1, 2020</td><td>WARN</td></tr>"
+        "</table>"
+    )
+    detail = (
+        '<dt class="definition-list__title">Address</dt>'
+        '<dd class="definition-list__definition">1 Main St\n\nTulsa, OK</dd>'
+        '<dt class="definition-list__title">Number of Employees Affected</dt>'
+        '<dd class="definition-list__definition">12</dd>'
+    )
+
+    def fake_get_page(url, params=None, use_cache=True):
+        return detail if url.endswith("/7") else results
+
+    monkeypatch.setattr(ok_site, "_get_page", fake_get_page)
+    records = ok_site.iter_records(start_date="2020-01-01", end_date="2020-12-31")
+    assert not isinstance(records, list)
+    (record,) = list(records)
+    assert record["employer"] == "Acme"
+    assert record["address"] == "1 Main St; Tulsa, OK"
+    assert record["number_of_employees_affected"] == "12"
+    assert record["record_number"] == "7"
+    assert "detail" not in record
+    assert "html" not in record
+
+
+def test_incremental_reuses_unchanged_detail_pages(tmp_path, monkeypatch):
+    """Only new or changed listings should have their detail pages re-fetched."""
+    url = "https://okjobmatch.com/search/warn_lookups"
+    listings = {"7": "Jan 1, 2020", "8": "Jan 2, 2020"}
+    fetched = []
+
+    def fake_get(url, **kwargs):
+        fetched.append(url)
+        if url.rsplit("/", 1)[-1].isdigit():
+            text = (
+                '<dt class="definition-list__title">Number of Employees Affected</dt>'
+                '<dd class="definition-list__definition">5</dd>'
+            )
+        else:
+            rows = "".join(
+                f'<tr><td><a href="/search/warn_lookups/{n}">Acme {n}</a></td>'
+                f"<td>Tulsa</td><td>74014</td><td>Area</td><td>{d}</td><td>WARN</td></tr>"
+                for n, d in listings.items()
+            )
+            text = f"<table><tr><th>Header</th></tr>{rows}</table>"
+        return type("Response", (), {"status_code": 200, "text": text})()
+
+    monkeypatch.setattr(utils.get_http_client(), "get", fake_get)
+
+    def scrape():
+        fetched.clear()
+        site = JobCenterSite("OK", url, str(tmp_path), incremental=True)
+        records = site.iter_records("2020-01-01", "2020-12-31", use_cache=False)
+        return [r["record_number"] for r in records]
+
+    assert scrape() == ["7", "8"]
+    assert len(fetched) == 3
+    # Nothing changed, so only the search results are requested
+    assert scrape() == ["7", "8"]
+    assert fetched == [url]
+    # A changed listing and a new one need their detail pages
+    listings.update({"8": "Jan 3, 2020", "9": "Jan 4, 2020"})
+    assert scrape() == ["7", "8", "9"]
+    assert sorted(fetched[1:]) == [f"{url}/8", f"{url}/9"]
+
+
+def _fake_search_pages(notices, per_page=5):
+    """Fake the search results pages for a notice on each of the provided dates."""
+
+    def fake_get_page(url, params=None, use_cache=True):
+        if params:
+            start, end = params["q[notice_on_gteq]"], params["q[notice_on_lteq]"]
+            page = 1
+        else:
+            start = re.search(r"gteq%5D=([\d-]+)", url).group(1)
+            end = re.search(r"lteq%5D=([\d-]+)", url).group(1)
+            page = int(re.search(r"page=(\d+)", url).group(1))
+        matches = [d for d in notices if start <= d.isoformat() <= end]
+        pages = max(1, -(-len(matches) // per_page))
+        rows = "".join(
+            f'<tr><td><a href="/search/warn_lookups/{d.toordinal()}">Acme</a></td>'
+            f"<td>Tulsa</td><td>74014</td><td>Area</td><td>{d}</td><td>WARN</td></tr>"
+            for d in matches[(page - 1) * per_page : page * per_page]
+        )
+        links = "".join(
+            f'<a href="/search/warn_lookups?commit=Search&page={n}'
+            f'&q%5Bnotice_on_gteq%5D={start}&q%5Bnotice_on_lteq%5D={end}">{n}</a>'
+            for n in range(2, pages + 1)
+        )
+        if page < pages:
+            links += (
+                f'<a class="next_page" href="/search/warn_lookups?commit=Search'
+                f"&page={page + 1}&q%5Bnotice_on_gteq%5D={start}"
+                f'&q%5Bnotice_on_lteq%5D={end}">Next</a>'
+            )
+        return (
+            f"<table><tr><th>Header</th></tr>{rows}</table>"
+            f'<div class="pagination"><em class="current">{page}</em>{links}</div>'
+        )
+
+    return fake_get_page
+
+
+def test_busy_years_are_split_into_windows(ok_site, monkeypatch):
+    """Splitting a long search into date windows should find the same records."""
+    # One notice a day for a year
+    notices = [date(2020, 1, 1) + timedelta(days=n) for n in range(366)]
+    fake_get_page = _fake_search_pages(notices)
+
+    monkeypatch.setattr(ok_site, "_get_page", fake_get_page)
+    assert (
+        ok_site._page_count(
+            fake_get_page(
+                ok_site.url,
+                {"q[notice_on_gteq]": "2020-01-01", "q[notice_on_lteq]": "2020-12-31"},
+            )
+        )
+        == 74
+    )
+    windows = ok_site._partition_dates("2020-01-01", "2020-12-31", max_pages=4)
+    assert len(windows) > 1
+    assert windows[0][0] == "2020-01-01"
+    assert windows[-1][1] == "2020-12-31"
+    kwargs = dict(start_date="2020-01-01", end_date="2020-12-31", detail_pages=False)
+    whole = list(ok_site.iter_records(**kwargs))
+    split = list(ok_site.iter_records(max_pages=4, **kwargs))
+    assert len(whole) == len(split) == len(notices)
+    assert sorted(r["record_number"] for r in split) == sorted(
+        r["record_number"] for r in whole
+    )
+
+
+def test_busy_years_are_split_in_one_go(ok_site, monkeypatch):
+    """A long search should be cut by its page count, not halved search by search."""
+    notices = [date(2020, 1, 1) + timedelta(days=n) for n in range(366)]
+    fake_get_page = _fake_search_pages(notices)
+    searches = []
+
+    def counted_get_page(url, params=None, use_cache=True):
+        if params:
+            searches.append(params["q[notice_on_gteq]"])
+        return fake_get_page(url, params, use_cache)
+
+    monkeypatch.setattr(ok_site, "_get_page", counted_get_page)
+    windows = ok_site._partition_dates("2020-01-01", "2020-12-31", max_pages=4)
+    searches.clear()
+    kwargs = dict(start_date="2020-01-01", end_date="2020-12-31", detail_pages=False)
+    records = list(ok_site.iter_records(max_pages=4, **kwargs))
+    assert len(records) == len(notices)
+    # The whole year is searched once, then each window once, its first page reused
+    assert len(searches) == len(windows) + 1
+
+
+def test_split_windows_stream_records(ok_site, monkeypatch):
+    """Records from a date window should come back before the whole window is done."""
+    notices = [date(2020, 1, 1) + timedelta(days=n) for n in range(366)]
+    fake_get_page = _fake_search_pages(notices)
+    first_record_read = threading.Event()
+
+    def held_get_page(url, params=None, use_cache=True):
+        # Hold the first window's second page until a record has been read
+        if "page=2&q%5Bnotice_on_gteq%5D=2020-01-01&" in url:
+            assert first_record_read.wait(5)
+        return fake_get_page(url, params, use_cache)
+
+    monkeypatch.setattr(ok_site, "_get_page", held_get_page)
+    kwargs = dict(start_date="2020-01-01", end_date="2020-12-31", detail_pages=False)
+    records = ok_site.iter_records(max_pages=4, **kwargs)
+    assert next(records)["notice_date"] == "2020-01-01"
+    first_record_read.set()
+    assert len(list(records)) == len(notices) - 1
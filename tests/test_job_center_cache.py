@@ -85,3 +85,82 @@ def test_cache_fetch(test_input, cache_dir):
     cache = Cache(cache_dir)
     content = cache.fetch(url, params)
     assert content == expected_content
+
+
+def test_packed_cache(cache_dir):
+    """Packed pages should be saved to one file per page type and read back."""
+    cache = Cache(cache_dir, packed=True, index=False, compression=False)
+    url = "https://www.kansasworks.com/search/warn_lookups/123"
+    cache.save(url, {}, "<html>first</html>")
+    cache.save(url, {}, "<html>second</html>")
+    cache.write("records/456.html", "<html>456</html>")
+    cache.write("listings.json", "{}")
+
+    # Only the pack and its index are written for the records
+    assert not Path(cache_dir, "records").exists()
+    assert sorted(p.name for p in Path(cache_dir, "packs").iterdir()) == [
+        "records.idx",
+        "records.lock",
+        "records.pack",
+    ]
+    assert Path(cache_dir, "listings.json").exists()
+    assert cache.exists("records/123.html")
+    assert cache.fetch(url, {}) == "<html>second</html>"
+    assert cache.files("records", "*.html") == [
+        str(Path(cache_dir, "records", "123.html")),
+        str(Path(cache_dir, "records", "456.html")),
+    ]
+
+    # Reopening the pack reads its index from disk, and compaction drops the old copy
+    reopened = Cache(cache_dir, packed=True, index=False, compression=False)
+    assert reopened.read("records/123.html") == "<html>second</html>"
+    pack_path = Path(cache_dir, "packs", "records.pack")
+    size = pack_path.stat().st_size
+    reopened.compact()
+    assert pack_path.stat().st_size == size - len("<html>first</html>")
+    assert reopened.read("records/456.html") == "<html>456</html>"
+
+    # And the pages can be exported as loose files
+    reopened.export()
+    assert Path(cache_dir, "records", "123.html").read_text() == "<html>second</html>"
+
+
+def test_pack_ignores_torn_writes(tmp_path):
+    """Index lines for pages that never finished writing should be skipped."""
+    from warn.cache_pack import PackFile
+
+    pack = PackFile(tmp_path / "records")
+    pack.write("1.html", b"one")
+    with open(pack.index_path, "a") as fh:
+        fh.write("2.html\t3\t100\t\n3.html\t3\t2")
+    reopened = PackFile(tmp_path / "records")
+    assert reopened.keys() == ["1.html"]
+    assert reopened.read("1.html") == (b"one", "")
+
+
+def test_pack_compacts_only_stale_packs(tmp_path, monkeypatch):
+    """Compaction should wait for old copies to pile up, and reads skip the lock."""
+    from warn import cache_pack
+    from warn.cache_pack import PackFile
+
+    pack = PackFile(tmp_path / "records")
+    pack.write("1.html", b"one")
+    pack.write("2.html", b"two")
+    assert pack.stale_bytes == 0
+    assert pack.compact() == 0
+
+    # One old copy is a third of the pack
+    pack.write("1.html", b"uno")
+    reopened = PackFile(tmp_path / "records")
+    assert reopened.stale_bytes == pack.stale_bytes == 3
+    assert reopened.compact(min_stale_ratio=0.5) == 0
+    assert reopened.compact(min_stale_ratio=0.25) == 3
+    assert reopened.stale_bytes == 0
+
+    # The first pack sees the compaction and reads from the new file, lock-free
+    def no_lock(path):
+        raise AssertionError("Reads shouldn't take the lock")
+
+    assert pack.read("1.html") == (b"uno", "")
+    monkeypatch.setattr(cache_pack, "file_lock", no_lock)
+    assert pack.read("2.html") == (b"two", "")
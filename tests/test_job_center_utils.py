@@ -0,0 +1,93 @@
+import csv
+from types import SimpleNamespace
+
+import pytest
+
+from warn import journal
+from warn.platforms.job_center import utils as job_center_utils
+from warn.platforms.job_center.utils import _DedupingWriter, _scrape_years
+
+
+def test_deduping_writer(tmp_path):
+    """Duplicate rows should be dropped, keeping the order they were first seen."""
+    headers = ["employer", "city"]
+    rows = [
+        {"employer": "Acme", "city": "Tulsa"},
+        {"employer": "Widgets, Inc.", "city": "Tulsa"},
+        {"employer": "Acme", "city": "Tulsa"},
+        {"employer": "Acme", "city": "Norman"},
+        {"employer": "Widgets, Inc.", "city": "Tulsa"},
+    ]
+    path = tmp_path / "ok.csv"
+    with open(path, "w", newline="") as fh:
+        writer = _DedupingWriter(fh, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(iter(rows))
+    assert writer.removed == 2
+    with open(path, newline="") as fh:
+        written = list(csv.DictReader(fh))
+    assert written == [rows[0], rows[1], rows[3]]
+
+
+def test_scrape_years_resumes(tmp_path):
+    """A resumed run should read the years it finished from their checkpoints."""
+    searched = []
+    down = {"2020-01-01"}
+
+    def iter_records(start_date, end_date, **kwargs):
+        searched.append(start_date)
+        if start_date in down:
+            raise ConnectionError("Site went down")
+        return iter([{"employer": f"Acme {start_date[:4]}", "city": "Tulsa"}])
+
+    site = SimpleNamespace(
+        cache=SimpleNamespace(path=str(tmp_path / "ok"), meta_dir=".meta"),
+        iter_records=iter_records,
+    )
+    years = [("2021-01-01", "2021-12-31"), ("2020-01-01", "2020-12-31")]
+    path = tmp_path / "ok.csv"
+
+    def run():
+        run_journal = journal.Journal(tmp_path / "journal.jsonl")
+        with journal.active(run_journal, "ok"), open(path, "w", newline="") as fh:
+            writer = _DedupingWriter(fh, fieldnames=["employer", "city"])
+            _scrape_years(site, writer, years)
+
+    with pytest.raises(ConnectionError):
+        run()
+    assert searched == ["2021-01-01", "2020-01-01"]
+
+    # Pick up from the year that failed
+    searched.clear()
+    down.clear()
+    run()
+    assert searched == ["2020-01-01"]
+    with open(path, newline="") as fh:
+        written = list(csv.DictReader(fh, fieldnames=["employer", "city"]))
+    assert [r["employer"] for r in written] == ["Acme 2021", "Acme 2020"]
+
+
+def test_scrape_state_keeps_export_on_error(tmp_path, monkeypatch):
+    """A year that fails should leave the last export as it was."""
+
+    class FailingSite:
+        def __init__(self, *args, **kwargs):
+            self.cache = SimpleNamespace(
+                path=str(tmp_path / "ok"), meta_dir=".meta", packed=False
+            )
+            self.years = 0
+
+        def iter_records(self, **kwargs):
+            self.years += 1
+            if self.years > 1:
+                raise ConnectionError("Site went down")
+            return iter([{"employer": "Acme"}])
+
+    monkeypatch.setattr(job_center_utils, "JobCenterSite", FailingSite)
+    path = tmp_path / "ok.csv"
+    path.write_text("employer\nOld Co\n")
+    with pytest.raises(ConnectionError):
+        job_center_utils.scrape_state(
+            "OK", "https://example.com", path, 2000, tmp_path / "cache"
+        )
+    assert path.read_text() == "employer\nOld Co\n"
@@ -0,0 +1,131 @@
+import asyncio
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from warn import Runner, utils
+
+
+@pytest.fixture
+def runner(tmp_path):
+    """Create a runner that writes to a temporary directory."""
+    return Runner(tmp_path / "exports", tmp_path / "cache")
+
+
+def test_scrape_many_isolates_failures(runner, monkeypatch):
+    """A failing state should not stop the states that follow it."""
+
+    def fake_import(name):
+        state = name.rsplit(".", 1)[-1]
+        if state == "zz":
+            raise ValueError("Broken scraper")
+        return SimpleNamespace(
+            scrape=lambda data_dir, cache_dir: data_dir / f"{state}.csv"
+        )
+
+    monkeypatch.setattr("warn.runner.import_module", fake_import)
+    data_paths, failures = runner.scrape_many(["AA", "zz", "bb"])
+    assert list(data_paths.keys()) == ["aa", "bb"]
+    assert data_paths["bb"] == Path(runner.data_dir, "bb.csv")
+    assert list(failures.keys()) == ["zz"]
+    assert isinstance(failures["zz"], ValueError)
+
+
+def test_scrape_many_parallel_failures(runner):
+    """Failures in worker processes should be collected and reported."""
+    data_paths, failures = runner.scrape_many(["xx", "yy"], workers=2)
+    assert data_paths == {}
+    assert sorted(failures.keys()) == ["xx", "yy"]
+    assert all(isinstance(e, ModuleNotFoundError) for e in failures.values())
+
+
+def test_scrape_many_run_deadline(runner, monkeypatch):
+    """States left when the run runs out of time should fail with a DeadlineExceeded."""
+
+    def fake_scrape(data_dir, cache_dir):
+        utils.get_deadline().check()
+        return data_dir / "aa.csv"
+
+    monkeypatch.setattr(
+        "warn.runner.import_module", lambda name: SimpleNamespace(scrape=fake_scrape)
+    )
+    data_paths, failures = runner.scrape_many(["aa", "bb"], run_deadline=60)
+    assert list(data_paths.keys()) == ["aa", "bb"]
+    assert failures == {}
+
+    data_paths, failures = runner.scrape_many(["aa", "bb"], deadline=0)
+    assert data_paths == {}
+    assert all(isinstance(e, utils.DeadlineExceeded) for e in failures.values())
+
+
+def test_scrape_many_resume(runner, monkeypatch):
+    """A resumed run should skip the states the last run finished."""
+    scraped = []
+
+    def fake_import(name):
+        state = name.rsplit(".", 1)[-1]
+
+        def scrape(data_dir, cache_dir):
+            scraped.append(state)
+            if state == "bb" and len(scraped) < 3:
+                raise ValueError("Broken scraper")
+            data_dir.mkdir(parents=True, exist_ok=True)
+            (data_dir / f"{state}.csv").touch()
+            return data_dir / f"{state}.csv"
+
+        return SimpleNamespace(scrape=scrape)
+
+    monkeypatch.setattr("warn.runner.import_module", fake_import)
+    _, failures = runner.scrape_many(["aa", "bb"])
+    assert list(failures.keys()) == ["bb"]
+
+    data_paths, failures = runner.scrape_many(["aa", "bb"], resume=True)
+    assert scraped == ["aa", "bb", "bb"]
+    assert list(data_paths.keys()) == ["aa", "bb"]
+    assert failures == {}
+
+    # Without resuming, the journal starts over
+    runner.scrape_many(["aa", "bb"])
+    assert scraped == ["aa", "bb", "bb", "aa", "bb"]
+
+
+def test_scrape_many_async(runner, monkeypatch):
+    """Coroutine scrapers should share one event loop and be cancelled at their deadline."""
+    loops = set()
+
+    def fake_import(name):
+        state = name.rsplit(".", 1)[-1]
+
+        async def scrape(data_dir, cache_dir):
+            loops.add(asyncio.get_running_loop())
+            if state == "zz":
+                await asyncio.sleep(60)
+            return data_dir / f"{state}.csv"
+
+        return SimpleNamespace(scrape=scrape)
+
+    monkeypatch.setattr("warn.runner.import_module", fake_import)
+    data_paths, failures = runner.scrape_many(
+        ["aa", "zz", "bb"], workers=3, deadline=0.5
+    )
+    assert list(data_paths.keys()) == ["aa", "bb"]
+    assert isinstance(failures["zz"], utils.DeadlineExceeded)
+    assert len(loops) == 1
+    assert runner.scrape("aa") == runner.data_dir / "aa.csv"
+
+
+def test_scrape_many_shares_pdf_workers(runner, monkeypatch):
+    """Worker processes should split the PDF processes between them."""
+    monkeypatch.setenv("WARN_PDF_WORKERS", "8")
+
+    def fake_import(name):
+        return SimpleNamespace(
+            scrape=lambda data_dir, cache_dir: Path(os.environ["WARN_PDF_WORKERS"])
+        )
+
+    monkeypatch.setattr("warn.runner.import_module", fake_import)
+    data_paths, _ = runner.scrape_many(["aa", "bb"], workers=2)
+    assert data_paths == {"aa": Path("4"), "bb": Path("4")}
+    assert os.environ["WARN_PDF_WORKERS"] == "8"
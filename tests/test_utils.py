@@ -0,0 +1,495 @@
+import os
+import re
+import zipfile
+
+import pytest
+import requests
+from openpyxl import Workbook
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from warn import utils
+
+
+class FakeAdapter(BaseAdapter):
+    """A transport adapter that answers every request with the same body."""
+
+    def __init__(self, body=b"<html></html>"):
+        """Initialize a new instance."""
+        super().__init__()
+        self.body = body
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        """Record the request and return a canned response."""
+        self.sent.append((request, kwargs))
+        response = Response()
+        response.status_code = 200
+        response._content = self.body
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+
+def test_http_client_defaults():
+    """The shared client should set the user agent and timeouts and count traffic."""
+    client = utils.HTTPClient()
+    adapter = FakeAdapter(b"hello")
+    client.session.mount("https://", adapter)
+    client.get("https://example.com/a")
+    client.get("https://example.com/b", headers={"User-Agent": "Custom"})
+    assert client.request_count == 2
+    assert client.byte_count == 10
+    first, first_kwargs = adapter.sent[0]
+    assert first.headers["User-Agent"] == utils.USER_AGENT
+    assert first_kwargs["timeout"] == utils.REQUEST_TIMEOUT
+    second, _ = adapter.sent[1]
+    assert second.headers["User-Agent"] == "Custom"
+
+
+def test_http_client_is_shared():
+    """Every caller in a process should get the same client."""
+    assert utils.get_http_client() is utils.get_http_client()
+
+
+def _write_pdf(path, page_texts, form=False):
+    """Write a bare-bones PDF with a line of text on each page.
+
+    If form is True, each page draws its text from a Form XObject.
+    """
+    count = len(page_texts)
+    stride = 3 if form else 2
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + i * stride} 0 R" for i in range(count)), count
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        number = 4 + i * stride
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        resources = "/Font << /F1 3 0 R >>"
+        if form:
+            resources += f" /XObject << /Fm1 {number + 2} 0 R >>"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << {resources} >> /Contents {number + 1} 0 R >>"
+        )
+        if form:
+            objects.append("<< /Length 8 >>\nstream\n/Fm1 Do\nendstream")
+            objects.append(
+                "<< /Type /XObject /Subtype /Form /BBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Length {len(stream)} >>\n"
+                f"stream\n{stream}\nendstream"
+            )
+        else:
+            objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+    pdf += f"startxref\n{xref}\n%%EOF\n"
+    path.write_bytes(pdf.encode("latin-1"))
+
+
+def _page_text(page, page_index):
+    return [(page_index, page.extract_text())]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parse_pdf_pages_keeps_page_order(tmp_path, workers):
+    """Pages parsed in other processes should come back in page order."""
+    path = tmp_path / "pages.pdf"
+    texts = [f"Page {n}" for n in range(10)]
+    _write_pdf(path, texts)
+    assert utils.parse_pdf_pages(path, _page_text, workers=workers) == list(
+        enumerate(texts)
+    )
+
+
+def test_parse_pdf_pages_stitch(tmp_path):
+    """A stitch hook should see each page's result, in order."""
+    path = tmp_path / "pages.pdf"
+    _write_pdf(path, ["a", "b", "c"])
+
+    def stitch(rows, page_rows, page_index):
+        ((_, text),) = page_rows
+        return [f"{rows[0]}{text}"] if rows else [text]
+
+    assert utils.parse_pdf_pages(path, _page_text, stitch, workers=2) == ["abc"]
+
+
+_parsed_pages = []
+
+
+def _counted_page_text(page, page_index):
+    _parsed_pages.append(page_index)
+    return _page_text(page, page_index)
+
+
+def test_parse_pdf_pages_cache(tmp_path):
+    """An unchanged PDF should be loaded from the cache instead of parsed again."""
+    path = tmp_path / "pages.pdf"
+    _write_pdf(path, ["a", "b"])
+    cache_dir = tmp_path / "cache"
+    kwargs = dict(workers=1, cache_dir=cache_dir)
+    _parsed_pages.clear()
+    first = utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    assert _parsed_pages == [0, 1]
+    assert utils.parse_pdf_pages(path, _counted_page_text, **kwargs) == first
+    assert _parsed_pages == [0, 1]
+    # A new parser version or new contents mean parsing it again
+    utils.parse_pdf_pages(path, _counted_page_text, parser_version="2", **kwargs)
+    assert _parsed_pages == [0, 1, 0, 1]
+    assert len(list(cache_dir.glob("parsed_pdfs/*.json"))) == 2
+
+
+def test_parse_pdf_pages_reuses_unchanged_pages(tmp_path):
+    """Only the new or changed pages of a PDF should be parsed again."""
+    path = tmp_path / "pages.pdf"
+    cache_dir = tmp_path / "cache"
+    kwargs = dict(workers=1, cache_dir=cache_dir)
+    _write_pdf(path, ["a", "b"])
+    _parsed_pages.clear()
+    utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    # A page added to the end
+    _write_pdf(path, ["a", "b", "c"])
+    rows = utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    assert _parsed_pages == [0, 1, 2]
+    assert rows == [[0, "a"], [1, "b"], [2, "c"]]
+    # A page changed in the middle
+    _write_pdf(path, ["a", "x", "c"])
+    rows = utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    assert _parsed_pages == [0, 1, 2, 1]
+    assert rows == [[0, "a"], [1, "x"], [2, "c"]]
+
+
+def test_parse_pdf_pages_sees_changed_forms(tmp_path):
+    """A page should be parsed again when text drawn from one of its forms changes."""
+    path = tmp_path / "pages.pdf"
+    kwargs = dict(workers=1, cache_dir=tmp_path / "cache")
+    _write_pdf(path, ["a", "b"], form=True)
+    _parsed_pages.clear()
+    utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    _write_pdf(path, ["a", "x"], form=True)
+    rows = utils.parse_pdf_pages(path, _counted_page_text, **kwargs)
+    assert _parsed_pages == [0, 1, 1]
+    assert rows == [[0, "a"], [1, "x"]]
+
+
+def _write_workbook(path):
+    """Write a workbook with two sheets, a few blank rows and a header."""
+    workbook = Workbook()
+    first = workbook.active
+    first.title = "First"
+    for row in [
+        ["Company", "City", "Employees"],
+        [None, None, None],
+        ["Acme", "Tulsa", 12],
+        ["Widgets", None, 3],
+    ]:
+        first.append(row)
+    second = workbook.create_sheet("Second")
+    second.append(["Company", "City", "Employees"])
+    second.append(["Gizmos", "Norman", 7])
+    workbook.save(path)
+
+
+def test_iter_excel_rows(tmp_path):
+    """Rows should stream out as lists of values, without the empty ones."""
+    path = tmp_path / "data.xlsx"
+    _write_workbook(path)
+    rows = utils.iter_excel_rows(path)
+    assert not isinstance(rows, list)
+    assert list(rows) == [
+        ["Company", "City", "Employees"],
+        ["Acme", "Tulsa", 12],
+        ["Widgets", None, 3],
+    ]
+    assert len(list(utils.iter_excel_rows(path, skip_empty=False))) == 4
+    assert list(utils.iter_excel_rows(path, sheet="Second", skip_rows=1)) == [
+        ["Gizmos", "Norman", 7]
+    ]
+    assert [row[0] for row in utils.iter_excel_rows(path, sheet=None, skip_rows=1)] == [
+        "Acme",
+        "Widgets",
+        "Gizmos",
+    ]
+    assert utils.parse_excel(path, keep_header=False) == list(
+        utils.iter_excel_rows(path, skip_rows=1)
+    )
+    assert utils.excel_sheet_names(path) == ["First", "Second"]
+
+
+def test_iter_excel_rows_pads_short_rows(tmp_path):
+    """Rows should be padded to the header's width when a sheet's size is wrong."""
+    path = tmp_path / "data.xlsx"
+    workbook = Workbook()
+    for row in [["Company", "City", "Employees"], ["Acme", "Tulsa", None]]:
+        workbook.active.append(row)
+    workbook.save(path)
+
+    # Claim the sheet is a single cell, as some files do
+    fixed = tmp_path / "fixed.xlsx"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(fixed, "w") as dest:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]+"', b'<dimension ref="A1"', data)
+            dest.writestr(item, data)
+
+    rows = list(utils.iter_excel_rows(fixed, skip_rows=1))
+    assert rows == [["Acme", "Tulsa", None]]
+
+
+def test_skip_to_header():
+    """Rows before the header should be thrown away."""
+    rows = iter([["Report"], [None], ["County", "Company"], ["Tulsa", "Acme"]])
+    header = utils.skip_to_header(rows, lambda row: row[0] == "County")
+    assert header == ["County", "Company"]
+    assert list(rows) == [["Tulsa", "Acme"]]
+    with pytest.raises(ValueError):
+        utils.skip_to_header(iter([["Report"]]), lambda row: row[0] == "County")
+
+
+def test_write_rows_to_csv_streams(tmp_path):
+    """Rows can be written straight from a generator, and are counted."""
+    path = tmp_path / "rows.csv"
+    rows = ([i, f"row {i}"] for i in range(3))
+    assert utils.write_rows_to_csv(path, rows) == 3
+    assert path.read_text(encoding="utf-8").splitlines() == [
+        "0,row 0",
+        "1,row 1",
+        "2,row 2",
+    ]
+
+    dict_path = tmp_path / "dicts.csv"
+    dicts = ({"a": i, "b": "é"} for i in range(2))
+    assert utils.write_dict_rows_to_csv(dict_path, ["a", "b"], dicts) == 2
+    assert dict_path.read_text(encoding="utf-8").splitlines() == [
+        "a,b",
+        "0,é",
+        "1,é",
+    ]
+
+
+def test_write_rows_to_csv_keeps_old_file_on_error(tmp_path):
+    """Rows that fail partway through shouldn't clobber the last good file."""
+    path = tmp_path / "rows.csv"
+    utils.write_rows_to_csv(path, [["old"]])
+
+    def rows():
+        yield ["new"]
+        raise ValueError("parse failed")
+
+    with pytest.raises(ValueError):
+        utils.write_rows_to_csv(path, rows())
+    assert path.read_text(encoding="utf-8").splitlines() == ["old"]
+    assert [p.name for p in tmp_path.iterdir()] == ["rows.csv"]
+
+    # Appending still adds to the file in place
+    utils.write_rows_to_csv(path, [["more"]], mode="a")
+    assert path.read_text(encoding="utf-8").splitlines() == ["old", "more"]
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep, so tests don't wait."""
+
+    def __init__(self):
+        """Initialize a new instance."""
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        """Get the current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the clock forward instead of waiting."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter(monkeypatch):
+    """Requests should be paced per host, after an initial burst."""
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(utils.time, "sleep", clock.sleep)
+
+    limiter = utils.RateLimiter(default_rate=2, host_rates={"slow.gov": 0.5})
+    for _ in range(3):
+        limiter.acquire("fast.gov")
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+    # A slow host gets one request every two seconds, and other hosts aren't held up
+    limiter.acquire("slow.gov")
+    limiter.acquire("slow.gov")
+    assert clock.sleeps[1:] == [pytest.approx(2)]
+
+    # A paused host waits out the pause
+    limiter.pause("fast.gov", 30)
+    limiter.acquire("fast.gov")
+    assert clock.sleeps[2:] == [pytest.approx(30)]
+
+
+def test_http_client_honors_retry_after(monkeypatch):
+    """A 429 with a Retry-After header should be retried once the host is ready."""
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(utils.time, "sleep", clock.sleep)
+
+    class TooManyAdapter(FakeAdapter):
+        def send(self, request, **kwargs):
+            response = super().send(request, **kwargs)
+            if len(self.sent) == 1:
+                response.status_code = 429
+                response.headers["Retry-After"] = "7"
+            return response
+
+    client = utils.HTTPClient(limiter=utils.RateLimiter(default_rate=0))
+    adapter = TooManyAdapter()
+    client.session.mount("https://", adapter)
+    assert client.get("https://example.com/a").status_code == 200
+    assert len(adapter.sent) == 2
+    assert clock.sleeps == [pytest.approx(7)]
+    assert utils._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert utils._parse_host_rates("a.gov=0.5, b.gov=3") == {"a.gov": 0.5, "b.gov": 3}
+
+
+class FlakyAdapter(FakeAdapter):
+    """A transport adapter that fails in a set way before it succeeds."""
+
+    def __init__(self, failures):
+        """Initialize a new instance."""
+        super().__init__()
+        self.failures = list(failures)
+
+    def send(self, request, **kwargs):
+        """Raise or return the next failure, if any are left."""
+        response = super().send(request, **kwargs)
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            response.status_code = failure
+        return response
+
+
+def test_http_client_retries(monkeypatch):
+    """Passing failures are retried and permanent ones aren't."""
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(utils.time, "sleep", clock.sleep)
+
+    def make_client(failures, **policy):
+        client = utils.HTTPClient(
+            limiter=utils.RateLimiter(default_rate=0),
+            retry_policy=utils.RetryPolicy(**policy),
+        )
+        adapter = FlakyAdapter(failures)
+        client.session.mount("https://", adapter)
+        return client, adapter
+
+    # A server error and a dropped connection are tried again
+    client, adapter = make_client([503, requests.ConnectionError("reset")])
+    assert client.get("https://example.com").status_code == 200
+    assert len(adapter.sent) == 3
+    assert client.request_count == 3
+
+    # A 404 is permanent
+    client, adapter = make_client([404])
+    with pytest.raises(requests.HTTPError):
+        utils.get_url("https://example.com", session=client.session)
+    assert len(adapter.sent) == 1
+
+    # A caller's own session is paced and retried by the shared client too
+    client, _ = make_client([])
+    monkeypatch.setattr(utils, "get_http_client", lambda: client)
+    session = requests.Session()
+    adapter = FlakyAdapter([503])
+    session.mount("https://", adapter)
+    assert utils.get_url("https://example.com", session=session).status_code == 200
+    assert len(adapter.sent) == 2
+    assert client.request_count == 2
+
+    # The last failure is returned once the attempts run out
+    client, adapter = make_client([500, 500, 500, 500], attempts=3)
+    assert client.get("https://example.com").status_code == 500
+    assert len(adapter.sent) == 3
+
+    # The retries stop when they'd wait longer than the budget allows
+    client, adapter = make_client([500, 500], base_delay=10, budget=0.001)
+    assert client.get("https://example.com").status_code == 500
+    assert len(adapter.sent) < 3
+
+
+def test_circuit_breaker(monkeypatch):
+    """A host that keeps failing is cut off until its cooldown passes."""
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", clock.monotonic)
+
+    breaker = utils.CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_failure("dead.gov")
+    breaker.check("dead.gov")
+    breaker.record_failure("dead.gov")
+    with pytest.raises(utils.CircuitOpenError):
+        breaker.check("dead.gov")
+    breaker.check("alive.gov")
+
+    # After the cooldown one request is let through to test the host
+    clock.now += 61
+    breaker.check("dead.gov")
+    with pytest.raises(utils.CircuitOpenError):
+        breaker.check("dead.gov")
+    breaker.record_success("dead.gov")
+    breaker.check("dead.gov")
+
+
+def test_http_client_deadline():
+    """Requests under a deadline should be cut short, or not sent once it has passed."""
+    client = utils.HTTPClient(limiter=utils.RateLimiter(0))
+    adapter = FakeAdapter()
+    client.session.mount("https://", adapter)
+
+    with utils.deadline(utils.Deadline.after(5, "zz")):
+        client.get("https://example.com/a")
+    _, kwargs = adapter.sent[0]
+    assert all(0 < t <= 5 for t in kwargs["timeout"])
+
+    with utils.deadline(utils.Deadline.after(-1, "zz")):
+        with pytest.raises(utils.DeadlineExceeded, match="zz"):
+            client.get("https://example.com/b")
+    assert len(adapter.sent) == 1
+    assert utils.get_deadline() is None
+
+
+def test_export_is_current(tmp_path):
+    """An export should be made again after a new download or a parser change."""
+    source = tmp_path / "source.csv"
+    export = tmp_path / "xx.csv"
+    source.write_text("a,b")
+    assert not utils.export_is_current(export, source, "1")
+
+    # A run that dies between the download and the stamp leaves it stale
+    export.write_text("a,b")
+    assert not utils.export_is_current(export, source, "1")
+
+    utils.stamp_export(export, "1")
+    os.utime(source, (0, 0))
+    assert utils.export_is_current(export, source, "1")
+    assert not utils.export_is_current(export, source, "2")
+
+    # A newer download than the stamp needs a new export
+    os.utime(source, None)
+    os.utime(tmp_path / ".xx.csv.version", (0, 0))
+    assert not utils.export_is_current(export, source, "1")
@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import typing
+import weakref
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPClient(utils.BaseHTTPClient):
+    """An asyncio HTTP client, for scrapers written as coroutines.
+
+    Requests follow the same rules as the synchronous HTTPClient, but they wait
+    on the event loop rather than blocking a thread, so a scraper can have many
+    in flight at once. Each response comes back as a requests.Response with its
+    body already read, so it can be handled the same way as any other.
+
+    Args:
+        user_agent (str): the default user-agent header (default: biglocalnews.org)
+        timeout (tuple): the default connect and read timeouts, in seconds
+        pool_maxsize (int): the most connections to keep open to a single host
+        limiter (RateLimiter): paces the requests to each host (default: a new RateLimiter)
+        retry_policy (RetryPolicy): when to retry failed requests (default: a new RetryPolicy)
+        breaker (CircuitBreaker): cuts off failing hosts (default: a new CircuitBreaker)
+    """
+
+    def __init__(
+        self,
+        user_agent: str = utils.USER_AGENT,
+        timeout: typing.Tuple[float, float] = utils.REQUEST_TIMEOUT,
+        pool_maxsize: int = utils.POOL_MAXSIZE,
+        limiter: typing.Optional[utils.RateLimiter] = None,
+        retry_policy: typing.Optional[utils.RetryPolicy] = None,
+        breaker: typing.Optional[utils.CircuitBreaker] = None,
+    ):
+        """Initialize a new instance."""
+        super().__init__(timeout, limiter, retry_policy, breaker)
+        self.user_agent = user_agent
+        self.pool_maxsize = pool_maxsize
+        self._session: typing.Optional["aiohttp.ClientSession"] = None
+
+    async def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Make an HTTP request and return the response.
+
+        Args:
+            method (str): the HTTP method to use, like GET or POST
+            url (str): the url to be requested
+            **kwargs: Additional arguments to pass to aiohttp. Like requests,
+                verify=False skips checking the site's certificate.
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        if kwargs.pop("verify", True) is False:
+            kwargs["ssl"] = False
+        host = urlsplit(url).hostname or ""
+        attempt, waited = 0, 0.0
+        while True:
+            attempt += 1
+            self._start_attempt(host)
+            await self._acquire(host)
+            kwargs["timeout"] = _client_timeout(
+                utils.timeout_before_deadline(timeout, url)
+            )
+            try:
+                response = await self._send(method, url, **kwargs)
+            except requests.RequestException as error:
+                delay = self._retry_after_error(host, url, error, attempt, waited)
+            else:
+                retry_delay = self._retry_after_response(
+                    host, url, response, attempt, waited
+                )
+                if retry_delay is None:
+                    break
+                delay = retry_delay
+
+            # Wait a bit and try again
+            await asyncio.sleep(delay)
+            waited += delay
+
+        self._finish(response)
+        self.count_bytes(len(response.content))
+        return response
+
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        """Make a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> requests.Response:
+        """Make a POST request."""
+        return await self.request("POST", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> requests.Response:
+        """Make a HEAD request. Like requests.head, redirects aren't followed."""
+        kwargs.setdefault("allow_redirects", False)
+        return await self.request("HEAD", url, **kwargs)
+
+    async def close(self):
+        """Close the client's connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _acquire(self, host: str):
+        """Wait, without blocking the event loop, until a request can be sent to a host."""
+        while True:
+            wait = self.limiter.try_acquire(host)
+            if wait <= 0:
+                return
+            logger.debug(f"Waiting {wait:.2f} seconds to request {host}")
+            await asyncio.sleep(wait)
+
+    async def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request with aiohttp, raising its errors as the requests equivalents."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers={"User-Agent": self.user_agent},
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_maxsize),
+            )
+        try:
+            async with self._session.request(method, url, **kwargs) as r:
+                body = await r.read()
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(f"Timed out requesting {url}") from e
+        except aiohttp.ClientPayloadError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e)) from e
+        except aiohttp.ClientSSLError as e:
+            raise requests.exceptions.SSLError(str(e)) from e
+        except aiohttp.ClientConnectionError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+        # Dress the response up like one from requests
+        response = requests.Response()
+        response.status_code = r.status
+        response.reason = r.reason or ""
+        response.headers = CaseInsensitiveDict(r.headers)
+        response.url = str(r.url)
+        response.encoding = r.charset
+        response._content = body
+        return response
+
+
+def _client_timeout(timeout) -> "aiohttp.ClientTimeout":
+    """Convert timeouts in the style of requests to aiohttp's."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+
+# The client shared by each event loop, dropped along with the loop
+_http_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> AsyncHTTPClient:
+    """Get the asyncio HTTP client shared by the event loop that's running, creating it if need be."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = AsyncHTTPClient()
+    return client
+
+
+async def close_http_client():
+    """Close the asyncio HTTP client shared by the event loop that's running, if it has one."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+async def get_url(url, user_agent=utils.USER_AGENT, **kwargs) -> requests.Response:
+    """Request the provided URL with asyncio and return a response object.
+
+    The request goes through the event loop's shared asyncio HTTP client,
+    which retries passing failures. Errors that remain raise a requests.HTTPError.
+
+    Args:
+        url (str): the url to be requested
+        user_agent (str): the user-agent header passed with the request (default: biglocalnews.org)
+    """
+    logger.debug(f"Requesting {url}")
+
+    # Set the headers
+    if "headers" not in kwargs:
+        kwargs["headers"] = {}
+    kwargs["headers"]["User-Agent"] = user_agent
+
+    # Go get it
+    response = await get_http_client().get(url, **kwargs)
+    logger.debug(f"Response code: {response.status_code}")
+
+    # Verify that the response is 200
+    response.raise_for_status()
+
+    # Return the response
+    return response
+
+
+async def to_thread(func, *args, **kwargs):
+    """Run a blocking function in a thread, so it doesn't hold up the event loop.
+
+    Like asyncio.to_thread, which Python 3.7 and 3.8 don't have, the function
+    sees the same context variables, like the deadline and journal of the task.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
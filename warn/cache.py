@@ -1,14 +1,65 @@
+import contextlib
 import csv
+import gzip
+import hashlib
+import io
+import json
 import logging
 import os
+import threading
+import time
 import typing
+from datetime import date
+from fnmatch import fnmatchcase
 from os.path import expanduser, join
 from pathlib import Path
 
-from .utils import get_url
+from . import aio
+from .cache_index import CacheIndex, _scraper_from_key
+from .utils import atomic_open, file_lock, get_http_client, get_url
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+# Whether caches keep a SQLite index of their files by default
+CACHE_INDEX = os.environ.get("WARN_CACHE_INDEX", "").lower() in ("1", "true", "yes")
+
+# How caches compress the pages they write by default: "gzip", "zstd" or not at all
+CACHE_COMPRESSION = os.environ.get("WARN_CACHE_COMPRESSION", "").lower() or None
+
+# The suffix added to the files written with each kind of compression
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# How many lock files the keys in a cache are spread across
+LOCK_STRIPES = 256
+
+# How many of the most recent years, counting the current one, can still be revised
+OPEN_YEARS = 2
+
+
+def is_settled_year(year, today: typing.Optional[date] = None) -> bool:
+    """Test whether the notices for a year are old enough to no longer change.
+
+    The current year and the one before it are still open to revisions and late
+    filings. Anything older is treated as immutable history.
+
+    Args:
+        year (int or str): the year to test. Values that aren't a year aren't settled.
+        today (date): the date to test against (default: today)
+
+    Returns: True if the year is settled
+    """
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return False
+    today = today or date.today()
+    return year <= today.year - OPEN_YEARS
+
 
 class Cache:
     """Basic interface to save files to and fetch from cache.
@@ -30,19 +81,69 @@ class Cache:
 
             cache.files('fl')
 
+    With an index, each file's URL, fetch time, size, hash and HTTP validators
+    are kept in a SQLite database under the cache's .meta directory, and
+    exists, files and is_fresh look there instead of at the filesystem.
+    The index is kept up to date by write, write_bytes and download, so files
+    saved to the cache directory by other means aren't seen. A file removed by
+    other means is dropped from the index when it's next looked up.
+
+    With compression, the text saved by write is stored gzip or zstd compressed,
+    with a .gz or .zst suffix, and read, read_csv, exists and files treat it
+    as if it were not. Downloaded files are stored as they are, since they are
+    opened by path.
+
+    Files are written to a temporary file and renamed into place, so a crash
+    never leaves a partial file behind. Writing or fetching a file holds a lock
+    on its name that is shared with other threads and processes using the same
+    cache, so concurrent workers after the same file fetch it once.
+
     Args:
         path (str): Full path to cache directory. Defaults to WARN_ETL_DIR
             or, if env var not specified, $HOME/.warn-scraper/cache
+        index (bool): Whether to keep an index of the cache's files. Defaults to
+            the WARN_CACHE_INDEX env var, or False.
+        scraper (str): The scraper to credit in the index for the files saved.
+            Defaults to the top-level directory of each file.
+        compression (str): How to compress the text saved by write, "gzip" or "zstd".
+            False turns it off. Defaults to the WARN_CACHE_COMPRESSION env var,
+            or no compression.
     """
 
-    def __init__(self, path=None):
+    # Where the validators for downloaded files are kept, relative to the cache dir
+    meta_dir = ".meta"
+
+    # Directories of files the scrapers keep for themselves, like pack files and
+    # parsed PDFs, which aren't cached pages and are left out of the index
+    internal_dirs = ("packs", "parsed_pdfs")
+
+    def __init__(self, path=None, index=None, scraper=None, compression=None):
         """Initialize a new instance."""
         self.root_dir = self._path_from_env or self._path_default
         self.path = path or str(Path(self.root_dir, "cache"))
+        self.scraper = scraper
+        self.compression = (
+            CACHE_COMPRESSION if compression is None else compression or None
+        )
+        if self.compression and self.compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown cache compression {self.compression}")
+        if self.compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        self.index = None
+        if CACHE_INDEX if index is None else index:
+            self.index = CacheIndex(
+                Path(self.path),
+                Path(self.path, self.meta_dir, "index.sqlite3"),
+                suffixes=tuple(COMPRESSION_SUFFIXES.values()),
+                skip_dirs=(self.meta_dir,) + self.internal_dirs,
+            )
+        self._local = threading.local()
 
     def exists(self, name):
         """Test whether the provided file path exists."""
-        return Path(self.path, name).exists()
+        if self.index is not None:
+            return self._index_entry(name) is not None
+        return self._stored_file(name)[0].exists()
 
     def read(self, name):
         """Read text file from cache.
@@ -53,11 +154,104 @@ class Cache:
         Returns:
             File content as string or error if file doesn't
         """
-        path = Path(self.path, name)
+        path, compression = self._stored_file(name)
         logger.debug(f"Reading from cache {path}")
+        if compression:
+            with open(path, "rb") as infile:
+                return _decompress(infile.read(), compression).decode("utf-8")
         with open(path, newline="") as infile:
             return infile.read()
 
+    def is_fresh(
+        self,
+        name: str,
+        max_age: typing.Optional[float] = None,
+        immutable: bool = False,
+    ) -> bool:
+        """Test whether a cached file can be used without fetching it again.
+
+        Args:
+            name (str): Partial name, relative to cache dir (eg. 'fl/2021_page_1.html')
+            max_age (float): Seconds a cached file stays fresh. Optional. By default
+                a file that isn't immutable is always refetched.
+            immutable (bool): Whether the source never changes once cached, as with
+                a settled year. See is_settled_year.
+
+        Returns: True if the cached copy exists and is fresh
+        """
+        if self.index is not None:
+            entry = self._index_entry(name)
+            if entry is None:
+                return False
+            fetched_at = entry["fetched_at"]
+        else:
+            path, _ = self._stored_file(name)
+            if not path.exists() or not self._is_intact(name, path):
+                return False
+            fetched_at = path.stat().st_mtime
+        if immutable:
+            return True
+        if max_age is None:
+            return False
+        return time.time() - fetched_at < max_age
+
+    def get_or_fetch(
+        self,
+        name: str,
+        url: str,
+        max_age: typing.Optional[float] = None,
+        immutable: bool = False,
+        **kwargs,
+    ) -> str:
+        """Read a page from the cache if it is fresh, otherwise fetch and cache it.
+
+        Args:
+            name (str): Partial name, relative to cache dir (eg. 'fl/2021_page_1.html')
+            url (str): The URL to request
+            max_age (float): Seconds a cached page stays fresh. See is_fresh.
+            immutable (bool): Whether the page never changes once cached. See is_fresh.
+            **kwargs: Additional arguments to pass to utils.get_url()
+
+        Returns: The text of the page
+        """
+        if self.is_fresh(name, max_age=max_age, immutable=immutable):
+            return self.read(name)
+        with self.lock(name):
+            # Another worker may have fetched it while we waited
+            if self.is_fresh(name, max_age=max_age, immutable=immutable):
+                return self.read(name)
+            html = get_url(url, **kwargs).text
+            self.write(name, html, url=url)
+        return html
+
+    def get_or_download(
+        self,
+        name: str,
+        url: str,
+        max_age: typing.Optional[float] = None,
+        immutable: bool = False,
+        **kwargs,
+    ) -> Path:
+        """Use a file from the cache if it is fresh, otherwise download it.
+
+        Args:
+            name (str): The path where the file will be saved. Can be a simple string like "ia/data.xlsx"
+            url (str): The URL to download
+            max_age (float): Seconds a cached file stays fresh. See is_fresh.
+            immutable (bool): Whether the file never changes once cached. See is_fresh.
+            **kwargs: Additional arguments to pass to download()
+
+        Returns: The Path where the file was saved
+        """
+        if self.is_fresh(name, max_age=max_age, immutable=immutable):
+            logger.debug(f"Using cached {name}")
+            return Path(self.path, name)
+        with self.lock(name):
+            # Another worker may have downloaded it while we waited
+            if self.is_fresh(name, max_age=max_age, immutable=immutable):
+                return Path(self.path, name)
+            return self.download(name, url, **kwargs)
+
     def read_csv(self, name):
         """Read csv file from cache.
 
@@ -67,7 +261,9 @@ class Cache:
         Returns:
             list of rows
         """
-        path = Path(self.path, name)
+        path, compression = self._stored_file(name)
+        if compression:
+            return list(csv.reader(io.StringIO(self.read(name), newline="")))
         logger.debug(f"Reading CSV from cache {path}")
         with open(path) as fh:
             return list(csv.reader(fh))
@@ -78,17 +274,60 @@ class Cache:
         """
         Download the provided URL and save it in the cache.
 
+        If the file was downloaded before, the server is asked to send it only
+        if it has changed since. See download_if_modified for details.
+
         Args:
             name (str): The path where the file will be saved. Can be a simple string like "ia/data.xlsx"
             url (str): The URL to download
             encoding (str): The encoding of the response. Optional.
-            **kwargs: Additional arguments to pass to requests.get()
+            **kwargs: Additional arguments to pass to utils.get_url()
 
         Returns: The Path where the file was saved
         """
+        out_path, _ = self.download_if_modified(name, url, encoding=encoding, **kwargs)
+        return out_path
+
+    def download_if_modified(
+        self, name: str, url: str, encoding: typing.Optional[str] = None, **kwargs
+    ) -> typing.Tuple[Path, bool]:
+        """
+        Download the provided URL into the cache unless the cached copy is current.
+
+        The ETag, Last-Modified date and size of each download are kept in a
+        sidecar file under the cache's .meta directory. When the same URL is
+        downloaded again they are sent back as If-None-Match and If-Modified-Since
+        headers, and a 304 Not Modified response leaves the cached file as it is.
+
+        Args:
+            name (str): The path where the file will be saved. Can be a simple string like "ia/data.xlsx"
+            url (str): The URL to download
+            encoding (str): The encoding of the response. Optional.
+            **kwargs: Additional arguments to pass to utils.get_url()
+
+        Returns: The Path where the file was saved, and whether its contents changed
+        """
+        with self.lock(name):
+            return self._download_if_modified(name, url, encoding, **kwargs)
+
+    def _download_if_modified(
+        self, name: str, url: str, encoding: typing.Optional[str] = None, **kwargs
+    ) -> typing.Tuple[Path, bool]:
+        """Download the provided URL into the cache, holding the lock on its name."""
+        out_path = Path(self.path, name)
+        validators = self._read_validators(name, url)
+
+        # Ask for the file only if it has changed since we last saw it
+        headers = _conditional_headers(validators, kwargs.pop("headers", None))
+
         # Request the URL
         logger.debug(f"Downloading {url}")
-        with get_url(url, stream=True, **kwargs) as r:
+        with get_url(url, stream=True, headers=headers, **kwargs) as r:
+            # If the server says nothing has changed, keep what we have
+            if r.status_code == 304:
+                logger.debug(f"{url} is unchanged, using {out_path}")
+                return out_path, False
+
             # If there's no encoding, set it
             if encoding:
                 r.encoding = encoding
@@ -96,19 +335,95 @@ class Cache:
                 r.encoding = "utf-8"
 
             # Open the local Path
-            out_path = Path(self.path, name)
             out_path.parent.mkdir(parents=True, exist_ok=True)
             logger.debug(f"Writing to {out_path}")
 
             # Write out the file in little chunks
-            with open(out_path, "wb") as f:
+            client = get_http_client()
+            digest = hashlib.sha256()
+            size = 0
+            with atomic_open(out_path, "wb") as f:
                 for chunk in r.iter_content(chunk_size=8192):
                     f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    client.count_bytes(len(chunk))
+
+                # Make sure we got the whole thing before it replaces our copy
+                _check_length(url, r.headers, size)
+
+            # Remember how to ask for it next time
+            sha256 = digest.hexdigest()
+            self._write_validators(
+                name,
+                {
+                    "url": url,
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "content_length": size,
+                    "sha256": sha256,
+                },
+            )
+
+        # Return the path, and whether it differs from the copy we had before
+        return out_path, sha256 != validators.get("sha256")
+
+    async def download_async(self, name: str, url: str, **kwargs) -> Path:
+        """
+        Download the provided URL and save it in the cache, with asyncio.
+
+        Like download, the server is asked to send the file only if it has
+        changed since it was last downloaded. The body is read into memory
+        before it's saved, so this is best kept to pages rather than big files.
+
+        Args:
+            name (str): The path where the file will be saved. Can be a simple string like "ia/data.xlsx"
+            url (str): The URL to download
+            **kwargs: Additional arguments to pass to aio.get_url()
+
+        Returns: The Path where the file was saved
+        """
+        out_path = Path(self.path, name)
+        validators = self._read_validators(name, url)
+        headers = _conditional_headers(validators, kwargs.pop("headers", None))
 
-        # Return the path
+        # Request the URL
+        logger.debug(f"Downloading {url}")
+        r = await aio.get_url(url, headers=headers, **kwargs)
+
+        # If the server says nothing has changed, keep what we have
+        if r.status_code == 304:
+            logger.debug(f"{url} is unchanged, using {out_path}")
+            return out_path
+
+        # Make sure we got the whole thing before it replaces our copy
+        content = r.content
+        _check_length(url, r.headers, len(content))
+
+        # Save it off the event loop, since the lock can keep it waiting on other processes
+        await aio.to_thread(self._save_download, name, url, content, r.headers)
         return out_path
 
-    def write(self, name, content):
+    def _save_download(self, name: str, url: str, content: bytes, headers):
+        """Save a downloaded file to the cache, and remember how to ask for it next time."""
+        out_path = Path(self.path, name)
+        with self.lock(name):
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            logger.debug(f"Writing to {out_path}")
+            with atomic_open(out_path, "wb") as f:
+                f.write(content)
+            self._write_validators(
+                name,
+                {
+                    "url": url,
+                    "etag": headers.get("ETag"),
+                    "last_modified": headers.get("Last-Modified"),
+                    "content_length": len(content),
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                },
+            )
+
+    def write(self, name, content, url=None):
         """Save file contents to cache.
 
         Typically, this should be a state-specific directory
@@ -130,14 +445,76 @@ class Cache:
         Args:
             name (str): Partial name, relative to cache dir, where content should be saved.
             content (str): Any string content to save to file.
+            url (str): The URL the content came from, to note in the index. Optional.
+        """
+        out = Path(self.path, name)
+        if self.compression:
+            out = out.with_name(out.name + COMPRESSION_SUFFIXES[self.compression])
+        out.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f"Writing to cache {out}")
+        with self.lock(name):
+            if self.compression:
+                with atomic_open(out, "wb") as fh:
+                    fh.write(_compress(content.encode("utf-8"), self.compression))
+            else:
+                with atomic_open(out, "w", newline="") as fh:
+                    fh.write(content)
+
+            # Clear out any copy saved with other compression, so it can't be read instead
+            for path, _ in self._stored_files(name):
+                if path != out:
+                    path.unlink()
+
+            if self.index is not None:
+                self._record(
+                    name, url=url, sha256=hashlib.sha256(content.encode()).hexdigest()
+                )
+        return str(out)
+
+    def write_bytes(self, name: str, content: bytes, url=None) -> str:
+        """Save a binary file, like a PDF or spreadsheet, to the cache.
+
+        Like downloaded files, it is stored uncompressed, so it can be opened by path.
+
+        Args:
+            name (str): Partial name, relative to cache dir, where content should be saved.
+            content (bytes): The file's contents.
+            url (str): The URL the content came from, to note in the index. Optional.
         """
         out = Path(self.path, name)
         out.parent.mkdir(parents=True, exist_ok=True)
         logger.debug(f"Writing to cache {out}")
-        with open(out, "w", newline="") as fh:
-            fh.write(content)
+        with self.lock(name):
+            with atomic_open(out, "wb") as fh:
+                fh.write(content)
+            if self.index is not None:
+                self._record(name, url=url, sha256=hashlib.sha256(content).hexdigest())
         return str(out)
 
+    @contextlib.contextmanager
+    def lock(self, name: str):
+        """Hold the lock on a name in the cache while it is fetched or written.
+
+        The lock is shared with every thread and process using this cache
+        directory. Names are spread over a fixed set of lock files, and a thread
+        that already holds a lock file can take it again.
+
+        Args:
+            name (str): Partial name, relative to cache dir (eg. 'fl/2021_page_1.html')
+        """
+        digest = hashlib.blake2b(_key(name).encode(), digest_size=4).digest()
+        stripe = int.from_bytes(digest, "big") % LOCK_STRIPES
+        held = self._local.__dict__.setdefault("held", set())
+        if stripe in held:
+            yield
+            return
+        with file_lock(Path(self.path, self.meta_dir, "locks", f"{stripe}.lock")):
+            held.add(stripe)
+            try:
+                yield
+            finally:
+                held.discard(stripe)
+
     def files(self, subdir=".", glob_pattern="*"):
         """
         Retrieve all files and folders in a subdir relative to cache dir.
@@ -160,7 +537,131 @@ class Cache:
             glob_pattern (str): Glob pattern. Defaults to all files in specified subdir ('*')
         """
         _dir = Path(self.path).joinpath(subdir)
-        return [str(p) for p in _dir.glob(glob_pattern)]
+
+        # List the children of the subdir from the index, if the pattern allows
+        if (
+            self.index is not None
+            and "/" not in glob_pattern
+            and "**" not in glob_pattern
+        ):
+            prefix = _key(_dir.relative_to(self.path))
+            prefix = "" if prefix == "." else f"{prefix}/"
+            children = {k[len(prefix) :].split("/")[0] for k in self.index.keys(prefix)}
+            return [
+                str(_dir / c) for c in sorted(children) if fnmatchcase(c, glob_pattern)
+            ]
+
+        paths = [p for p in _dir.glob(glob_pattern) if self.meta_dir not in p.parts]
+
+        # List compressed files under the names they were saved with
+        if self.compression:
+            suffixes = tuple(COMPRESSION_SUFFIXES.values())
+            paths = [p for p in paths if not p.name.endswith(suffixes)]
+            for suffix in suffixes:
+                for p in _dir.glob(glob_pattern + suffix):
+                    if self.meta_dir not in p.parts:
+                        paths.append(p.with_name(p.name[: -len(suffix)]))
+            paths = list(dict.fromkeys(paths))
+        return [str(p) for p in paths]
+
+    def _index_entry(self, name: str) -> typing.Optional[dict]:
+        """Get a file's entry in the index, dropping it if the file is gone from disk."""
+        key = _key(name)
+        entry = self.index.get(key)
+        if entry is not None and not self._stored_files(name):
+            logger.debug(f"Dropping {key} from the index, since its file is gone")
+            self.index.remove(key)
+            return None
+        return entry
+
+    def _record(self, name: str, **fields):
+        """Note a file that was just saved in the index."""
+        key = _key(name)
+        fields.setdefault("scraper", self.scraper or _scraper_from_key(key))
+        path, _ = self._stored_file(name)
+        self.index.record(key, size=path.stat().st_size, **fields)
+
+    def _stored_files(
+        self, name: str
+    ) -> typing.List[typing.Tuple[Path, typing.Optional[str]]]:
+        """List the files on disk holding a name, with how each is compressed."""
+        path = Path(self.path, name)
+        candidates = [(path, None)] + [
+            (path.with_name(path.name + suffix), compression)
+            for compression, suffix in COMPRESSION_SUFFIXES.items()
+        ]
+        return [(p, c) for p, c in candidates if p.exists()]
+
+    def _stored_file(self, name: str) -> typing.Tuple[Path, typing.Optional[str]]:
+        """Get the file on disk holding a name, and how it is compressed.
+
+        If there's no such file, the uncompressed path is returned.
+        """
+        stored = self._stored_files(name)
+        return stored[0] if stored else (Path(self.path, name), None)
+
+    def _is_intact(self, name: str, path: Path) -> bool:
+        """Check a cached file against the size it was downloaded at, if known."""
+        meta_path = self._validators_path(name)
+        if path != Path(self.path, name) or not meta_path.exists():
+            return True
+        try:
+            with open(meta_path) as fh:
+                validators = json.load(fh)
+        except ValueError:
+            return True
+        if validators.get("content_length") not in (None, path.stat().st_size):
+            logger.debug(f"Ignoring {path}, which isn't the size it was downloaded at")
+            return False
+        return True
+
+    def _validators_path(self, name: str) -> Path:
+        """Get the path of the sidecar file holding a download's validators."""
+        return Path(self.path, self.meta_dir, f"{name}.json")
+
+    def _read_validators(self, name: str, url: str) -> dict:
+        """Read the validators saved for a cached download.
+
+        Nothing is returned if the file is missing, was fetched from another URL
+        or has been changed on disk since it was downloaded.
+        """
+        out_path = Path(self.path, name)
+        if self.index is not None:
+            entry = self.index.get(_key(name))
+            if entry is None or not out_path.exists():
+                return {}
+            validators = dict(entry, content_length=entry["size"])
+        else:
+            meta_path = self._validators_path(name)
+            if not out_path.exists() or not meta_path.exists():
+                return {}
+            try:
+                with open(meta_path) as fh:
+                    validators = json.load(fh)
+            except ValueError:
+                logger.debug(f"Ignoring unreadable cache metadata {meta_path}")
+                return {}
+        if validators.get("url") != url:
+            return {}
+        if validators.get("content_length") != out_path.stat().st_size:
+            return {}
+        return validators
+
+    def _write_validators(self, name: str, validators: dict):
+        """Save the validators for a cached download."""
+        if self.index is not None:
+            self._record(
+                name,
+                url=validators["url"],
+                sha256=validators["sha256"],
+                etag=validators["etag"],
+                last_modified=validators["last_modified"],
+            )
+            return
+        meta_path = self._validators_path(name)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(meta_path, "w") as fh:
+            json.dump(validators, fh)
 
     @property
     def _path_from_env(self):
@@ -171,3 +672,42 @@ class Cache:
     def _path_default(self):
         """Get the default filesystem location of the cache."""
         return join(expanduser("~"), ".warn-scraper")
+
+
+def _key(name) -> str:
+    """Convert a partial name in the cache to its key in the index."""
+    return Path(name).as_posix()
+
+
+def _conditional_headers(
+    validators: dict, headers: typing.Optional[dict] = None
+) -> dict:
+    """Add the headers that ask for a file only if it has changed since it was saved."""
+    headers = dict(headers or {})
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _check_length(url: str, headers, size: int):
+    """Raise an OSError if a download came up short of its Content-Length."""
+    expected = headers.get("Content-Length")
+    encoded = headers.get("Content-Encoding", "identity") != "identity"
+    if expected and not encoded and int(expected) != size:
+        raise OSError(f"Download of {url} was cut short at {size} of {expected} bytes")
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    """Compress bytes to be saved in the cache."""
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    """Decompress bytes read from the cache."""
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
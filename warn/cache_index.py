@@ -0,0 +1,202 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# The columns kept for every cached file, in table order
+COLUMNS = [
+    "key",
+    "url",
+    "fetched_at",
+    "size",
+    "sha256",
+    "etag",
+    "last_modified",
+    "scraper",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT,
+    fetched_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    scraper TEXT
+)
+"""
+
+
+class CacheIndex:
+    """A SQLite index of the files saved in a cache directory.
+
+    Each file's key is stored with the URL it came from, when it was fetched,
+    its size and content hash, the HTTP validators the server sent with it and
+    the scraper that saved it. Lookups by key or key prefix use the table's
+    primary key, so they don't touch the filesystem.
+
+    The first time an index is opened for an existing cache, it is filled in
+    from the files already on disk.
+
+    Args:
+        root (Path): the cache directory to index
+        db_path (Path): where the database is kept
+        suffixes (tuple): suffixes of compressed files, which are indexed without them
+        skip_dirs (tuple): names of directories, at any depth, whose files aren't indexed
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        db_path: Path,
+        suffixes: typing.Tuple[str, ...] = (),
+        skip_dirs: typing.Tuple[str, ...] = (),
+    ):
+        """Initialize a new instance."""
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.suffixes = suffixes
+        self.skip_dirs = skip_dirs
+        self._lock = threading.Lock()
+        self._connection: typing.Optional[sqlite3.Connection] = None
+        self._connection_pid: typing.Optional[int] = None
+
+    def get(self, key: str) -> typing.Optional[dict]:
+        """Get the entry for a key, if it has one."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM entries WHERE key = ?", (key,)
+                )
+                .fetchone()
+            )
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def exists(self, key: str) -> bool:
+        """Test whether a key is in the index."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT 1 FROM entries WHERE key = ?", (key,))
+                .fetchone()
+            )
+        return row is not None
+
+    def keys(self, prefix: str = "") -> typing.List[str]:
+        """List the keys that start with the provided prefix, in sorted order."""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key",
+                    (prefix, prefix + "\uffff"),
+                )
+                .fetchall()
+            )
+        return [row[0] for row in rows]
+
+    def record(self, key: str, **fields):
+        """Add or replace the entry for a key.
+
+        Args:
+            key (str): the file's path, relative to the cache directory
+            **fields: values for the other columns. fetched_at defaults to now.
+        """
+        fields.setdefault("fetched_at", time.time())
+        values = [key] + [fields.get(c) for c in COLUMNS[1:]]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO entries ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                    values,
+                )
+
+    def remove(self, key: str):
+        """Drop the entry for a key."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def stats(self) -> typing.List[dict]:
+        """Summarize the index by scraper.
+
+        Returns: a dict for each scraper with its file count, total bytes
+            and the times of its oldest and newest fetches
+        """
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT scraper, COUNT(*), SUM(size), MIN(fetched_at), MAX(fetched_at) "
+                    "FROM entries GROUP BY scraper ORDER BY scraper"
+                )
+                .fetchall()
+            )
+        keys = ["scraper", "files", "bytes", "oldest", "newest"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating and filling it in if need be.
+
+        A forked worker process opens its own connection rather than sharing its parent's.
+        """
+        if self._connection is None or self._connection_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.db_path), timeout=30, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(SCHEMA)
+                version = connection.execute("PRAGMA user_version").fetchone()[0]
+                if version == 0:
+                    self._backfill(connection)
+                    connection.execute("PRAGMA user_version = 1")
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _backfill(self, connection: sqlite3.Connection):
+        """Add the files already in the cache directory to a new index."""
+        logger.debug(f"Indexing the files in {self.root}")
+        meta_dir = self.db_path.parent
+        rows = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # Leave out the index's own directory and the ones that aren't cached pages
+            dirnames[:] = [
+                d
+                for d in dirnames
+                if d not in self.skip_dirs and Path(dirpath, d) != meta_dir
+            ]
+            for filename in filenames:
+                path = Path(dirpath, filename)
+                key = path.relative_to(self.root).as_posix()
+                for suffix in self.suffixes:
+                    if key.endswith(suffix):
+                        key = key[: -len(suffix)]
+                stat = path.stat()
+                rows.append((key, stat.st_mtime, stat.st_size, _scraper_from_key(key)))
+        connection.executemany(
+            "INSERT OR IGNORE INTO entries (key, fetched_at, size, scraper) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        logger.debug(f"Indexed {len(rows)} files")
+
+
+def _scraper_from_key(key: str) -> typing.Optional[str]:
+    """Guess the scraper that saved a key from its top-level directory."""
+    if "/" not in key:
+        return None
+    return key.split("/", 1)[0]
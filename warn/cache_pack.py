@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import typing
+from pathlib import Path
+
+from .utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class PackFile:
+    """An append-only file holding many small cached pages.
+
+    Each page's bytes are appended to a segment file ending in .pack, and a line
+    with its key, offset, length and compression is appended to a .idx file
+    beside it. The index is read into memory when the pack is opened, so a
+    page can be read with a single seek. A page saved again is appended anew
+    and the old copy is left behind until the pack is compacted. Writes hold
+    a lock file, so processes sharing the pack don't interleave their pages.
+
+    Reads don't take the lock. The index is loaded along with an open handle
+    on the segment file, and a page's bytes never move within that file, so
+    threads can read side by side. Compaction writes a new segment file, and
+    the index is loaded again once it changes.
+
+    Args:
+        path (Path): the path of the segment file, without its suffix
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a new instance."""
+        self.data_path = Path(path).with_suffix(".pack")
+        self.index_path = Path(path).with_suffix(".idx")
+        self.lock_path = Path(path).with_suffix(".lock")
+        self._lock = threading.Lock()
+        self._entries: typing.Optional[
+            typing.Dict[str, typing.Tuple[int, int, str]]
+        ] = None
+        self._signature: typing.Optional[typing.Tuple[int, int]] = None
+        self._data_fh: typing.Optional[typing.BinaryIO] = None
+        self._stale_bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        """Test whether a page is in the pack."""
+        with self._lock:
+            return key in self._load()
+
+    def keys(self) -> typing.List[str]:
+        """List the keys of the pages in the pack, in sorted order."""
+        with self._lock:
+            return sorted(self._load())
+
+    @property
+    def stale_bytes(self) -> int:
+        """Count the bytes held by old copies of pages that have been saved again."""
+        with self._lock:
+            self._load()
+            return self._stale_bytes
+
+    def read(self, key: str) -> typing.Tuple[bytes, str]:
+        """Read a page from the pack.
+
+        Returns: the page's bytes and the compression they were saved with, if any
+        """
+        with self._lock:
+            offset, length, compression = self._load()[key]
+            fh = self._data_fh
+            assert fh is not None
+            if not hasattr(os, "pread"):
+                fh.seek(offset)
+                return fh.read(length), compression
+        return os.pread(fh.fileno(), length, offset), compression
+
+    def write(self, key: str, data: bytes, compression: str = ""):
+        """Append a page to the pack."""
+        with self._lock, file_lock(self.lock_path):
+            entries = self._load(locked=True)
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.data_path, "ab") as fh:
+                offset = fh.seek(0, os.SEEK_END)
+                fh.write(data)
+            # The index is written last, so a crash mid-write leaves no entry behind
+            with open(self.index_path, "a", encoding="utf-8") as fh:
+                fh.write(f"{key}\t{offset}\t{len(data)}\t{compression}\n")
+            if key in entries:
+                self._stale_bytes += entries[key][1]
+            entries[key] = (offset, len(data), compression)
+            self._signature = _signature(self.index_path)
+            if self._data_fh is None:
+                self._data_fh = open(self.data_path, "rb")
+
+    def compact(self, min_stale_ratio: float = 0.0) -> int:
+        """Rewrite the pack with only the latest copy of each page.
+
+        Args:
+            min_stale_ratio (float): Leave the pack alone unless more than this share
+                of it is old copies of pages. By default, any old copy will do.
+
+        Returns: the number of bytes freed
+        """
+        with self._lock, file_lock(self.lock_path):
+            entries = self._load(locked=True)
+            if not self.data_path.exists():
+                return 0
+            before = self.data_path.stat().st_size
+            if self._stale_bytes <= min_stale_ratio * before:
+                return 0
+            data_tmp = self.data_path.with_suffix(".pack.tmp")
+            index_tmp = self.index_path.with_suffix(".idx.tmp")
+            compacted = {}
+            with open(self.data_path, "rb") as src, open(data_tmp, "wb") as dest, open(
+                index_tmp, "w", encoding="utf-8"
+            ) as index:
+                for key, (offset, length, compression) in sorted(entries.items()):
+                    src.seek(offset)
+                    new_offset = dest.tell()
+                    dest.write(src.read(length))
+                    index.write(f"{key}\t{new_offset}\t{length}\t{compression}\n")
+                    compacted[key] = (new_offset, length, compression)
+            self._close_data()
+            os.replace(data_tmp, self.data_path)
+            os.replace(index_tmp, self.index_path)
+            self._entries = compacted
+            self._signature = _signature(self.index_path)
+            self._data_fh = open(self.data_path, "rb")
+            self._stale_bytes = 0
+            freed = before - self.data_path.stat().st_size
+        logger.debug(f"Compacted {self.data_path}, freeing {freed:,} bytes")
+        return freed
+
+    def _load(self, locked=False) -> typing.Dict[str, typing.Tuple[int, int, str]]:
+        """Read the index into memory, again if another process has changed it.
+
+        The index and segment file are opened under the lock, so a compaction
+        in another process can't swap one without the other.
+        """
+        signature = _signature(self.index_path)
+        if self._entries is not None and signature == self._signature:
+            return self._entries
+        if not locked:
+            with file_lock(self.lock_path):
+                return self._load(locked=True)
+        self._close_data()
+        self._entries = {}
+        self._stale_bytes = 0
+        self._signature = signature = _signature(self.index_path)
+        if signature is not None:
+            try:
+                self._data_fh = open(self.data_path, "rb")
+                size = os.fstat(self._data_fh.fileno()).st_size
+            except FileNotFoundError:
+                size = 0
+            with open(self.index_path, encoding="utf-8") as fh:
+                for line in fh:
+                    parts = line.rstrip("\n").split("\t")
+                    # Skip lines cut short by a crash and pages that never landed
+                    if not line.endswith("\n") or len(parts) != 4:
+                        continue
+                    key, offset, length, compression = parts
+                    if int(offset) + int(length) > size:
+                        continue
+                    # A page saved again leaves its old copy behind
+                    if key in self._entries:
+                        self._stale_bytes += self._entries[key][1]
+                    self._entries[key] = (int(offset), int(length), compression)
+        return self._entries
+
+    def _close_data(self):
+        """Let go of the handle on the segment file.
+
+        A thread still reading from it holds its own reference, and the file
+        is closed once that read is done.
+        """
+        self._data_fh = None
+
+
+def _signature(path: Path) -> typing.Optional[typing.Tuple[int, int]]:
+    """Get a file's inode and size, which change when it is appended to or replaced."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size
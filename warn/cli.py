@@ -1,4 +1,6 @@
 import logging
+import sys
+import typing
 from pathlib import Path
 
 import click
@@ -25,6 +27,30 @@ from . import Runner, utils
     default=False,
     help="Delete generated files from the cache",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of scrapers to run at the same time",
+)
+@click.option(
+    "--deadline",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="The most seconds each scraper may run",
+)
+@click.option(
+    "--run-deadline",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="The most seconds the whole run may take",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=False,
+    help="Pick up where the last run stopped, skipping the work it finished",
+)
 @click.option(
     "--log-level",
     "-l",
@@ -39,6 +65,10 @@ def main(
     data_dir: Path,
     cache_dir: Path,
     delete: bool,
+    jobs: int,
+    deadline: typing.Optional[float],
+    run_deadline: typing.Optional[float],
+    resume: bool,
     log_level: str,
 ):
     """
@@ -69,10 +99,18 @@ def main(
     if "all" in scrapers:
         scrapers = utils.get_all_scrapers()
 
-    # Loop through the states
-    for scrape in scrapers:
-        # Try running the scraper
-        runner.scrape(scrape)
+    # Run the scrapers, a few at a time if asked
+    _, failures = runner.scrape_many(
+        scrapers,
+        workers=jobs,
+        deadline=deadline,
+        run_deadline=run_deadline,
+        resume=resume,
+    )
+
+    # Exit with an error if any of them fell over
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
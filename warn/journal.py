@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import json
+import logging
+import time
+import typing
+from pathlib import Path
+
+from .utils import file_lock, in_asyncio_task
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """A record of the work finished during a run, so a stopped run can pick up where it left off.
+
+    Each state that finishes is added to a JSON lines file as it's done, along
+    with the finished units of work inside long scrapers, like a year of search
+    results or a page of a listing. An entry can carry details, like the path
+    where a unit's output was saved. Worker processes can share a journal,
+    since lines are added under a lock.
+
+    Args:
+        path (Path): the journal file
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a new instance."""
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self._entries: typing.Optional[
+            typing.Dict[typing.Tuple[str, typing.Optional[str]], dict]
+        ] = None
+
+    def reset(self):
+        """Forget the work of earlier runs."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+        self._entries = {}
+
+    def get(
+        self, state: str, unit: typing.Optional[str] = None
+    ) -> typing.Optional[dict]:
+        """Get the entry for a finished state, or a finished unit of one, if there is one."""
+        return self._load().get((state, unit))
+
+    def record(self, state: str, unit: typing.Optional[str] = None, **details):
+        """Add a finished state, or a finished unit of one.
+
+        Args:
+            state (str): the two-letter postal code of the state
+            unit (str): the name of the unit of work, or None for the whole state
+            **details: other values to save with the entry, like a path
+        """
+        entry = dict(details, state=state, unit=unit, finished_at=time.time())
+        line = json.dumps(entry, default=str)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        self._load()[(state, unit)] = entry
+
+    def _load(self) -> typing.Dict[typing.Tuple[str, typing.Optional[str]], dict]:
+        """Read the journal into memory, if it hasn't been already."""
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                with open(self.path, encoding="utf-8") as fh:
+                    for line in fh:
+                        # Skip a line cut short when the last run died
+                        if not line.endswith("\n"):
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._entries[(entry["state"], entry["unit"])] = entry
+        return self._entries
+
+
+_active: typing.Optional[typing.Tuple[Journal, str]] = None
+
+# Asyncio tasks scraping side by side in one process each record to their own state
+_task_active: contextvars.ContextVar = contextvars.ContextVar("journal")
+
+
+@contextlib.contextmanager
+def active(journal: typing.Optional[Journal], state: str):
+    """Record the units finished in this process to a journal, under the provided state.
+
+    Inside an asyncio task, this holds for that task alone.
+    Passing None records nothing for the duration.
+    """
+    global _active
+    value = (journal, state) if journal is not None else None
+    if in_asyncio_task():
+        token = _task_active.set(value)
+        try:
+            yield journal
+        finally:
+            _task_active.reset(token)
+        return
+    previous, _active = _active, value
+    try:
+        yield journal
+    finally:
+        _active = previous
+
+
+def is_active() -> bool:
+    """Test whether finished units are being recorded."""
+    return _current() is not None
+
+
+def finished_unit(unit: str) -> typing.Optional[dict]:
+    """Get the entry for a unit of the current state finished in an earlier try, if there is one."""
+    current = _current()
+    if current is None:
+        return None
+    journal, state = current
+    return journal.get(state, unit)
+
+
+def record_unit(unit: str, **details):
+    """Record that a unit of the current state is finished, if a journal is active."""
+    current = _current()
+    if current is None:
+        return
+    journal, state = current
+    journal.record(state, unit, **details)
+
+
+def _current() -> typing.Optional[typing.Tuple[Journal, str]]:
+    """Get the journal and state that finished units are recorded under, if any."""
+    return _task_active.get(_active)
@@ -1,20 +1,126 @@
 import logging
+import os
 import re
+from fnmatch import fnmatchcase
+from pathlib import Path
 
 from warn.cache import Cache as BaseCache
+from warn.cache import _compress, _decompress
+from warn.cache_pack import PackFile
 
 from .urls import urls
 
 logger = logging.getLogger(__name__)
 
+# Whether Job Center pages are kept in pack files by default
+CACHE_PACKS = os.environ.get("WARN_CACHE_PACKS", "").lower() in ("1", "true", "yes")
+
+# The share of a pack that has to be old copies of pages before a scrape compacts it
+COMPACT_STALE_RATIO = 0.5
+
 
 class Cache(BaseCache):
-    """A custom cache for Job Center sites."""
+    """A custom cache for Job Center sites.
+
+    With packs, the record and search result pages are appended to one pack
+    file for each type of page, under the cache's packs directory, rather
+    than saved one file apiece. Pages already saved as loose files are still read.
+
+    Args:
+        packed (bool): Whether to keep pages in pack files. Defaults to the
+            WARN_CACHE_PACKS env var, or False.
+        **kwargs: Additional arguments to pass to warn.cache.Cache
+    """
+
+    # The types of page that are packed, which are the top directory of their keys
+    page_types = ("records", "search_results")
+
+    def __init__(self, path=None, packed=None, **kwargs):
+        """Initialize a new instance."""
+        super().__init__(path, **kwargs)
+        self.packed = CACHE_PACKS if packed is None else packed
+        self._packs = {
+            page_type: PackFile(Path(self.path, "packs", page_type))
+            for page_type in self.page_types
+        }
+
+    def exists(self, name):
+        """Test whether the provided file path exists."""
+        pack, key = self._pack_for(name)
+        if pack is not None and key in pack:
+            return True
+        return super().exists(name)
+
+    def read(self, name):
+        """Read a page from its pack, or text file from cache."""
+        pack, key = self._pack_for(name)
+        if pack is not None and key in pack:
+            data, compression = pack.read(key)
+            if compression:
+                data = _decompress(data, compression)
+            return data.decode("utf-8")
+        return super().read(name)
+
+    def write(self, name, content, url=None):
+        """Append a page to its pack, or save file contents to cache."""
+        pack, key = self._pack_for(name)
+        if pack is None:
+            return super().write(name, content, url=url)
+        data = content.encode("utf-8")
+        if self.compression:
+            data = _compress(data, self.compression)
+        pack.write(key, data, self.compression or "")
+        return str(Path(self.path, name))
+
+    def files(self, subdir=".", glob_pattern="*"):
+        """Retrieve all files and folders in a subdir, including its packed pages."""
+        files = super().files(subdir, glob_pattern)
+        pack, _ = self._pack_for(f"{Path(subdir).as_posix()}/*")
+        if pack is not None:
+            packed = [
+                str(Path(self.path, subdir, key))
+                for key in pack.keys()
+                if fnmatchcase(key, glob_pattern)
+            ]
+            files = list(dict.fromkeys(files + packed))
+        return files
+
+    def compact(self, min_stale_ratio=0.0):
+        """Drop the pages in each pack that have since been saved again.
+
+        Args:
+            min_stale_ratio (float): Leave a pack alone unless more than this share
+                of it is old copies of pages. By default, any old copy will do.
+        """
+        for pack in self._packs.values():
+            pack.compact(min_stale_ratio)
+
+    def export(self, path=None):
+        """Write the pages in each pack out as loose files.
+
+        Args:
+            path (str): The directory to export to. Defaults to the cache directory.
+        """
+        export_cache = BaseCache(path or self.path, index=False, compression=False)
+        for page_type, pack in self._packs.items():
+            for key in pack.keys():
+                name = f"{page_type}/{key}"
+                export_cache.write(name, self.read(name))
+        logger.debug(f"Exported packed pages to {export_cache.path}")
+
+    def _pack_for(self, name):
+        """Get the pack a page belongs in and its key there, if it's packed."""
+        if not self.packed:
+            return None, None
+        page_type, _, key = str(name).partition("/")
+        if page_type not in self._packs or not key:
+            return None, None
+        return self._packs[page_type], key
 
     def save(self, url, params, html):
         """Save file to the cache."""
         cache_key = self.key_from_url(url, params)
-        self.write(cache_key, html)
+        self.write(cache_key, html, url=url)
         logger.debug(f"Saved to cache: {cache_key}")
 
     def fetch(self, url, params):
@@ -1,16 +1,25 @@
 import html as html_mod
+import json
 import logging
+import queue
+import re
+import threading
 import urllib.parse
-from datetime import date
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
 
-import requests
 from bs4 import BeautifulSoup
 
+from ... import utils
 from .cache import Cache
 from .urls import urls
 
 logger = logging.getLogger(__name__)
 
+# Put on a window's queue of records once it has no more
+_WINDOW_DONE = object()
+
 
 class NoSearchResultsError(Exception):
     """Thrown when there are no results."""
@@ -31,14 +40,28 @@ class Site:
         url (str): Search URL for the site (should end in '/warn_lookups')
         cache_dir (str): Cache directory
         verify (boolean, default True): SSL certificate verification
+        max_connections (int, default 8): Most requests to have open to the site at once
+        incremental (boolean, default False): Reuse a cached detail page, even when
+            not using the cache, if its search listing hasn't changed since it was saved
     """
 
-    def __init__(self, state, url, cache_dir, verify=True):
+    # Cache file that remembers the search listing each detail page was saved for
+    listings_cache_key = "listings.json"
+
+    def __init__(
+        self, state, url, cache_dir, verify=True, max_connections=8, incremental=False
+    ):
         """Initialize a new instance."""
         self.state = state.upper()
         self.url = url
-        self.cache = Cache(cache_dir)
+        self.cache = Cache(cache_dir, scraper=state.lower())
         self.verify = verify
+        self.max_connections = max_connections
+        self.incremental = incremental
+        # Caps the requests in flight to this host, however many threads are asking
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        self._listings = None
+        self._listings_lock = threading.Lock()
         print(f"Site init SSL verification status: {self.verify}")
 
     def scrape(self, start_date=None, end_date=None, detail_pages=True, use_cache=True):
@@ -64,29 +87,144 @@ class Site:
         # Begin scrape with initial page
         start = start_date or self._start
         end = end_date or self._end
-        kwargs = {
-            "params": self._search_kwargs(start_date=start, end_date=end),
-            "use_cache": use_cache,
-            "detail_pages": detail_pages,
-        }
-        logger.debug(
-            f"Scraping initial page for date range: {start_date} -> {end_date}"
+        params = self._search_kwargs(start_date=start, end_date=end)
+        logger.debug(f"Scraping date range: {start_date} -> {end_date}")
+        pages = self._iter_search_results_pages(
+            params, detail_pages, use_cache, keep_html=True
         )
-        results = self._scrape_search_results_page(self.url, **kwargs)
-        # Exit early if there were no results
-        if not results.get("data"):
-            return (html_store, data)
-        # Update the html_store and data payloads
-        self._update_payload(html_store, data, results)
-        # Scrape downstream pages, if any
-        next_page_link = self._next_page_link(results["html"])
-        if next_page_link:
-            logger.debug("Scraping paged results")
-            self._scrape_next_page(
-                next_page_link, html_store, data, detail_pages, use_cache
-            )
+        for results in pages:
+            # Update the html_store and data payloads
+            self._update_payload(html_store, data, results)
         return (html_store, data)
 
+    def iter_records(
+        self,
+        start_date=None,
+        end_date=None,
+        detail_pages=True,
+        use_cache=True,
+        max_pages=None,
+        max_windows=4,
+    ):
+        """
+        Yield flattened records between a start and end date, one at a time.
+
+        Unlike scrape, no HTML is held in memory. Raw pages are left in the cache.
+
+        If max_pages is set, a date range whose search runs longer than that many
+        results pages is split into smaller windows, which are scraped at the same
+        time. Records come back grouped by window, in date order.
+
+        Defaults to scraping data for current year.
+
+        Args:
+            start_date (str): YYYY-MM-DD
+            end_date (str): YYYY-MM-DD
+            detail_pages (boolean, default True): Whether or not to scrape detail pages.
+            use_cache (boolean, default True): Check cache before scraping.
+            max_pages (int, default None): Most results pages to walk in one search.
+            max_windows (int, default 4): Most date windows to scrape at once.
+
+        Yields:
+            A flat dictionary for each notice that combines the search result
+            with the fields from its detail page
+        """
+        start = start_date or self._start
+        end = end_date or self._end
+        if max_pages is None:
+            windows = [(start, end, None)]
+        else:
+            windows = self._partition_dates(start, end, max_pages, use_cache)
+        if len(windows) == 1:
+            yield from self._iter_window_records(*windows[0], detail_pages, use_cache)
+            return
+
+        logger.debug(f"Split {start} -> {end} into {len(windows)} date windows")
+
+        def scrape_window(window, records, stop):
+            try:
+                for record in self._iter_window_records(
+                    *window, detail_pages, use_cache
+                ):
+                    # Quit early if the records are no longer wanted
+                    if stop.is_set():
+                        return
+                    records.put(record)
+            finally:
+                records.put(_WINDOW_DONE)
+
+        # Keep a few windows in flight and hand their records back in order,
+        # passing on the current window's records as soon as they come in
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=max_windows) as executor:
+
+            def submit(window):
+                records = queue.Queue()
+                return records, executor.submit(scrape_window, window, records, stop)
+
+            windows = iter(windows)
+            pending = deque(
+                submit(window) for _, window in zip(range(max_windows), windows)
+            )
+            try:
+                while pending:
+                    records, future = pending.popleft()
+                    for record in iter(records.get, _WINDOW_DONE):
+                        yield record
+                    # Raise any error that ended the window
+                    future.result()
+                    window = next(windows, None)
+                    if window is not None:
+                        pending.append(submit(window))
+            finally:
+                stop.set()
+
+    def _iter_window_records(
+        self, start, end, first_html, detail_pages=True, use_cache=True
+    ):
+        """Yield flattened records for a single search."""
+        params = self._search_kwargs(start_date=start, end_date=end)
+        logger.debug(f"Streaming date range: {start} -> {end}")
+        pages = self._iter_search_results_pages(
+            params, detail_pages, use_cache, first_html=first_html
+        )
+        for results in pages:
+            for row in results["data"]:
+                yield self._flatten_row(row)
+
+    def _partition_dates(self, start, end, max_pages, use_cache=True):
+        """
+        Split a date range until each search within it has no more than max_pages.
+
+        A range that's too long is cut into as many equal windows as its page
+        count calls for, so most are right the first time, rather than halved
+        over and over with a search for every half.
+
+        Returns:
+            A list of (start, end, first results page HTML) tuples in date order
+        """
+        windows = []
+        todo = [(date.fromisoformat(start), date.fromisoformat(end))]
+        while todo:
+            first, last = todo.pop()
+            params = self._search_kwargs(
+                start_date=first.isoformat(), end_date=last.isoformat()
+            )
+            html = self._get_page(self.url, params=params, use_cache=use_cache)
+            pages = self._page_count(html)
+            if pages > max_pages and first < last:
+                days = (last - first).days + 1
+                count = min(-(-pages // max_pages), days)
+                bounds = [
+                    first + timedelta(days=days * n // count) for n in range(count + 1)
+                ]
+                # Push the later windows first so the earliest comes off next
+                for window_start, next_start in reversed(list(zip(bounds, bounds[1:]))):
+                    todo.append((window_start, next_start - timedelta(days=1)))
+            else:
+                windows.append((first.isoformat(), last.isoformat(), html))
+        return windows
+
     @property
     def _start(self):
         """Get the start date."""
@@ -113,68 +251,149 @@ class Site:
             return self.cache.fetch(url, params)
         else:
             logger.debug("Pulling from the web")
-            response = requests.get(url, params=params, verify=self.verify)
+            with self._connection_slots:
+                response = utils.get_http_client().get(
+                    url, params=params, verify=self.verify
+                )
             logger.debug(f"Response code: {response.status_code}")
             html = response.text
             self.cache.save(url, params, html)
             return html
 
-    def _scrape_search_results_page(
-        self, url, params=None, detail_pages=True, use_cache=True
+    def _iter_search_results_pages(
+        self,
+        params,
+        detail_pages=True,
+        use_cache=True,
+        keep_html=False,
+        first_html=None,
     ):
-        """Scrape data from search results page and detail pages."""
-        kwargs = {"params": params, "use_cache": use_cache}
-        # Downstream page URLs will have the "page" query parameter
-        if "page" in url:
-            final_url = self._build_page_url(url)
-            page_num = urls.page_num_from_url(final_url)
-            html = self._get_page(final_url, **kwargs)
-        # Whereas the initial page request doesn't have the "page" parameter
-        else:
-            page_num = 1
-            html = self._get_page(url, **kwargs)
-        try:
-            data = self._parse_search_results(html)
-        except NoSearchResultsError:
-            return {}
-        if detail_pages:
-            logger.debug("Scraping detail pages found on search results page...")
-            for row in data:
-                detail_page_data = self._scrape_detail_page(
-                    row["detail_page_url"], use_cache
+        """
+        Yield each page of search results, and the detail pages it links to, in order.
+
+        The next results page is requested as soon as its link is found,
+        so it downloads while the detail pages for the current one are scraped.
+        If the first page has already been fetched, its HTML can be passed in.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            try:
+                yield from self._walk_search_results_pages(
+                    executor, params, detail_pages, use_cache, keep_html, first_html
                 )
-                row["detail"].update(detail_page_data)
-        return {"page_num": page_num, "html": html, "data": data}
+            finally:
+                if detail_pages and self.incremental:
+                    self._save_listings()
 
-    def _scrape_next_page(
-        self, next_page_link, html_store, data, detail_pages, use_cache
+    def _walk_search_results_pages(
+        self, executor, params, detail_pages, use_cache, keep_html, first_html=None
     ):
-        """Scrape the results of next page and update the payload."""
-        kwargs = {
-            "params": {},
-            "detail_pages": detail_pages,
-            "use_cache": use_cache,
-        }
-        results = self._scrape_search_results_page(next_page_link, **kwargs)
-        try:
-            results["data"]
-        # Empty results dict signals no search results were returned
-        except KeyError:
-            return
-        self._update_payload(html_store, data, results)
-        # If there are any more pages, make a recursive call
-        next_page_link = self._next_page_link(results["html"])
-        if next_page_link:
-            args = [next_page_link, html_store, data, detail_pages, use_cache]
-            self._scrape_next_page(*args)
-        # Otherwise, we've reached the last page so return
+        """Walk the search results pages for _iter_search_results_pages."""
+        page_num = 1
+        if first_html is None:
+            pending = executor.submit(
+                self._get_page, self.url, params=params, use_cache=use_cache
+            )
         else:
-            return
+            pending = Future()
+            pending.set_result(first_html)
+        while pending is not None:
+            html = pending.result()
+            try:
+                data, next_page_url = self._parse_search_results(html)
+            except NoSearchResultsError:
+                return
+            # Stop if the page came back without any rows
+            if not data:
+                return
+            # Prefetch the next page, if there is one
+            if next_page_url:
+                logger.debug(f"Prefetching results page {next_page_url}")
+                pending = executor.submit(
+                    self._get_page, next_page_url, use_cache=use_cache
+                )
+            else:
+                pending = None
+            if detail_pages:
+                logger.debug("Scraping detail pages found on search results page...")
+                self._scrape_detail_pages(
+                    data, use_cache, executor=executor, keep_html=keep_html
+                )
+            yield {"page_num": page_num, "html": html, "data": data}
+            if next_page_url:
+                page_num = urls.page_num_from_url(next_page_url)
+
+    def _scrape_detail_pages(self, data, use_cache, executor=None, keep_html=False):
+        """Scrape the detail pages for a list of search results, several at a time."""
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+                return self._scrape_detail_pages(
+                    data, use_cache, executor=executor, keep_html=keep_html
+                )
+        # Decide up front which detail pages can come from the cache
+        row_use_cache = [use_cache or self._listing_unchanged(row) for row in data]
+        # map hands results back in the same order as the rows
+        detail_page_data = executor.map(
+            lambda row, cached: self._scrape_detail_page(
+                row["detail_page_url"], cached, keep_html=keep_html
+            ),
+            data,
+            row_use_cache,
+        )
+        for row, detail in zip(data, detail_page_data):
+            row["detail"].update(detail)
+            self._remember_listing(row)
 
-    def _scrape_detail_page(self, url, use_cache):
+    def _scrape_detail_page(self, url, use_cache, keep_html=False):
         """Scrape the provided detail page."""
         html = self._get_page(url, use_cache=use_cache)
-        return self._parse_detail_page(html)
+        payload = self._parse_detail_page(html)
+        if keep_html:
+            payload["html"] = html
+        return payload
+
+    def _listing_fingerprint(self, row):
+        """Get the search listing fields that signal a detail page has changed."""
+        return [row["notice_date"], row["warn_type"], row["city"], row["employer"]]
+
+    def _load_listings(self):
+        """Load the listing each cached detail page was saved for."""
+        if self._listings is None:
+            self._listings = {}
+            if self.cache.exists(self.listings_cache_key):
+                try:
+                    self._listings = json.loads(
+                        self.cache.read(self.listings_cache_key)
+                    )
+                except ValueError:
+                    logger.warning(f"Ignoring unreadable {self.listings_cache_key}")
+        return self._listings
+
+    def _listing_unchanged(self, row):
+        """Test whether a cached detail page is still good for a search listing."""
+        if not self.incremental:
+            return False
+        record_number = row["detail"]["record_number"]
+        with self._listings_lock:
+            saved = self._load_listings().get(record_number)
+        if saved != self._listing_fingerprint(row):
+            return False
+        return self.cache.exists(self.cache.key_from_url(row["detail_page_url"]))
+
+    def _remember_listing(self, row):
+        """Record the listing a detail page was saved for."""
+        if not self.incremental:
+            return
+        with self._listings_lock:
+            listings = self._load_listings()
+            listings[row["detail"]["record_number"]] = self._listing_fingerprint(row)
+
+    def _save_listings(self):
+        """Write the listings index out to the cache."""
+        with self._listings_lock:
+            if self._listings is None:
+                return
+            content = json.dumps(self._listings, sort_keys=True)
+            self.cache.write(self.listings_cache_key, content)
 
     def _parse_detail_page(self, html):
         """Parse data out of a detail page."""
@@ -194,11 +413,24 @@ class Site:
         ]
         data = dict(zip(headers, values))
         payload.update(data)
-        payload["html"] = html
         return payload
 
+    def _flatten_row(self, row):
+        """Flatten a search result and its nested detail page data into one dict."""
+        # Returned data includes fields from search result page and
+        # data from detail page record for each layoff notice
+        # the latter contains two key fields (address and number affected)
+        record = dict(row)
+        detail = record.pop("detail")
+        record["number_of_employees_affected"] = detail.get(
+            "number_of_employees_affected", ""
+        )
+        record["address"] = re.sub(r"\n+", "; ", detail.get("address", "").strip())
+        record["record_number"] = detail["record_number"]
+        return record
+
     def _parse_search_results(self, html):
-        """Parse data out of the search results."""
+        """Parse data and the link to the next page, if any, out of the search results."""
         data = []
         soup = BeautifulSoup(html, "html.parser")
         table_rows = soup.find_all("tr")
@@ -215,7 +447,7 @@ class Site:
         for row in table_rows:
             row_data = self._extract_search_results_row(row)
             data.append(row_data)
-        return data
+        return data, self._next_page_link(soup)
 
     def _update_payload(self, html_store, data, results):
         """Update a payload."""
@@ -259,9 +491,21 @@ class Site:
             },
         }
 
-    def _next_page_link(self, html):
-        """Get the link for the next page, if it exists."""
+    def _page_count(self, html):
+        """Get the number of results pages from the pagination links on a page."""
         soup = BeautifulSoup(html, "html.parser")
+        pagination = soup.find(class_="pagination")
+        if pagination is None:
+            return 1
+        numbers = [
+            int(link.text)
+            for link in pagination.find_all(["a", "em"])
+            if link.text.strip().isdigit()
+        ]
+        return max(numbers, default=1)
+
+    def _next_page_link(self, soup):
+        """Get the link for the next page, if it exists."""
         next_page = soup.find("a", class_="next_page")
         try:
             url_path = next_page["href"]
@@ -1,9 +1,12 @@
+import csv
+import hashlib
+import io
 import logging
-import re
-from collections import OrderedDict
 from datetime import datetime as dt
+from pathlib import Path
 
-from ... import utils
+from ... import journal, utils
+from .cache import COMPACT_STALE_RATIO
 from .site import Site as JobCenterSite
 
 logger = logging.getLogger(__name__)
@@ -17,6 +20,8 @@ def scrape_state(
     cache_dir,
     use_cache=True,
     verify=True,
+    max_connections=8,
+    max_pages=10,
 ):
     """Date-based scraper for Job Center states.
 
@@ -24,9 +29,13 @@ def scrape_state(
     It applies a date-based scraping strategy that:
 
       - Scrapes one year at a time, in reverse chronological order
-      - Always does a fresh scrape for current and prior year
+      - Splits a year into smaller date windows, scraped at the same time,
+        when its search runs longer than max_pages
+      - Always does a fresh scrape of search results for current and prior year
+      - Only re-fetches detail pages that are new or whose search listing changed
       - Uses cached files for years before current & prior
       - Deduplicates search results
+      - When resuming a run, reuses the records of the years it finished
 
     Args:
         state_postal (str): Two-letter all-caps state postal (e.g. KS)
@@ -36,28 +45,34 @@ def scrape_state(
         cache_dir (str): The root directory for WARN's cache files (e.g. ~/.warn-scraper/cache)
         use_cache (boolean, default True): Whether to use cached files for older years
         verify (boolean, default True): Use SSL certificate verifcation
+        max_connections (int, default 8): Most requests to have open to the site at once
+        max_pages (int, default 10): Most results pages to walk in a single search
 
     Returns:
         Full path to exported csv (e.g. ~/.warn-scraper/exports/ks.csv)
     """
     yearly_dates = _date_ranges_to_scrape(stop_year)
 
-    # No caching should be used for current and prior year, so
-    # we have to separate those from remaining years.
+    # Search results for current and prior year are never read from the cache,
+    # so we have to separate those from remaining years. Their detail pages are
+    # only re-fetched when the listing is new or has changed.
     no_cache_years = [yearly_dates.pop(0), yearly_dates.pop(0)]
 
     # Set up scraper instance
     state_cache_dir = cache_dir / state_postal.lower()
     print(f"scrape_state verify: {verify}")
     site = JobCenterSite(
-        state_postal.upper(), search_url, cache_dir=state_cache_dir, verify=verify
+        state_postal.upper(),
+        search_url,
+        cache_dir=state_cache_dir,
+        verify=verify,
+        max_connections=max_connections,
+        incremental=True,
     )
 
     # Date-based searches produce search result pages that appear to have certain
-    # records duplicated over paged results. We'll initially write all data to a raw
-    # file which we then deduplicate to produce the final output_csv.
-    raw_csv = cache_dir / f"{state_postal.lower()}_raw.csv"
-    logger.debug(f"Generating {raw_csv}")
+    # records duplicated over paged results. Those are dropped as rows are written.
+    logger.debug(f"Generating {output_csv}")
 
     # 0. Write header row first
     headers = [
@@ -72,52 +87,72 @@ def scrape_state(
         "record_number",
         "detail_page_url",
     ]
-    utils.write_rows_to_csv(raw_csv, [headers])
-    # Execute the scrape in two batches
-    # 1. Current and prior year. Always scrape fresh (i.e. never use cached files)
-    #    in case records have been updated.
-    _scrape_years(
-        site, raw_csv, headers, no_cache_years, use_cache=False, verify=verify
-    )
-    # 2. Years before current & prior, going back to stop_year.
-    #    We should generally use cached files for these older years,
-    #    since data is less likely to be updated.
-    _scrape_years(
-        site, raw_csv, headers, yearly_dates, use_cache=use_cache, verify=verify
-    )
-    _dedupe(raw_csv, output_csv)
+    utils.create_directory(output_csv, is_file=True)
+    # The export is swapped in once every year is done, so a failed year keeps the last one
+    with utils.atomic_open(Path(output_csv), "w", newline="", encoding="utf-8") as f:
+        writer = _DedupingWriter(f, fieldnames=headers)
+        writer.writeheader()
+        # Execute the scrape in two batches
+        # 1. Current and prior year. Always scrape fresh (i.e. never use cached files)
+        #    in case records have been updated.
+        _scrape_years(
+            site, writer, no_cache_years, use_cache=False, max_pages=max_pages
+        )
+        # 2. Years before current & prior, going back to stop_year.
+        #    We should generally use cached files for these older years,
+        #    since data is less likely to be updated.
+        _scrape_years(
+            site, writer, yearly_dates, use_cache=use_cache, max_pages=max_pages
+        )
+    if writer.removed > 0:
+        logger.debug(f"Removed {writer.removed} duplicate records from {output_csv}")
+
+    # Clear out the pages refetched by this and earlier runs, once they're a good
+    # share of the packs, so most runs don't have to rewrite them
+    if site.cache.packed:
+        site.cache.compact(min_stale_ratio=COMPACT_STALE_RATIO)
     return output_csv
 
 
-def _scrape_years(
-    site, output_csv, headers, start_end_dates, use_cache=True, verify=True
-):
-    """Loop through years of data and write out to CSV."""
+def _scrape_years(site, writer, start_end_dates, use_cache=True, max_pages=None):
+    """Loop through years of data and stream the records into a CSV writer.
+
+    When the run is keeping a journal, each year's records are also saved to a
+    checkpoint file in the cache, and the year is recorded as finished.
+    A resumed run reads a finished year back from its checkpoint.
+    """
+    checkpoint_dir = Path(site.cache.path, site.cache.meta_dir, "checkpoints")
     # NOTE: Scraping for Jan 1 - Dec 31 for current year works
     # throughout the year. Additionally, it allows us to avoid
     # generating cache files for all days of the year.
     for start, end in start_end_dates:
-        kwargs = {
-            "start_date": start,
-            "end_date": end,
-            "use_cache": use_cache,
-        }
-        pages_dict, data = site.scrape(**kwargs)
-        rows = [_prepare_row(row) for row in data]
-        # We previously wrote the header so use append mode for data rows
-        utils.write_dict_rows_to_csv(output_csv, headers, rows, mode="a")
-
-
-def _prepare_row(row):
-    """Flatten the nested dict for downstream export to CSV."""
-    # Returned data includes fields from search result page and
-    # data from detail page record for each layoff notice
-    # the latter contains two key fields (address and number affected)
-    detail = row.pop("detail")
-    row["number_of_employees_affected"] = detail["number_of_employees_affected"]
-    row["address"] = re.sub(r"\n+", "; ", detail["address"].strip())
-    row["record_number"] = detail["record_number"]
-    return row
+        unit = f"years/{start}_{end}"
+        finished = journal.finished_unit(unit)
+        if finished is not None and Path(finished["path"]).exists():
+            logger.debug(f"Reading {start} to {end} from the last run")
+            with open(finished["path"], newline="", encoding="utf-8") as fh:
+                writer.writerows(csv.DictReader(fh))
+            continue
+
+        records = site.iter_records(
+            start_date=start, end_date=end, use_cache=use_cache, max_pages=max_pages
+        )
+        if not journal.is_active():
+            writer.writerows(records)
+            continue
+
+        checkpoint_path = checkpoint_dir / f"{start}_{end}.csv"
+        utils.write_dict_rows_to_csv(
+            checkpoint_path, writer.fieldnames, _write_through(writer, records)
+        )
+        journal.record_unit(unit, path=checkpoint_path)
+
+
+def _write_through(writer, rows):
+    """Write each row to a CSV writer as it passes by."""
+    for row in rows:
+        writer.writerow(row)
+        yield row
 
 
 def _date_ranges_to_scrape(stop_year):
@@ -132,23 +167,54 @@ def _date_ranges_to_scrape(stop_year):
     return yearly_dates
 
 
-def _dedupe(raw_csv, output_csv):
-    """Create an ordered dict to discard dupes while preserving row order."""
-    data = OrderedDict()
-    raw_count = 0
-    utils.create_directory(raw_csv, is_file=True)
-    with open(raw_csv, newline="") as src:
-        for row in src:
-            raw_count += 1
-            data[row] = row
-    # Write the deduped rows to final output_csv
-    final_count = 0
-    utils.create_directory(output_csv, is_file=True)
-    with open(output_csv, "w", newline="") as out:
-        for row in data.keys():
-            final_count += 1
-            out.write(row)
-    num_removed = raw_count - final_count
-    if num_removed > 0:
-        logger.debug(f"Removed {num_removed} duplicate records from {raw_csv}")
-    return output_csv
+class _DedupingWriter:
+    """A csv.DictWriter that drops rows identical to one it already wrote.
+
+    Only a fixed-size digest of each written line is kept, so memory grows
+    with the number of distinct records rather than the size of the text.
+    Rows are written in the order they're first seen.
+
+    Args:
+        fh: An open, writable text file
+        fieldnames (list): The columns to write, in order
+    """
+
+    digest_size = 16
+
+    def __init__(self, fh, fieldnames):
+        """Initialize a new instance."""
+        self._fh = fh
+        self.fieldnames = fieldnames
+        self._line = io.StringIO()
+        self._line_writer = csv.DictWriter(self._line, fieldnames=fieldnames)
+        self._seen = set()
+        self.removed = 0
+
+    def writeheader(self):
+        """Write the header row."""
+        self._line_writer.writeheader()
+        self._flush_line()
+
+    def writerow(self, row):
+        """Write a row unless it's a duplicate."""
+        self._line_writer.writerow(row)
+        self._flush_line()
+
+    def writerows(self, rows):
+        """Write each row that isn't a duplicate."""
+        for row in rows:
+            self.writerow(row)
+
+    def _flush_line(self):
+        """Move the serialized line to the file, if it hasn't been seen before."""
+        line = self._line.getvalue()
+        self._line.seek(0)
+        self._line.truncate()
+        digest = hashlib.blake2b(
+            line.encode("utf-8"), digest_size=self.digest_size
+        ).digest()
+        if digest in self._seen:
+            self.removed += 1
+            return
+        self._seen.add(digest)
+        self._fh.write(line)
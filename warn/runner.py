@@ -1,9 +1,14 @@
+import asyncio
+import inspect
 import logging
+import os
 import shutil
+import typing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
 from importlib import import_module
 from pathlib import Path
 
-from . import utils
+from . import aio, journal, utils
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +18,7 @@ class Runner:
 
     Provides methods for:
      - scraping a state
+     - scraping many states in parallel
      - deleting files from prior runs
 
     The data_dir and cache_dir arguments can specify any
@@ -21,6 +27,9 @@ class Runner:
         /tmp/WARN/working # ETL files
         /tmp/WARN/exports # Final, polished data e.g CSVs for analysis
 
+    Runs of many states keep a journal of the work they finish in the cache
+    directory, so a run that stops partway can be resumed.
+
     Args:
         data_dir (str): Path where final output files are saved.
         cache_dir (str): Path to store intermediate files used in ETL.
@@ -34,30 +43,310 @@ class Runner:
         """Initialize a new instance."""
         self.data_dir = data_dir
         self.cache_dir = cache_dir
+        self.journal = journal.Journal(Path(cache_dir, ".meta", "journal.jsonl"))
 
-    def scrape(self, state: str) -> Path:
+    def scrape(
+        self,
+        state: str,
+        deadline: typing.Optional[float] = None,
+        run_deadline: typing.Optional[utils.Deadline] = None,
+        journaled: bool = False,
+    ) -> Path:
         """Run the scraper for the provided state.
 
+        A scraper whose scrape function is a coroutine is run on an event loop of its own.
+
         Args:
             state (str): the two-letter postal code of the state to scrape.
+            deadline (float): the most seconds the scraper may run. optional
+            run_deadline (Deadline): the deadline of the run the scraper is part of. optional
+            journaled (bool): record the state's finished work in the journal (default False)
 
         Returns: a Path object leading to the CSV file.
         """
         # Get the module
         state = state.strip().lower()
         state_mod = import_module(f"warn.scrapers.{state}")
+        if inspect.iscoroutinefunction(state_mod.scrape):
+            return _run_async(
+                self._scrape_async(state, deadline, run_deadline, journaled)
+            )
+        state_deadline = self._state_deadline(state, deadline, run_deadline)
 
         # Run the scrape method
         logger.info(f"Scraping {state}")
-        data_path = state_mod.scrape(self.data_dir, self.cache_dir)
+        client = utils.get_http_client()
+        request_count, byte_count = client.request_count, client.byte_count
+        not_modified_count = client.not_modified_count
+        run_journal = self.journal if journaled else None
+        with utils.deadline(state_deadline), journal.active(run_journal, state):
+            data_path = state_mod.scrape(self.data_dir, self.cache_dir)
+        if run_journal is not None:
+            run_journal.record(state, data_path=data_path)
+
+        # Run the path to the data file
+        logger.info(f"Generated {data_path}")
+        logger.debug(
+            f"{state} made {client.request_count - request_count:,} requests "
+            f"and received {client.byte_count - byte_count:,} bytes, "
+            f"with {client.not_modified_count - not_modified_count:,} files unchanged"
+        )
+        return data_path
+
+    async def _scrape_async(
+        self,
+        state: str,
+        deadline: typing.Optional[float] = None,
+        run_deadline: typing.Optional[utils.Deadline] = None,
+        journaled: bool = False,
+    ) -> Path:
+        """Run a scraper whose scrape function is a coroutine, on the event loop that's running.
+
+        When its deadline passes, the scraper is cancelled wherever it is waiting.
+        """
+        state_mod = import_module(f"warn.scrapers.{state}")
+        state_deadline = self._state_deadline(state, deadline, run_deadline)
+
+        # Run the scrape coroutine
+        logger.info(f"Scraping {state}")
+        run_journal = self.journal if journaled else None
+        with utils.deadline(state_deadline), journal.active(run_journal, state):
+            scraping = state_mod.scrape(self.data_dir, self.cache_dir)
+            if state_deadline is None:
+                data_path = await scraping
+            else:
+                try:
+                    data_path = await asyncio.wait_for(
+                        scraping, state_deadline.remaining()
+                    )
+                except asyncio.TimeoutError:
+                    state_deadline.check()
+                    raise
+        if run_journal is not None:
+            run_journal.record(state, data_path=data_path)
 
         # Run the path to the data file
         logger.info(f"Generated {data_path}")
         return data_path
 
+    def _state_deadline(
+        self,
+        state: str,
+        deadline: typing.Optional[float],
+        run_deadline: typing.Optional[utils.Deadline],
+    ) -> typing.Optional[utils.Deadline]:
+        """Get the deadline a state works to, whichever of its own and the run's comes first.
+
+        A DeadlineExceeded is raised if it has already passed.
+        """
+        state_deadline = run_deadline
+        if deadline is not None:
+            state_deadline = utils.Deadline.after(deadline, state)
+            if run_deadline is not None:
+                state_deadline.expires_at = min(
+                    state_deadline.expires_at, run_deadline.expires_at
+                )
+        if state_deadline is not None:
+            state_deadline.check()
+        return state_deadline
+
+    def scrape_many(
+        self,
+        states: typing.Iterable[str],
+        workers: int = 1,
+        deadline: typing.Optional[float] = None,
+        run_deadline: typing.Optional[float] = None,
+        resume: bool = False,
+    ) -> typing.Tuple[typing.Dict[str, Path], typing.Dict[str, BaseException]]:
+        """Run the scrapers for the provided states, optionally in parallel.
+
+        When more than one worker is requested, states are run concurrently in a pool
+        of processes. A failure in one state is logged and collected rather than
+        stopping the others. Scrapers written as coroutines are run first,
+        together on one event loop in this process, with the same number at a time.
+
+        A state that runs out of time fails with a DeadlineExceeded. Once the
+        run's deadline passes, the states still running are stopped at their
+        next request and the states yet to start are skipped.
+
+        If asked to resume, the states finished by the last run are skipped,
+        and the scrapers that support it skip the work they finished before.
+        Otherwise the journal is started anew.
+
+        Args:
+            states (list): the two-letter postal codes of the states to scrape.
+            workers (int): the number of states to scrape at once (default 1).
+            deadline (float): the most seconds each state may run. optional
+            run_deadline (float): the most seconds the whole run may take. optional
+            resume (bool): pick up where the last run stopped (default False)
+
+        Returns: a tuple with a dictionary of data paths keyed by state
+            and a dictionary of exceptions keyed by the states that failed.
+        """
+        state_list = [s.strip().lower() for s in states]
+        data_paths: typing.Dict[str, Path] = {}
+        failures: typing.Dict[str, BaseException] = {}
+        run = None
+        if run_deadline is not None:
+            run = utils.Deadline.after(run_deadline, "the run")
+
+        # Pass over the states the last run finished, so long as their files are still around
+        if resume:
+            for state in state_list:
+                entry = self.journal.get(state)
+                if entry is not None and Path(entry["data_path"]).exists():
+                    logger.info(f"Skipping {state}, finished by the last run")
+                    data_paths[state] = Path(entry["data_path"])
+        else:
+            self.journal.reset()
+        pending = [s for s in state_list if s not in data_paths]
+
+        # Scrapers written as coroutines share one event loop in this process
+        async_states = [s for s in pending if _is_async(s)]
+        if async_states:
+            logger.info(f"Scraping {len(async_states)} states on an event loop")
+            _run_async(
+                self._scrape_many_async(
+                    async_states, workers, deadline, run, data_paths, failures
+                )
+            )
+            pending = [s for s in pending if s not in async_states]
+
+        if workers <= 1 or len(pending) <= 1:
+            # Keep it simple when there's nothing to gain from a pool
+            for state in pending:
+                try:
+                    data_paths[state] = self.scrape(state, deadline, run, True)
+                except Exception as e:
+                    self._record_failure(state, e, failures)
+        else:
+            logger.info(f"Scraping {len(pending)} states with {workers} workers")
+            # Split the CPUs between the states, so their PDF pools don't pile up
+            pdf_workers = max(1, utils.get_pdf_workers() // workers)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_share_pdf_workers,
+                initargs=(pdf_workers,),
+            ) as executor:
+                futures = {
+                    executor.submit(self.scrape, state, deadline, run, True): state
+                    for state in pending
+                }
+                timeout = None
+                if run is not None:
+                    # Leave the states that are running a moment to stop on their own
+                    timeout = run.remaining() + utils.REQUEST_TIMEOUT[0]
+                try:
+                    for future in as_completed(futures, timeout=timeout):
+                        state = futures[future]
+                        try:
+                            data_paths[state] = future.result()
+                        except Exception as e:
+                            self._record_failure(state, e, failures)
+                except TimeoutError:
+                    # Drop the states that haven't started, and wait out the rest
+                    for future, state in futures.items():
+                        if future.cancel():
+                            self._record_failure(
+                                state,
+                                utils.DeadlineExceeded(
+                                    "Deadline for the run passed before it started"
+                                ),
+                                failures,
+                            )
+                    for future, state in futures.items():
+                        if (
+                            future.cancelled()
+                            or state in data_paths
+                            or state in failures
+                        ):
+                            continue
+                        try:
+                            data_paths[state] = future.result()
+                        except Exception as e:
+                            self._record_failure(state, e, failures)
+
+        # Report on the failures at the end, rather than in the middle of the log
+        timed_out = sorted(
+            s for s, e in failures.items() if isinstance(e, utils.DeadlineExceeded)
+        )
+        if timed_out:
+            logger.error(
+                f"{len(timed_out)} scrapers ran out of time: {', '.join(timed_out)}"
+            )
+        if failures:
+            failed = ", ".join(sorted(failures))
+            logger.error(
+                f"{len(failures)} of {len(state_list)} scrapers failed: {failed}"
+            )
+
+        # Return the paths in the order they were requested
+        ordered_paths = {s: data_paths[s] for s in state_list if s in data_paths}
+        return ordered_paths, failures
+
+    async def _scrape_many_async(
+        self,
+        states: typing.List[str],
+        workers: int,
+        deadline: typing.Optional[float],
+        run: typing.Optional[utils.Deadline],
+        data_paths: typing.Dict[str, Path],
+        failures: typing.Dict[str, BaseException],
+    ):
+        """Run scrapers written as coroutines on the event loop that's running, a few at a time."""
+        slots = asyncio.Semaphore(workers)
+
+        async def scrape(state):
+            async with slots:
+                try:
+                    data_paths[state] = await self._scrape_async(
+                        state, deadline, run, True
+                    )
+                except Exception as e:
+                    self._record_failure(state, e, failures)
+
+        await asyncio.gather(*(scrape(state) for state in states))
+
+    def _record_failure(
+        self, state: str, error: Exception, failures: typing.Dict[str, BaseException]
+    ):
+        """Log a state's failure and add it to the others."""
+        if isinstance(error, utils.DeadlineExceeded):
+            logger.warning(f"Scraper for {state} ran out of time: {error}")
+        else:
+            logger.error(f"Scraper for {state} failed", exc_info=error)
+        failures[state] = error
+
     def delete(self):
         """Delete the files in the output directories."""
         logger.debug(f"Deleting files in {self.data_dir}")
         shutil.rmtree(self.data_dir, ignore_errors=True)
         logger.debug(f"Deleting files in {self.cache_dir}")
         shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def _is_async(state: str) -> bool:
+    """Test whether a state's scraper is written as a coroutine."""
+    try:
+        state_mod = import_module(f"warn.scrapers.{state}")
+    except Exception:
+        # Leave it to fail where the other scrapers do
+        return False
+    return inspect.iscoroutinefunction(getattr(state_mod, "scrape", None))
+
+
+def _share_pdf_workers(pdf_workers: int):
+    """Limit the processes a runner's worker process parses PDFs with."""
+    os.environ["WARN_PDF_WORKERS"] = str(pdf_workers)
+
+
+def _run_async(coroutine):
+    """Run a coroutine on a new event loop, closing the loop's HTTP client at the end."""
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await aio.close_http_client()
+
+    return asyncio.run(main())
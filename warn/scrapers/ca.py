@@ -1,12 +1,11 @@
 import logging
 import os
 import re
+import typing
 from pathlib import Path
 from urllib.parse import urlparse
 
-import pdfplumber
 from bs4 import BeautifulSoup
-from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
@@ -77,7 +76,7 @@ def scrape(
     output_rows = []
     for file_ in file_list:
         if str(file_).endswith("pdf"):
-            row_list = _extract_pdf_data(file_)
+            row_list = _extract_pdf_data(file_, cache_dir)
         else:
             row_list = _extract_excel_data(file_)
         output_rows += row_list
@@ -107,51 +106,47 @@ def scrape(
 def _extract_excel_data(wb_path):
     """Parse data from the provided Excel file."""
     logger.debug(f"Reading in {wb_path}")
-    wb = load_workbook(filename=wb_path)
     targetsheet = "Detailed WARN Report "
-    if targetsheet in wb.sheetnames:
-        ws = wb[targetsheet]
+    sheet: typing.Union[int, str]
+    if targetsheet in utils.excel_sheet_names(wb_path):
+        sheet = targetsheet
         logger.debug(f"Using worksheet '{targetsheet}'")
     else:
-        ws = wb.worksheets[0]
+        sheet = 0
         logger.debug(
             f"Using first worksheet; sheet {targetsheet} not found, but maybe look for them to remove the space"
         )
-    rows = [row for row in ws.rows]
-    # Throw away initial rows until we reach first data row
-    while True:
-        row = rows.pop(0)
-        first_cell = row[0].value.strip().lower()
-        if first_cell.startswith("county"):
-            # Grab the header
-            headers = row
-            break
+    rows = utils.iter_excel_rows(wb_path, sheet=sheet, skip_empty=False)
+    # Throw away initial rows until we reach first data row, and grab the header
+    headers = utils.skip_to_header(
+        rows, lambda row: row[0].strip().lower().startswith("county")
+    )
 
     # Get the location of the final two fields, which vary from week to week
     num_employees_index = next(
-        i for i, c in enumerate(headers) if c.value and "employees" in c.value.lower()
+        i for i, c in enumerate(headers) if c and "employees" in c.lower()
     )
     address_index = next(
-        i for i, c in enumerate(headers) if c.value and "address" in c.value.lower()
+        i for i, c in enumerate(headers) if c and "address" in c.lower()
     )
 
     # Loop through all the rows
     payload = []
     for row in rows:
-        first_cell = row[0].value.strip().lower()
+        first_cell = row[0].strip().lower()
         # Exit if we've reached summary row at bottom
         if first_cell == "report summary":
             break
 
         data = {
-            "county": row[0].value.strip(),
-            "notice_date": _convert_date(row[1].value),
-            "received_date": _convert_date(row[2].value),
-            "effective_date": _convert_date(row[3].value),
-            "company": row[4].value.strip(),
-            "layoff_or_closure": row[5].value.strip(),
-            "num_employees": row[num_employees_index].value,
-            "address": row[address_index].value.strip(),
+            "county": row[0].strip(),
+            "notice_date": _convert_date(row[1]),
+            "received_date": _convert_date(row[2]),
+            "effective_date": _convert_date(row[3]),
+            "company": row[4].strip(),
+            "layoff_or_closure": row[5].strip(),
+            "num_employees": row[num_employees_index],
+            "address": row[address_index].strip(),
             "source_file": str(wb_path).split("/")[-1],
         }
         payload.append(data)
@@ -162,7 +157,7 @@ def _convert_date(dt):
     return dt.strftime("%m/%d/%Y")
 
 
-def _extract_pdf_data(pdf_path):
+def _extract_pdf_data(pdf_path, cache_dir=None):
     headers = [
         "notice_date",
         "effective_date",
@@ -201,44 +196,51 @@ def _extract_pdf_data(pdf_path):
         "Received Date": "received_date",
         "ReceivedDate": "received_date",
     }
-    data = []
+    raw_header: list = []
+
+    def stitch(data, rows, idx):
+        # Remove header row on first page
+        # and update the standardized "headers" var if the source
+        # data has no county field, as in the case of
+        # files covering 07/2016-to-06/2017 fiscal year and earlier
+        if idx == 0:
+            raw_header.extend(rows.pop(0))
+            raw_header_str = "-".join([col.strip().lower() for col in raw_header])
+            if "county" not in raw_header_str:
+                headers.remove("county")
+        # Skip if it's a summary table (this happens
+        # when summary is only table on page, as in 7/2019-6/2020)
+        first_cell = rows[0][0].strip().lower()
+        if "summary" in first_cell:
+            return data
+        for row in rows:
+            data_row = {}
+            for i, value in enumerate(row):
+                this_raw_header = raw_header[i]
+                this_clean_header = header_crosswalk[this_raw_header]
+                data_row[this_clean_header] = value
+            # Data clean-ups
+            data_row.update(
+                {
+                    "effective_date": data_row["effective_date"].replace(" ", ""),
+                    "received_date": data_row["received_date"].replace(" ", ""),
+                    "source_file": str(pdf_path).split("/")[-1],
+                }
+            )
+            data.append(data_row)
+        return data
+
     logger.debug(f"Opening {pdf_path} for PDF parsing")
-    with pdfplumber.open(pdf_path) as pdf:
-        for idx, page in enumerate(pdf.pages):
-            # All pages pages except last should have a single table
-            # Last page has an extra summary table, but indexing
-            # for the first should avoid grabbing the summary data
-            rows = page.extract_tables()[0]
-            # Remove header row on first page
-            # and update the standardized "headers" var if the source
-            # data has no county field, as in the case of
-            # files covering 07/2016-to-06/2017 fiscal year and earlier
-            if idx == 0:
-                raw_header = rows.pop(0)
-                raw_header_str = "-".join([col.strip().lower() for col in raw_header])
-                if "county" not in raw_header_str:
-                    headers.remove("county")
-            # Skip if it's a summary table (this happens
-            # when summary is only table on page, as in 7/2019-6/2020)
-            first_cell = rows[0][0].strip().lower()
-            if "summary" in first_cell:
-                continue
-            for row in rows:
-                data_row = {}
-                for i, value in enumerate(row):
-                    this_raw_header = raw_header[i]
-                    this_clean_header = header_crosswalk[this_raw_header]
-                    data_row[this_clean_header] = value
-                # Data clean-ups
-                data_row.update(
-                    {
-                        "effective_date": data_row["effective_date"].replace(" ", ""),
-                        "received_date": data_row["received_date"].replace(" ", ""),
-                        "source_file": str(pdf_path).split("/")[-1],
-                    }
-                )
-                data.append(data_row)
-    return data
+    return utils.parse_pdf_pages(
+        pdf_path, _extract_pdf_page, stitch, cache_dir=cache_dir
+    )
+
+
+def _extract_pdf_page(page, idx):
+    # All pages pages except last should have a single table
+    # Last page has an extra summary table, but indexing
+    # for the first should avoid grabbing the summary data
+    return page.extract_tables()[0]
 
 
 if __name__ == "__main__":
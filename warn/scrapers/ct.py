@@ -2,11 +2,10 @@ import logging
 from datetime import datetime
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = [
     "zstumgoren",
@@ -46,7 +45,7 @@ def scrape(
         year_range = range(2015, current_year + 1)
     else:
         url = f"https://www.ctdol.state.ct.us/progsupt/bussrvce/warnreports/warn{current_year}.htm"
-        r = requests.head(url)
+        r = utils.get_http_client().head(url)
         if r.ok:
             logger.debug(f"Found first entry for {current_year}")
             year_range = range(2015, current_year + 1)
@@ -61,12 +60,8 @@ def scrape(
         url = f"https://www.ctdol.state.ct.us/progsupt/bussrvce/warnreports/warn{year}.htm"
         cache_key = f"ct/{year}.html"
 
-        if cache.exists(cache_key) and year < current_year:
-            html = cache.read(cache_key)
-        else:
-            r = utils.get_url(url)
-            html = r.text
-            cache.write(cache_key, html)
+        # Use the cache for settled years, fetch the rest
+        html = cache.get_or_fetch(cache_key, url, immutable=is_settled_year(year))
 
         # Parse out the table
         soup = BeautifulSoup(html, "html.parser")
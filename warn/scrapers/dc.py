@@ -39,22 +39,21 @@ def scrape(
     today = datetime.today()
     current_year = today.year
 
-    targetfile = cache_dir / f"dc/{current_year}.html"
-    url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{current_year}"
-    success, content = utils.save_if_good_url(targetfile, url)
+    root_year = current_year
+    url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{root_year}"
+    response = utils.get_http_client().get(url)
 
-    if not success:  # If we don't have a file for a new year
-        targetfile = cache_dir / f"dc/{current_year - 1}.html"
-        url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{current_year - 1}"
-        success, content = utils.save_if_good_url(targetfile, url)
+    if not response.ok:  # If we don't have a file for a new year
+        logger.error(f"URL {url} fetch failed with {response.status_code}")
+        root_year = current_year - 1
+        url = f"https://does.dc.gov/page/industry-closings-and-layoffs-warn-notifications-{root_year}"
+        response = utils.get_http_client().get(url)
 
-    root_html = content
-    #    r = utils.get_url(url)
-    #    r.encoding = "utf-8"
-    #    root_html = r.text
+    root_html = response.content
 
     # Save it to the cache
-    #    cache.write(targetfile, root_html)
+    if response.ok:
+        cache.write_bytes(f"dc/{root_year}.html", root_html, url=url)
 
     # Parse the list of links
     soup = BeautifulSoup(root_html, "html5lib")
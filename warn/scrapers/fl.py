@@ -1,17 +1,13 @@
-import datetime
 import logging
 import re
 from os.path import exists
 from pathlib import Path
 
-import pdfplumber
-import requests
-import tenacity
 import urllib3
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["zstumgoren", "Dilcia19", "shallotly", "stucka"]
 __tags__ = ["html", "pdf"]
@@ -54,7 +50,7 @@ def scrape(
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
     }
     url = "https://floridajobs.org/office-directory/division-of-workforce-services/workforce-programs/reemployment-and-emergency-assistance-coordination-team-react/warn-notices"
-    response = requests.get(url, headers=headers, verify=False)
+    response = utils.get_http_client().get(url, headers=headers, verify=False)
     logger.debug(f"Request status is {response.status_code} for {url}")
     soup = BeautifulSoup(response.text, "html.parser")
     pageholder = soup.select("div.content")[0]
@@ -95,33 +91,18 @@ def scrape(
 
 # scrapes each html page for the current year
 # returns a list of the year's html pages
-# note: no max amount of retries (recursive scraping)
-@tenacity.retry(
-    wait=tenacity.wait_exponential(),
-    retry=tenacity.retry_if_exception_type(requests.HTTPError),
-)
 def _scrape_html(cache, url, headers, page=1):
     urllib3.disable_warnings()  # sidestep SSL error
     # extract year from URL
     year = _extract_year(url)
     html_cache_key = f"fl/{year}_page_{page}.html"
-    current_year = datetime.date.today().year
-    last_year = str(current_year - 1)
-    current_year = str(current_year)
-    page_text = ""
-    # search in cache first before scraping
-    try:
-        # re-scrape current year by default
-        if not (year == current_year or year == last_year):
-            logger.debug(f"Trying to read from cache: {html_cache_key}")
-            cachefile = cache.read(html_cache_key)
-            page_text = cachefile
-            logger.debug(f"Page fetched from cache: {html_cache_key}")
-        else:
-            raise FileNotFoundError
-    except FileNotFoundError:
+    # read settled years from the cache, re-scrape the rest
+    if cache.is_fresh(html_cache_key, immutable=is_settled_year(year)):
+        page_text = cache.read(html_cache_key)
+        logger.debug(f"Page fetched from cache: {html_cache_key}")
+    else:
         # scrape & cache html
-        response = requests.get(url, headers=headers, verify=False)
+        response = utils.get_http_client().get(url, headers=headers, verify=False)
         logger.debug(f"Request status is {response.status_code} for {url}")
         response.raise_for_status()
         page_text = response.text
@@ -168,10 +149,6 @@ def _html_to_rows(page_text):
 
 
 # download and scrape pdf
-@tenacity.retry(
-    wait=tenacity.wait_exponential(),
-    retry=tenacity.retry_if_exception_type(requests.HTTPError),
-)
 def _scrape_pdf(cache, cache_dir, url, headers):
     # sidestep SSL error
     urllib3.disable_warnings()
@@ -181,29 +158,40 @@ def _scrape_pdf(cache, cache_dir, url, headers):
     download = ""
     # download pdf if not in the cache
     if not exists(pdf_cache_key):
-        response = requests.get(url, headers=headers, verify=False)
+        response = utils.get_http_client().get(url, headers=headers, verify=False)
         logger.debug(f"Request status is {response.status_code} for {url}")
         response.raise_for_status()
         # download & cache pdf
         download = response.content
-        with open(f"{cache_dir}/{pdf_cache_key}", "wb") as f:
-            f.write(download)
+        cache.write_bytes(pdf_cache_key, download, url=url)
         logger.debug(f"Successfully scraped PDF from {url} to cache: {pdf_cache_key}")
     # scrape tables from PDF
-    with pdfplumber.open(f"{cache_dir}/{pdf_cache_key}") as pdf:
-        pages = pdf.pages
-        output_rows = []
-        for page_num, page in enumerate(pages):
-            table = page.extract_table(table_settings={})
-            # remove each year's header
-            if page_num == 0:
-                table.pop(0)
-            table = _clean_table(table, output_rows)
-            output_rows.extend(table)  # merging lists
+    output_rows = utils.parse_pdf_pages(
+        f"{cache_dir}/{pdf_cache_key}",
+        _extract_pdf_table,
+        _stitch_pdf_table,
+        cache_dir=cache_dir,
+    )
     logger.debug(f"Successfully scraped PDF from {url}")
     return output_rows
 
 
+# pulls the table out of one page of the pdf
+def _extract_pdf_table(page, page_num):
+    table = page.extract_table(table_settings={})
+    # remove each year's header
+    if page_num == 0:
+        table.pop(0)
+    return table
+
+
+# adds a page's table to output_rows, in page order
+def _stitch_pdf_table(output_rows, table, page_num):
+    table = _clean_table(table, output_rows)
+    output_rows.extend(table)  # merging lists
+    return output_rows
+
+
 # adds split rows to output_rows by reference, returns list of page's rows to be added
 def _clean_table(table, all_rows):
     table_rows = []
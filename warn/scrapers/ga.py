@@ -4,10 +4,10 @@ import re
 from glob import glob
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
 from .. import utils
+from ..cache import Cache
 
 __authors__ = ["chriszs", "esagara", "Ash1R", "stucka"]
 __tags__ = ["html"]
@@ -32,6 +32,8 @@ def scrape(
 
     Returns: the Path where the file is written
     """
+    cache = Cache(cache_dir)
+
     base_url = "https://www.tcsg.edu/warn-public-view/"
 
     api_url = "https://www.tcsg.edu/wp-admin/admin-ajax.php"
@@ -118,7 +120,7 @@ def scrape(
         "setUrlOnSearch": True,
         "shortcode_atts": {"id": 77460, "class": None, "detail": None},
     }
-    response = requests.post(api_url, data=payload, headers=headers)
+    response = utils.get_http_client().post(api_url, data=payload, headers=headers)
 
     # Use JSON as an index to get other data files
     data = response.json()["data"]
@@ -128,8 +130,14 @@ def scrape(
     for listing in data:
         filehref = BeautifulSoup(listing[0], features="html5lib")("a")[0]["href"]
         fileid = BeautifulSoup(listing[0], features="html5lib")("a")[0].contents[0]
-        targetfilename = cache_dir / ("ga/" + fileid + ".format3")
-        utils.fetch_if_not_cached(targetfilename, filehref)
+        cache_key = f"ga/{fileid}.format3"
+        if not cache.exists(cache_key):
+            logger.debug(f"Fetching {cache_key} from {filehref}")
+            response = utils.get_http_client().get(filehref)
+            if not response.ok:
+                logger.error(f"Failed to fetch {filehref} to {cache_key}")
+                continue
+            cache.write_bytes(cache_key, response.content, url=filehref)
 
     # Parse detailed data
     masterlist = []
@@ -190,7 +198,8 @@ def scrape(
     filehref = (
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/ga_historical.csv"
     )
-    utils.fetch_if_not_cached(historicalfilename, filehref)
+    if not cache.exists("ga/ga_historical.csv"):
+        cache.download("ga/ga_historical.csv", filehref)
     with open(historicalfilename, encoding="utf-8") as infile:
         reader = list(csv.DictReader(infile))
         logger.debug(f"Found {len(reader):,} historical records.")
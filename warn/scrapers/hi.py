@@ -1,12 +1,12 @@
 import datetime
 import logging
 from pathlib import Path
-from time import sleep
 from urllib.parse import quote
 
 from bs4 import BeautifulSoup
 
 from .. import utils
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["Ash1R", "stucka"]
 __tags__ = ["html", "pdf"]
@@ -30,6 +30,8 @@ def scrape(
     cache_dir -- the Path where results can be cached (default WARN_CACHE_DIR)
     Returns: the Path where the file is written
     """
+    cache = Cache(cache_dir)
+
     # Google Cache is a backup if the state re-implements its JS-enabled browser equivalent
     usegooglecache = False
     cacheprefix = "https://webcache.googleusercontent.com/search?q=cache%3A"
@@ -57,17 +59,16 @@ def scrape(
     # lastdateseen = "2099-12-31"
 
     for subpageurl in reversed(subpageurls):
-        sleep(2)
-        # Conditionally here, we want to check and see if we have the old cached files, or if the year is current or previous.
-        # Only need to download if it's current or previous year.
-        # But do we care enough to implement right now?
+        pageslug = subpageurl.rstrip("/").split("/")[-1]  # Trim off any final slash
+        pageyear = pageslug[:4]
 
+        # Only download the page if it's for the current or previous year,
+        # or we don't have it cached yet
         logger.debug(f"Parsing page {subpageurl}")
-        page = utils.get_url(subpageurl)
-        soup = BeautifulSoup(page.text, features="html5lib")
-        if subpageurl.endswith("/"):
-            subpageurl = subpageurl[:-1]  # Trim off the final slash, if there is one
-        pageyear = subpageurl.split("/")[-1][:4]
+        html = cache.get_or_fetch(
+            f"hi/{pageslug}.html", subpageurl, immutable=is_settled_year(pageyear)
+        )
+        soup = BeautifulSoup(html, features="html5lib")
 
         # There are at least two formats for Hawaii. In some years, each individual layoff is in a paragraph tag.
         # In others, all the layoffs are grouped under a single paragraph tag, separated by <br>
@@ -3,8 +3,6 @@ import random
 import re
 from pathlib import Path
 
-import pdfplumber
-
 from .. import utils
 from ..cache import Cache
 
@@ -50,11 +48,9 @@ def scrape(
     pdf_file = cache.download(cache_key, url, verify=True)
 
     # Loop through the PDF pages and scrape out the data
-    output_rows: list = []
-    with pdfplumber.open(pdf_file) as pdf:
-        for index, page in enumerate(pdf.pages):
-            rows = page.extract_table()
-            output_rows += _clean_table(rows, index)
+    output_rows = utils.parse_pdf_pages(
+        pdf_file, _extract_page_rows, cache_dir=cache_dir
+    )
 
     # Write out the data to a CSV
     data_path = data_dir / f"{state_code}.csv"
@@ -65,6 +61,19 @@ def scrape(
     return data_path
 
 
+def _extract_page_rows(page, page_index: int) -> list:
+    """
+    Extract the clean rows from the table on a PDF page.
+
+    Keyword arguments:
+    page -- the pdfplumber page
+    page_index -- the index of the page
+
+    Returns: a list of lists, where each inner list is a row in the table
+    """
+    return _clean_table(page.extract_table(), page_index)
+
+
 def _clean_table(rows, page_index) -> list:
     """
     Clean up a table from a PDF.
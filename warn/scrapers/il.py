@@ -13,6 +13,9 @@ __source__ = {
 
 logger = logging.getLogger(__name__)
 
+# Change this when the parsing's output changes, so the export is made again
+PARSER_VERSION = "1"
+
 
 def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
@@ -33,14 +36,20 @@ def scrape(
 
     # Get the file
     url = "https://apps.illinoisworknet.com/iebs/api/public/export?search=&layoffTypes=&trade=0&dateReportedStart=Invalid%20Date&dateReportedEnd=Invalid%20Date&statuses=4&reasons=&eventCauses=&naicsCodes=1&naicIndustries=&naics=&unionsInvolved=0&geolocation=1&cities=&counties=&lwias=&includeAdditionalLwias=false&edrs=&lat=0&lng=0&distance=.5&memberType=1&users=&accessList=&bookmarked=false"
-    file_path = cache.download(f"{state_code}/export.xlsx", url)
+    file_path, changed = cache.download_if_modified(f"{state_code}/export.xlsx", url)
+
+    # If the export hasn't changed since this parser made our file from it, neither has our file
+    data_path = data_dir / f"{state_code}.csv"
+    if not changed and utils.export_is_current(data_path, file_path, PARSER_VERSION):
+        logger.debug(f"{file_path} is unchanged, keeping {data_path}")
+        return data_path
 
     # Parse it
     row_list = utils.parse_excel(file_path)
 
     # Write out the results
-    data_path = data_dir / f"{state_code}.csv"
     utils.write_rows_to_csv(data_path, row_list)
+    utils.stamp_export(data_path, PARSER_VERSION)
 
     # Return the path to the CSV
     return data_path
@@ -1,11 +1,7 @@
 import csv
 import logging
-import typing
 from pathlib import Path
 
-import requests
-from openpyxl import load_workbook
-
 from .. import utils
 from ..cache import Cache
 
@@ -47,7 +43,8 @@ def scrape(
     headers = {
         "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/116.0"
     }
-    r = requests.get(hostpage, headers=headers)
+    client = utils.get_http_client()
+    r = client.get(hostpage, headers=headers)
     html = r.text
     subpage = html.split("WARN Notices by Year</h4")[-1]
     # mypy and BeautifulSoup are not cooperating. So ... extract the URL in a dumb way.
@@ -57,13 +54,8 @@ def scrape(
     # latest_url = "https://kcc.ky.gov/WARN%20notices/WARN%20NOTICES%202022/WARN%20Notice%20Report%2001262022.xls"
     latest_path = cache.download("ky/latest.xlsx", latest_url)
 
-    # Open it up
-    workbook = load_workbook(filename=latest_path)
-
-    dirty_list: list = []
-    for sheet in workbook.worksheets:
-        localrows = parse_xlsx(sheet)
-        dirty_list.extend(localrows)
+    # Open it up and read every sheet
+    dirty_list: list = list(utils.iter_excel_rows(latest_path, sheet=None))
 
     headers = dirty_list[0]
     row_list = []
@@ -92,7 +84,7 @@ def scrape(
     archive_url = "https://storage.googleapis.com/bln-data-public/warn-layoffs/ky-historical-normalized.csv"
 
     logger.debug("Getting KY historical data")
-    r = requests.get(archive_url)
+    r = client.get(archive_url)
 
     reader = list(csv.reader(r.text.splitlines()))
 
@@ -119,33 +111,5 @@ def scrape(
     return data_path
 
 
-def parse_xlsx(worksheet) -> typing.List[typing.List]:
-    """Parse the Excel xlsx file at the provided path.
-
-    Args:
-        worksheet: An openpyxl worksheet ready to parse
-
-    Returns: List of values ready to write.
-    """
-    # Convert the sheet to a list of lists
-    row_list = []
-    for r in worksheet.rows:
-        # Parse cells
-        cell_list = [cell.value for cell in r]
-
-        # Skip empty rows
-        try:
-            # A list with only empty cells will throw an error
-            next(c for c in cell_list if c)
-        except StopIteration:
-            continue
-
-        # Add to the master list
-        row_list.append(cell_list)
-
-    # Pass it back
-    return row_list
-
-
 if __name__ == "__main__":
     scrape()
@@ -1,14 +1,14 @@
 import logging
 import os
 import re
-from datetime import datetime
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 
 import pdfplumber
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["chriszs"]
 __tags__ = ["html", "pdf"]
@@ -19,6 +19,24 @@ __source__ = {
 
 logger = logging.getLogger(__name__)
 
+# The char properties needed to turn cells into text and spot bold type
+CHAR_KEYS = (
+    "text",
+    "fontname",
+    "size",
+    "x0",
+    "x1",
+    "top",
+    "bottom",
+    "doctop",
+    "upright",
+    "width",
+    "height",
+)
+
+# Change this when _parse_page's output changes, to set aside cached results
+PARSER_VERSION = "1"
+
 
 def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
@@ -62,7 +80,7 @@ def scrape(
             pdf_path = _read_or_download(cache, state_code, pdf_url)
 
             # Process the PDF
-            rows = _process_pdf(pdf_path)
+            rows = _process_pdf(pdf_path, cache_dir)
             all_rows.extend(rows)
 
     # Insert a header row with clean column names.
@@ -146,84 +164,162 @@ def _is_first(index: int) -> bool:
     return index == 0
 
 
-def _is_mostly_empty(row: list) -> bool:
+def _is_mostly_empty(row: list, cell_text) -> bool:
     """
     Check if a row has few populated cells. Used to determine if carried over from a previous page.
 
     Keyword arguments:
     row -- the row to check
+    cell_text -- the _CellText used to turn the cells into text
 
     Returns: True if the row is mostly empty, False otherwise
     """
-    return len(list(filter(pdfplumber.utils.extract_text, row))) <= 2
+    return len(list(filter(cell_text, row))) <= 2
+
 
+class _CellText:
+    """
+    Turn the chars of a cell into text, once for each distinct cell.
 
-def _process_pdf(pdf_path) -> list:
+    Cells are lists of chars that only ever grow, when a row is stitched onto
+    the row above, so a cell's identity and length stand in for its contents.
+    """
+
+    def __init__(self):
+        """Initialize a new instance."""
+        self._texts: dict = {}
+
+    def __call__(self, chars: list) -> str:
+        """
+        Return the text for a cell.
+
+        Keyword arguments:
+        chars -- the characters in the cell
+
+        Returns: the text
+        """
+        key = (id(chars), len(chars))
+        entry = self._texts.get(key)
+        if entry is None:
+            # Hold on to the chars so their id can't be reused by another cell
+            entry = (chars, pdfplumber.utils.extract_text(chars))
+            self._texts[key] = entry
+        return entry[1]
+
+    def remember(self, chars: list, text: str):
+        """
+        Record text that has already been extracted for a cell.
+
+        Keyword arguments:
+        chars -- the characters in the cell
+        text -- their text
+        """
+        self._texts[(id(chars), len(chars))] = (chars, text)
+
+
+def _process_pdf(pdf_path, cache_dir=None) -> list:
     """
     Process a PDF file.
 
     Keyword arguments:
     pdf_path -- the path to the PDF file
+    cache_dir -- the Path where parsed pages can be cached (optional)
 
     Returns: a list of rows
     """
-    output_rows: list = []
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            for table in page.debug_tablefinder().tables:
-                for index, row in enumerate(table.rows):
-                    cells = row.cells
-                    cells = [_extract_cell_chars(page, cell) for cell in cells]
-
-                    # If the first row in a table is mostly empty,
-                    # append its contents to the previous row
-                    if (
-                        _is_first(index)
-                        and _is_mostly_empty(cells)
-                        and _has_rows(output_rows)
-                    ):
-                        output_rows = _append_contents_to_cells_in_row_above(
-                            output_rows, index, cells
-                        )
-                    # Otherwise, if a row is mostly empty, pull data into blank cells and add current row
-                    elif _is_mostly_empty(cells):
-                        cells = _append_contents_to_row_from_row_above(
-                            output_rows, index, cells
-                        )
-                        output_rows.append(cells)
-                    # Otherwise, append the row
-                    else:
-                        output_rows.append(cells)
-
-    return _clean_rows(output_rows)
-
-
-def _clean_rows(rows):
+    cell_text = _CellText()
+
+    def stitch(output_rows: list, page_rows: list, page_index: int) -> list:
+        for index, cells, texts in page_rows:
+            for chars, text in zip(cells, texts):
+                cell_text.remember(chars, text)
+            mostly_empty = _is_mostly_empty(cells, cell_text)
+
+            # If the first row in a table is mostly empty,
+            # append its contents to the previous row
+            if _is_first(index) and mostly_empty and _has_rows(output_rows):
+                output_rows = _append_contents_to_cells_in_row_above(
+                    output_rows, index, cells
+                )
+            # Otherwise, if a row is mostly empty, pull data into blank cells and add current row
+            elif mostly_empty:
+                cells = _append_contents_to_row_from_row_above(
+                    output_rows, index, cells
+                )
+                output_rows.append(cells)
+            # Otherwise, append the row
+            else:
+                output_rows.append(cells)
+        return output_rows
+
+    output_rows = utils.parse_pdf_pages(
+        pdf_path,
+        _parse_page,
+        stitch,
+        cache_dir=cache_dir,
+        parser_version=PARSER_VERSION,
+    )
+
+    return _clean_rows(output_rows, cell_text)
+
+
+def _parse_page(page, page_index: int) -> list:
+    """
+    Cut the rows of the tables on a page into cells of characters.
+
+    Keyword arguments:
+    page -- the page to parse
+    page_index -- the index of the page
+
+    Returns: a list of (index of the row in its table, cells, text of each cell) tuples
+    """
+    rows = []
+    cell_text = _CellText()
+
+    # Sort the page's chars once, rather than filtering them all for every cell
+    char_index = _index_chars(page)
+    for table in page.debug_tablefinder().tables:
+        for index, row in enumerate(table.rows):
+            cells = [_extract_cell_chars(page, cell, char_index) for cell in row.cells]
+            texts = [cell_text(chars) for chars in cells]
+            # Only keep the char properties we use, so the page is cheap to pass around
+            cells = [
+                [{key: char[key] for key in CHAR_KEYS} for char in chars]
+                for chars in cells
+            ]
+            rows.append((index, cells, texts))
+
+    return rows
+
+
+def _clean_rows(rows, cell_text=None):
     """
     Clean up rows.
 
     Keyword arguments:
     rows -- the rows to clean
+    cell_text -- the _CellText used to turn the cells into text (optional)
 
     Returns: the cleaned rows
     """
+    cell_text = cell_text or _CellText()
     output_rows = []
 
     for row in rows:
         output_row = []
         for column_index, chars in enumerate(row):
-            text = _clean_text(pdfplumber.utils.extract_text(chars))
+            raw_text = cell_text(chars)
+            text = _clean_text(raw_text)
 
             # If we're on the first column, try to extract location and notes
             if _is_first(column_index):
                 # Tries to extract a company name, appends it to the row
-                company_name = _extract_company_name(chars)
+                company_name = _extract_company_name(chars, raw_text)
                 output_row.append(company_name)
                 remaining_text = text.replace(company_name, "")
 
                 # Tries to extract a note, typically UPDATE or WARN RESCINDED
-                note = _extract_note(chars).strip()
+                note = _extract_note(raw_text).strip()
 
                 # Whatever is left is assumbed to be the location
                 location = remaining_text.strip().replace(note, "")
@@ -244,13 +340,28 @@ def _clean_rows(rows):
     return output_rows
 
 
-def _extract_cell_chars(page, bbox):
+def _index_chars(page) -> tuple:
+    """
+    Sort the characters on a page by their top edge.
+
+    Keyword arguments:
+    page -- the page to index
+
+    Returns: a tuple of the sorted top edges and the matching (position, character) pairs
+    """
+    chars = sorted(enumerate(page.chars), key=lambda item: item[1]["top"])
+    tops = [char["top"] for _, char in chars]
+    return tops, chars
+
+
+def _extract_cell_chars(page, bbox, char_index=None):
     """
     Extract the characters from a cell.
 
     Keyword arguments:
     page -- the page from which to extract the characters
     bbox -- the bounding box of the cell
+    char_index -- the page's characters, as indexed by _index_chars (optional)
 
     Returns: a list of characters
     """
@@ -262,8 +373,20 @@ def _extract_cell_chars(page, bbox):
     vertical_threshold = 5
     expanded_bbox = _vertically_expand_bounding_box(bbox, vertical_threshold)
 
-    # Get the characters from the cell
-    return page.within_bbox(expanded_bbox).chars
+    # Without an index, filter every character on the page
+    if char_index is None:
+        return page.within_bbox(expanded_bbox).chars
+
+    # Reject the same boxes page.within_bbox would
+    pdfplumber.page.test_proposed_bbox(expanded_bbox, page.bbox)
+
+    # Only characters whose top edge falls inside the box can be within it
+    tops, chars = char_index
+    _, top, _, bottom = expanded_bbox
+    candidates = sorted(chars[bisect_left(tops, top) : bisect_right(tops, bottom)])
+
+    # Apply pdfplumber's own test, keeping the characters in page order
+    return pdfplumber.utils.within_bbox([char for _, char in candidates], expanded_bbox)
 
 
 def _vertically_expand_bounding_box(bbox, increase):
@@ -298,15 +421,8 @@ def _read_or_download(cache: Cache, prefix: str, url: str) -> Path:
     file_name = os.path.basename(url)
     cache_key = f"{prefix}/{file_name}"
 
-    exists = cache.exists(cache_key)
     year = _extract_year(file_name)
-    current_year = datetime.now().year
-
-    # Form a file path so we can read from the cache
-    if exists and year < current_year - 1:
-        return cache.path / cache_key
-
-    return cache.download(cache_key, url)
+    return cache.get_or_download(cache_key, url, immutable=is_settled_year(year))
 
 
 def _extract_year(text: str) -> int:
@@ -351,17 +467,15 @@ def _is_clean_header(row: list) -> bool:
     return _is_header(row) and "Employees Affected" in row
 
 
-def _extract_note(chars) -> str:
+def _extract_note(text: str) -> str:
     """
     Extract a note from a PDF cell.
 
     Keyword arguments:
-    chars -- the characters to extract the note from
+    text -- the text of the cell to extract the note from
 
     Returns: the note
     """
-    text = pdfplumber.utils.extract_text(chars)
-
     # Split text into lines
     lines = text.split("\n")
 
@@ -376,17 +490,16 @@ def _extract_note(chars) -> str:
     return " ".join(notes)
 
 
-def _extract_company_name(chars) -> str:
+def _extract_company_name(chars, text: str) -> str:
     """
     Extract the company name from a PDF cell.
 
     Keyword arguments:
     chars -- the characters to extract the company name from
+    text -- the text of those characters
 
     Returns: the company name
     """
-    text = pdfplumber.utils.extract_text(chars)
-
     # Split text into lines
     lines = text.split("\n")
 
@@ -7,7 +7,7 @@ from pathlib import Path
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["zstumgoren", "Dilcia19", "shallotly"]
 __tags__ = ["html"]
@@ -51,16 +51,9 @@ def scrape(
         # Set the URL, with a hack for 2020 and 2022
         url = f"https://jobs.mo.gov/warn/{year}"
 
-        # Read from cache if available and not this year or the year before
+        # Read from cache if the year is settled, otherwise go request it
         cache_key = f"mo/{year}.html"
-        if cache.exists(cache_key) and year < current_year - 1:
-            html = cache.read(cache_key)
-        else:
-            # Otherwise, go request it
-            r = utils.get_url(url)
-            html = r.text
-            # Save it to the cache
-            cache.write(cache_key, html)
+        html = cache.get_or_fetch(cache_key, url, immutable=is_settled_year(year))
 
         # Add it to the list
         html_list.append(html)
@@ -1,7 +1,6 @@
 from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
-from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
@@ -55,27 +54,8 @@ def scrape(
     # Download the Excel file
     excel_path = cache.download("mt/source.xlsx", excel_url, verify=True)
 
-    # Open it up
-    workbook = load_workbook(filename=excel_path)
-
-    # Get the first sheet
-    worksheet = workbook.worksheets[0]
-
-    # Convert the sheet to a list of lists
-    row_list = []
-    for row in worksheet.rows:
-        # Get the cells
-        cell_list = [cell.value for cell in row]
-
-        # Skip empty rows
-        try:
-            # A list with only empty cell will throw an error
-            next(i for i in cell_list if i)
-        except StopIteration:
-            continue
-
-        # Add it to the pile
-        row_list.append(cell_list)
+    # Stream the rows from the first sheet, skipping empty ones
+    row_list = utils.iter_excel_rows(excel_path)
 
     # Set the export path
     data_path = data_dir / "mt.csv"
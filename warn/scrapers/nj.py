@@ -1,8 +1,6 @@
 import logging
 from pathlib import Path
 
-from openpyxl import load_workbook
-
 from .. import utils
 from ..cache import Cache
 
@@ -36,47 +34,39 @@ def scrape(
     url = "https://www.nj.gov/labor/assets/PDFs/WARN/WARN_Notice_Archive.xlsx"
     wb_path = cache.download("nj/source.xlsx", url)
 
-    # Read in the workbook
-    output_rows = []
-    wb = load_workbook(filename=wb_path)
-    for ws in wb.worksheets:
-        logger.debug(f"Parsing {ws}")
-        for i, row in enumerate(ws.rows):
-            # Skip header
-            if i == 0:
-                continue
-
-            # A list with only empty cells will throw an error
-            try:
-                next(v for v in row if v.value)
-            except StopIteration:
-                continue
-
-            # Parse out data
-            d = {
-                "Company": _parse_value(row[0]),
-                "City": _parse_value(row[1]),
-                "Month Posted": _parse_value(row[2]),
-                "Effective Date": _parse_value(row[3]),
-                "Workforce Affected": _parse_value(row[4]),
-            }
-
-            # Tack it on
-            output_rows.append(d)
-
     # Set the export path
     data_path = data_dir / "nj.csv"
 
-    # Write out the file
-    headers = output_rows[0].keys()
-    utils.write_dict_rows_to_csv(data_path, headers, output_rows)
+    # Write out the file as the workbook is read
+    logger.debug(f"Parsing {wb_path}")
+    headers = [
+        "Company",
+        "City",
+        "Month Posted",
+        "Effective Date",
+        "Workforce Affected",
+    ]
+    utils.write_dict_rows_to_csv(data_path, headers, _iter_rows(wb_path))
 
     # Return the path to the file
     return data_path
 
 
-def _parse_value(cell):
-    v = cell.value
+def _iter_rows(wb_path: Path):
+    """Yield a dict for each notice in the workbook."""
+    # Skip the header on each sheet, and any empty rows
+    for row in utils.iter_excel_rows(wb_path, sheet=None, skip_rows=1):
+        # Parse out data
+        yield {
+            "Company": _parse_value(row[0]),
+            "City": _parse_value(row[1]),
+            "Month Posted": _parse_value(row[2]),
+            "Effective Date": _parse_value(row[3]),
+            "Workforce Affected": _parse_value(row[4]),
+        }
+
+
+def _parse_value(v):
     if isinstance(v, str):
         return v.strip()
     return v
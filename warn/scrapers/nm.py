@@ -1,15 +1,14 @@
 import logging
 import os
 import re
-from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
-import pdfplumber
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["chriszs"]
 __tags__ = ["pdf"]
@@ -63,31 +62,14 @@ def scrape(
         file_name = os.path.basename(pdf_url)
         cache_key = f"{state_code}/{file_name}"
         year = _extract_year(file_name)
-        current_year = datetime.now().year
-        if cache.exists(cache_key) and year is not None and year < current_year - 1:
-            pdf_path = Path(cache_dir, cache_key)
-        else:
-            pdf_path = cache.download(cache_key, pdf_url)
-
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_index, page in enumerate(pdf.pages):
-                rows = page.extract_table()
-
-                # Loop through the rows
-                for row_index, row in enumerate(rows):
-                    # Skip headers on all but first page of first PDF
-                    if pdf_index > 0 and row_index == 0:
-                        logger.debug(
-                            f"Skipping header row on PDF {pdf_index+1} page {page_index+1}"
-                        )
-                        continue
-
-                    # Extract data
-                    output_row = [_clean_text(cell) for cell in row]
-
-                    # Write row
-                    if any([cell != "" for cell in output_row]):
-                        output_rows.append(output_row)
+        pdf_path = cache.get_or_download(
+            cache_key, pdf_url, immutable=is_settled_year(year)
+        )
+
+        stitch = partial(_stitch_table, pdf_index)
+        output_rows += utils.parse_pdf_pages(
+            pdf_path, _extract_table, stitch, cache_dir=cache_dir
+        )
 
     # Write out to CSV
     data_path = data_dir / f"{state_code}.csv"
@@ -97,6 +79,49 @@ def scrape(
     return data_path
 
 
+def _extract_table(page, page_index: int) -> list:
+    """
+    Extract the table from a PDF page.
+
+    Keyword arguments:
+    page -- the pdfplumber page
+    page_index -- the index of the page
+
+    Returns: the rows of the table
+    """
+    return page.extract_table()
+
+
+def _stitch_table(pdf_index: int, output_rows: list, rows: list, page_index: int):
+    """
+    Add the clean rows from a page's table to the output.
+
+    Keyword arguments:
+    pdf_index -- the index of the PDF
+    output_rows -- the rows so far
+    rows -- the rows of the page's table
+    page_index -- the index of the page
+
+    Returns: the rows so far
+    """
+    # Loop through the rows
+    for row_index, row in enumerate(rows):
+        # Skip headers on all but first page of first PDF
+        if pdf_index > 0 and row_index == 0:
+            logger.debug(
+                f"Skipping header row on PDF {pdf_index+1} page {page_index+1}"
+            )
+            continue
+
+        # Extract data
+        output_row = [_clean_text(cell) for cell in row]
+
+        # Write row
+        if any([cell != "" for cell in output_row]):
+            output_rows.append(output_row)
+    return output_rows
+
+
 def _clean_text(text: str) -> str:
     """
     Clean up text from a PDF cell.
@@ -2,7 +2,6 @@ import logging
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
@@ -97,20 +96,11 @@ def _get_historical_data(cache):
 
     excel_path = cache.download("ny/source.xlsx", url)
 
-    # Open it up
-    workbook = load_workbook(filename=excel_path)
-
-    # Get the first sheet
-    worksheet = workbook.worksheets[0]
-
-    # Convert the sheet to a list of lists
-    row_list = []
-    for r in worksheet.rows:
-        column = [cell.value for cell in r]
-        row_list.append(column)
+    # Stream the rows from the first sheet
+    row_list = utils.iter_excel_rows(excel_path, skip_empty=False)
 
     # Transform this into a list of dictionaries with headers as keys
-    header_list = row_list.pop(0)
+    header_list = next(row_list)
     dict_list = []
     for row in row_list:
         d = {}
@@ -3,7 +3,6 @@ import json
 import logging
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
 from .. import utils
@@ -41,7 +40,8 @@ def scrape(
     latesturl = "https://jfs.ohio.gov/wps/portal/gov/jfs/job-services-and-unemployment/job-services/job-programs-and-services/submit-a-warn-notice/current-public-notices-of-layoffs-and-closures-sa/current-public-notices-of-layoffs-and-closures"
 
     logger.debug("Attempting to fetch current data")
-    r = requests.get(latesturl, headers=headers)
+    client = utils.get_http_client()
+    r = client.get(latesturl, headers=headers)
     soup = BeautifulSoup(r.content)
     logger.debug("Attempting to get JSON data from Ohio file")
     data_div = soup.find("div", {"id": "js-placeholder-json-data"})
@@ -73,7 +73,7 @@ def scrape(
         "Notice ID": "Notice ID",
     }
 
-    r = requests.get(
+    r = client.get(
         "https://storage.googleapis.com/bln-data-public/warn-layoffs/oh_historical.csv"
     )
     reader = list(csv.DictReader(r.text.splitlines()))
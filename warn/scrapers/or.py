@@ -1,9 +1,7 @@
 import logging
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
-from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
@@ -37,7 +35,8 @@ def scrape(
     starturl = "https://ccwd.hecc.oregon.gov/Layoff/WARN/Download"
     baseurl = "https://ccwd.hecc.oregon.gov"
 
-    r = requests.get(starturl)
+    client = utils.get_http_client()
+    r = client.get(starturl)
 
     cookies = r.cookies
 
@@ -74,7 +73,7 @@ def scrape(
         "Connection": "keep-alive",
     }
 
-    r = requests.post(starturl, cookies=cookies, data=payload, headers=requestheaders)
+    r = client.post(starturl, cookies=cookies, data=payload, headers=requestheaders)
 
     dlsoup = BeautifulSoup(r.content, features="html5lib")
     excellink = dlsoup.find("a", {"class": "btn-primary"})
@@ -89,19 +88,17 @@ def scrape(
     logger.debug(f"Trying to save to, we hope, {cache_dir/latest_excel_path}")
     cache.download(latest_excel_path, excelurl)
 
-    workbook = load_workbook(filename=cache_dir / latest_excel_path)
-    worksheet = workbook.worksheets[0]
-
     masterlist: list = []
-    headers: list = []
 
-    sheetrows = list(worksheet.rows)
-    for cell in sheetrows[2]:
-        headers.append(cell.value)
-    for row in sheetrows[3:]:
+    # The header is on the third row
+    sheetrows = utils.iter_excel_rows(
+        cache_dir / latest_excel_path, skip_empty=False, skip_rows=2
+    )
+    headers: list = next(sheetrows)
+    for row in sheetrows:
         line = {}
         for i, item in enumerate(headers):
-            line[item] = list(row)[i].value
+            line[item] = row[i]
         if (
             len(str(line[headers[0]])) + len(str(line[headers[1]])) != 0
         ):  # Filter out blank rows
@@ -111,16 +108,14 @@ def scrape(
     )
     historical_excel_path = str(cache_dir) + "/or/historical.xlsx"
 
-    utils.fetch_if_not_cached(historical_excel_path, historicalurl)
-    workbook = load_workbook(filename=historical_excel_path)
+    if not cache.exists("or/historical.xlsx"):
+        cache.download("or/historical.xlsx", historicalurl)
 
-    # Get the first sheet
-    worksheet = workbook.worksheets[0]
-    sheetrows = list(worksheet.rows)
-
-    historical_headers = []
-    for cell in sheetrows[2]:
-        historical_headers.append(cell.value)
+    # Stream the first sheet, which also has its header on the third row
+    sheetrows = utils.iter_excel_rows(
+        historical_excel_path, skip_empty=False, skip_rows=2
+    )
+    historical_headers = next(sheetrows)
 
     if historical_headers != headers:
         logger.error("Newest headers no longer match historical headers")
@@ -128,10 +123,10 @@ def scrape(
         logger.debug("OK! Newest headers match historical headers.")
 
     duplicated_rows = 0
-    for row in sheetrows[3:]:
+    for row in sheetrows:
         line = {}
         for i, item in enumerate(headers):
-            line[item] = list(row)[i].value
+            line[item] = row[i]
         if (
             len(str(line[headers[0]])) + len(str(line[headers[1]]))
         ) != 0:  # Filter out blank rows
@@ -1,7 +1,6 @@
 import typing
 from pathlib import Path
 
-import pdfplumber
 from bs4 import BeautifulSoup
 
 from .. import utils
@@ -106,41 +105,20 @@ def scrape(
         "Total",
     ]
 
-    # Open the PDF
-    with pdfplumber.open(pdf_file) as pdf:
-        # Loop through all the pages
-        for i, my_page in enumerate(pdf.pages):
-            # Sll even pages have data, odd pages don't have the data
-            if i % 2 != 0:
-                continue
-
-            # Pull out the table and loop through the rows
-            table = my_page.extract_table()
-            if not table:
-                continue
-
-            # Cut empty rows
-            row_list = [r for r in table if any(r)]
-            if not row_list:
-                continue
-
-            # If this is a summary table, skip it
-            first_cell = row_list[0][0]
-            assert first_cell
-            if first_cell.lower().strip() == "summary by month":
-                continue
+    # Pull the rows out of all the pages of the PDF
+    row_list = utils.parse_pdf_pages(pdf_file, _extract_page_rows, cache_dir=cache_dir)
 
-            # Loop through all the rows ...
-            for row in row_list:
-                # Skip remove redundant headers
-                if row[0] in pdf_header_blacklist:
-                    continue
+    # Loop through all the rows ...
+    for row in row_list:
+        # Skip remove redundant headers
+        if row[0] in pdf_header_blacklist:
+            continue
 
-                # Toss in an empty Notice ID since it isn't in the PDF
-                row.append("")
+        # Toss in an empty Notice ID since it isn't in the PDF
+        row.append("")
 
-                # Add the data to our output
-                cleaned_data.append(row)
+        # Add the data to our output
+        cleaned_data.append(row)
 
     # Set the path to the final CSV
     output_csv = data_dir / "tn.csv"
@@ -152,5 +130,30 @@ def scrape(
     return output_csv
 
 
+def _extract_page_rows(my_page, i):
+    """Pull the data rows out of the provided page of the PDF."""
+    # Sll even pages have data, odd pages don't have the data
+    if i % 2 != 0:
+        return []
+
+    # Pull out the table
+    table = my_page.extract_table()
+    if not table:
+        return []
+
+    # Cut empty rows
+    row_list = [r for r in table if any(r)]
+    if not row_list:
+        return []
+
+    # If this is a summary table, skip it
+    first_cell = row_list[0][0]
+    assert first_cell
+    if first_cell.lower().strip() == "summary by month":
+        return []
+
+    return row_list
+
+
 if __name__ == "__main__":
     scrape()
@@ -3,7 +3,6 @@ import re
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from openpyxl import load_workbook
 
 from .. import utils
 from ..cache import Cache
@@ -59,8 +58,22 @@ def scrape(
         if year >= 2019:
             href_list.append(href)
 
+    # Stream the rows out of each workbook
+    row_list = _iter_rows(cache, href_list)
+
+    # Set the export path
+    data_path = data_dir / "tx.csv"
+
+    # Write out the file
+    utils.write_rows_to_csv(data_path, row_list)
+
+    # Return the path to the file
+    return data_path
+
+
+def _iter_rows(cache: Cache, href_list: list):
+    """Yield the rows from each yearly workbook, then from the historical one."""
     # Loop through the links we want to download
-    row_list = []
     for ihref, href in enumerate(href_list):
         # get each url from the HTML links we found
         data_url = f"https://www.twc.texas.gov{href}"
@@ -70,25 +83,18 @@ def scrape(
         ext = _get_ext(href)
         excel_path = cache.download(f"tx/{year}{ext}", data_url)
 
-        # Open it up
-        workbook = load_workbook(filename=excel_path)
-
-        # Get the first sheet
-        worksheet = workbook.worksheets[0]
-
-        # Convert the sheet to a list of lists
-        for irow, row in enumerate(worksheet.rows):
-            # Skip headers after the first workbook
-            if ihref > 0 and irow == 0:
-                continue
-            cell_list = [cell.value for cell in row]
-
+        # Stream the rows from the first sheet,
+        # skipping headers after the first workbook
+        rows = utils.iter_excel_rows(
+            excel_path, skip_empty=False, skip_rows=1 if ihref > 0 else 0
+        )
+        for cell_list in rows:
             # Skip empty rows
             if cell_list[0] is None:
                 continue
 
             # Add what's left to the pile
-            row_list.append(cell_list)
+            yield cell_list
 
     # Get historical URL
     historical_url = (
@@ -96,20 +102,10 @@ def scrape(
     )
     excel_path = cache.download("tx/historical.xlsx", historical_url)
 
-    # Open it up
-    workbook = load_workbook(filename=excel_path)
-
-    # Get the first sheet
-    worksheet = workbook.worksheets[0]
-
-    # Convert the sheet to a list of lists
-    for i, row in enumerate(worksheet.rows):
-        # Skip header
-        if i == 0:
-            continue
-
+    # Stream the rows from the first sheet, skipping the header
+    for row in utils.iter_excel_rows(excel_path, skip_empty=False, skip_rows=1):
         # Trim down to only the columns in the scrape, so they match
-        select_columns = [
+        cell_list = [
             row[8],  # NOTICE_DATE
             row[0],  # JOB_SITE_NAME
             row[2],  # COUNTY_NAME
@@ -121,17 +117,7 @@ def scrape(
         ]
 
         # Tack 'em on
-        cell_list = [c.value for c in select_columns]
-        row_list.append(cell_list)
-
-    # Set the export path
-    data_path = data_dir / "tx.csv"
-
-    # Write out the file
-    utils.write_rows_to_csv(data_path, row_list)
-
-    # Return the path to the file
-    return data_path
+        yield cell_list
 
 
 def _get_year(url: str) -> int:
@@ -1,4 +1,3 @@
-import csv
 import logging
 from pathlib import Path
 
@@ -46,26 +45,20 @@ def scrape(
     table_list = soup.find_all("table")
 
     # Scrape out the data
-    row_list = []
-    for i, table in enumerate(table_list):
-        row_list.extend(_parse_table(table, i == 0))
+    row_list = (
+        row for i, table in enumerate(table_list) for row in _parse_table(table, i == 0)
+    )
 
     # Write out
     data_path = data_dir / "ut.csv"
-    utils.create_directory(data_path, is_file=True)
-    logger.debug(f"Writing {len(row_list)} rows to {data_path}")
-    # The utils.write_rows_to_csv function doesn't explicitly use utf-8, so it crashes Windows.
-    with open(data_path, mode="w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerows(row_list)
+    utils.write_rows_to_csv(data_path, row_list)
 
     # Return the path to the CSV
     return data_path
 
 
-def _parse_table(table, include_headers) -> list:
+def _parse_table(table, include_headers):
     # Parse the cells
-    row_list = []
     tags = ["td"]
     if include_headers:
         tags.append("th")
@@ -74,10 +67,7 @@ def _parse_table(table, include_headers) -> list:
         if not cell_list:
             continue
         cell_list = [c.text.strip() for c in cell_list]
-        row_list.append(cell_list)
-
-    # Return it
-    return row_list
+        yield cell_list
 
 
 if __name__ == "__main__":
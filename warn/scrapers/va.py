@@ -15,6 +15,9 @@ __source__ = {
 
 logger = logging.getLogger(__name__)
 
+# Change this when the parsing's output changes, so the export is made again
+PARSER_VERSION = "1"
+
 
 def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
@@ -48,16 +51,24 @@ def scrape(
     csv_url = f"https://www.vec.virginia.gov{csv_href}"
 
     # Download it to the cache
-    cache.download("va/source.csv", csv_url, verify=False)
-
-    # Open it up as a list of rows
-    csv_rows = cache.read_csv("va/source.csv")
+    csv_path, changed = cache.download_if_modified(
+        "va/source.csv", csv_url, verify=False
+    )
 
     # Set the export path
     data_path = data_dir / "va.csv"
 
+    # If the CSV hasn't changed since this parser made our file from it, neither has our file
+    if not changed and utils.export_is_current(data_path, csv_path, PARSER_VERSION):
+        logger.debug(f"va/source.csv is unchanged, keeping {data_path}")
+        return data_path
+
+    # Open it up as a list of rows
+    csv_rows = cache.read_csv("va/source.csv")
+
     # Write out the file
     utils.write_rows_to_csv(data_path, csv_rows)
+    utils.stamp_export(data_path, PARSER_VERSION)
 
     # Return the export path
     return data_path
@@ -1,11 +1,11 @@
+import asyncio
 import logging
 import re
 from pathlib import Path
 
-import requests
 from bs4 import BeautifulSoup, Tag
 
-from .. import utils
+from .. import aio, journal, utils
 from ..cache import Cache
 
 __authors__ = ["zstumgoren", "Dilcia19"]
@@ -18,13 +18,16 @@ __source__ = {
 logger = logging.getLogger(__name__)
 
 
-def scrape(
+async def scrape(
     data_dir: Path = utils.WARN_DATA_DIR,
     cache_dir: Path = utils.WARN_CACHE_DIR,
 ) -> Path:
     """
     Scrape data from Washington.
 
+    This is a coroutine, so the runner can scrape it on an event loop
+    alongside other states while it waits on each page.
+
     Arguments:
     data_dir -- the Path were the result will be saved (default WARN_DATA_DIR)
     cache_dir -- the Path where results can be cached (default WARN_CACHE_DIR)
@@ -36,72 +39,80 @@ def scrape(
 
     output_rows = []
 
-    with requests.Session() as session:
-        # Request the initial page
-        url = "https://fortress.wa.gov/esd/file/warn/Public/SearchWARN.aspx"
-        user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:68.0) Gecko/20100101 Firefox/68.0"
-        r = utils.get_url(url, user_agent=user_agent, session=session)
-
-        # Save it to the cache
-        html = r.text
-        cache.write("wa/source.html", html)
-
-        # Parse out the headers
+    client = aio.get_http_client()
+
+    # Request the initial page
+    url = "https://fortress.wa.gov/esd/file/warn/Public/SearchWARN.aspx"
+    user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:68.0) Gecko/20100101 Firefox/68.0"
+    r = await aio.get_url(url, user_agent=user_agent)
+
+    # Save it to the cache
+    html = r.text
+    await aio.to_thread(cache.write, "wa/source.html", html)
+
+    # Parse out the headers
+    soup = BeautifulSoup(html, "html5lib")
+    table_list = soup.find_all("table")
+    first_table = table_list[0]
+    first_row = first_table.find_all("tr")[2]
+    th_list = first_row.find_all("th")
+    headers = [_clean_text(th.text) for th in th_list]
+    output_rows.append(headers)
+
+    # Parse the data
+    row_list = _parse_table(first_table)
+    output_rows.extend(row_list)
+
+    # Start jumping through the pages
+    soup_content = BeautifulSoup(r.content, "html5lib")
+
+    page = 2
+    while True:
+        cache_key = f"wa/{page}.html"
+        if journal.finished_unit(f"pages/{page}") and cache.exists(cache_key):
+            # Read the page the last run got, since it carries the state for the next
+            html = await aio.to_thread(cache.read, cache_key)
+            soup_content = BeautifulSoup(html, "html5lib")
+        else:
+            # Post for the next page
+            view_state = soup_content.find("input", attrs={"name": "__VIEWSTATE"})
+            event_validation = soup_content.find(
+                "input", attrs={"name": "__EVENTVALIDATION"}
+            )
+            # Past the last page, there's no form to post for the next one
+            if not isinstance(view_state, Tag) or not isinstance(event_validation, Tag):
+                break
+            formdata = {
+                "__EVENTTARGET": "ucPSW$gvMain",
+                "__EVENTARGUMENT": f"Page${page}",
+                "__VIEWSTATE": view_state["value"],
+                "__EVENTVALIDATION": event_validation["value"],
+            }
+            # Errors making the request aren't the end of the list, so let them through
+            next = await client.post(url, data=formdata)
+            logger.debug(f"Page status is {next.status_code} for {url}")
+
+            # Update the input variables
+            soup_content = BeautifulSoup(next.content, "html5lib")
+
+            # Cache the html
+            html = next.text
+            await aio.to_thread(cache.write, cache_key, html)
+
+        # Parse out the data
         soup = BeautifulSoup(html, "html5lib")
         table_list = soup.find_all("table")
-        first_table = table_list[0]
-        first_row = first_table.find_all("tr")[2]
-        th_list = first_row.find_all("th")
-        headers = [_clean_text(th.text) for th in th_list]
-        output_rows.append(headers)
 
-        # Parse the data
+        # Once a page comes back without the table, we're done
+        if not table_list:
+            break
+        first_table = table_list[0]
         row_list = _parse_table(first_table)
         output_rows.extend(row_list)
+        await aio.to_thread(journal.record_unit, f"pages/{page}")
 
-        # Start jumping through the pages
-        soup_content = BeautifulSoup(r.content, "html5lib")
-
-        page = 2
-        while True:
-            try:
-                # Post for the next page
-                view_state = soup_content.find("input", attrs={"name": "__VIEWSTATE"})
-                event_validation = soup_content.find(
-                    "input", attrs={"name": "__EVENTVALIDATION"}
-                )
-                if isinstance(view_state, Tag) and isinstance(event_validation, Tag):
-                    formdata = {
-                        "__EVENTTARGET": "ucPSW$gvMain",
-                        "__EVENTARGUMENT": f"Page${page}",
-                        "__VIEWSTATE": view_state["value"],
-                        "__EVENTVALIDATION": event_validation["value"],
-                    }
-                else:
-                    raise ValueError("Could not find view state or event validation")
-                next = session.post(url, data=formdata)
-                logger.debug(f"Page status is {next.status_code} for {url}")
-
-                # Update the input variables
-                soup_content = BeautifulSoup(next.content, "html5lib")
-
-                # Cache the html
-                html = next.text
-                cache.write(f"wa/{page}.html", html)
-
-                # Parse out the data
-                soup = BeautifulSoup(html, "html5lib")
-                table_list = soup.find_all("table")
-                first_table = table_list[0]
-                row_list = _parse_table(first_table)
-                output_rows.extend(row_list)
-
-                # Up the page number
-                page += 1
-
-            # Once it fails, we're done
-            except Exception:
-                break
+        # Up the page number
+        page += 1
 
     # Set the export path
     data_path = data_dir / "wa.csv"
@@ -137,4 +148,4 @@ def _clean_text(text):
 
 
 if __name__ == "__main__":
-    scrape()
+    asyncio.run(scrape())
@@ -8,7 +8,7 @@ from pathlib import Path
 from bs4 import BeautifulSoup
 
 from .. import utils
-from ..cache import Cache
+from ..cache import Cache, is_settled_year
 
 __authors__ = ["zstumgoren", "Dilcia19", "ydoc5212", "palewire", "stucka"]
 __tags__ = ["html"]
@@ -64,13 +64,8 @@ def scrape(
 
         # Request fresh pages, use cache for old ones
         cache_key = f"wi/{year}.html"
-        if cache.exists(cache_key) and year < current_year - 1:
-            html = cache.read(cache_key)
-        else:
-            url = f"https://dwd.wisconsin.gov/dislocatedworker/warn/default.htm?year={year}"
-            r = utils.get_url(url)
-            html = r.text
-            cache.write(cache_key, html)
+        url = f"https://dwd.wisconsin.gov/dislocatedworker/warn/default.htm?year={year}"
+        html = cache.get_or_fetch(cache_key, url, immutable=is_settled_year(year))
 
         # Add to the list
         html_list.append(html)
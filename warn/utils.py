@@ -1,13 +1,32 @@
+import asyncio
+import contextlib
+import contextvars
 import csv
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
+import random
+import sys
+import threading
+import time
 import typing
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from time import sleep
+from urllib.parse import urlsplit
 
+import pdfplumber
 import requests
 from openpyxl import load_workbook
-from retry import retry
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from requests.adapters import HTTPAdapter
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +43,651 @@ WARN_CACHE_DIR = WARN_OUTPUT_DIR / "cache"
 WARN_DATA_DIR = WARN_OUTPUT_DIR / "exports"
 WARN_LOG_DIR = WARN_OUTPUT_DIR / "logs"
 
+# The defaults for every HTTP request we make
+USER_AGENT = "Big Local News (biglocalnews.org)"
+REQUEST_TIMEOUT = (10, 60)  # Seconds to connect, seconds to wait for data
+POOL_MAXSIZE = 16  # Connections to keep open to a single host
+
+# The most requests a second to send a host, unless it has its own limit below
+DEFAULT_RATE_LIMIT = float(os.environ.get("WARN_RATE_LIMIT", 10))
+
+# Hosts that ask for a gentler pace, in requests a second
+HOST_RATE_LIMITS = {
+    "labor.hawaii.gov": 0.5,
+}
+
+# The longest a Retry-After header can make us wait, in seconds
+MAX_RETRY_AFTER = 300
+
+# The most times to try a request before giving up
+RETRY_ATTEMPTS = int(os.environ.get("WARN_RETRY_ATTEMPTS", 3))
+
+# The HTTP statuses worth trying again, since they usually signal passing trouble
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# How many failures in a row before we stop sending a host requests, and for how long
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 60
+
+# The most processes to parse a PDF's pages with, unless the WARN_PDF_WORKERS env var says otherwise
+PDF_WORKERS = os.cpu_count() or 1
+
+# The bytes of output to hold in memory before flushing a CSV to disk
+CSV_BUFFER_SIZE = 1024 * 1024
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a scraper runs out of the time it was given."""
+
+
+class Deadline:
+    """A point in time by which a scraper's work must be finished.
+
+    The time is kept on the wall clock, so a deadline set in one process
+    can be handed to a worker process and mean the same thing there.
+
+    Args:
+        expires_at (float): when the deadline passes, as a Unix timestamp
+        label (str): what the deadline is for, to name in errors
+    """
+
+    def __init__(self, expires_at: float, label: str = ""):
+        """Initialize a new instance."""
+        self.expires_at = expires_at
+        self.label = label
+
+    @classmethod
+    def after(cls, seconds: float, label: str = "") -> "Deadline":
+        """Create a deadline the provided number of seconds from now."""
+        return cls(time.time() + seconds, label)
+
+    def remaining(self) -> float:
+        """Get the seconds left before the deadline, or zero if it has passed."""
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        """Test whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise a DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            label = f" for {self.label}" if self.label else ""
+            raise DeadlineExceeded(f"Deadline{label} passed")
+
+
+_deadline: typing.Optional[Deadline] = None
+
+# Asyncio tasks scraping side by side in one process each keep their own deadline
+_task_deadline: contextvars.ContextVar = contextvars.ContextVar("deadline")
+
+
+@contextlib.contextmanager
+def deadline(value: typing.Optional[Deadline]):
+    """Hold the requests made in this process to a deadline.
+
+    Every thread shares it, since a scraper's threads all work toward the same end.
+    Inside an asyncio task, it holds for that task alone.
+    Passing None lifts any deadline for the duration.
+    """
+    global _deadline
+    if in_asyncio_task():
+        token = _task_deadline.set(value)
+        try:
+            yield value
+        finally:
+            _task_deadline.reset(token)
+        return
+    previous, _deadline = _deadline, value
+    try:
+        yield value
+    finally:
+        _deadline = previous
+
+
+def get_deadline() -> typing.Optional[Deadline]:
+    """Get the deadline this process, or this asyncio task, is working toward, if it has one."""
+    return _task_deadline.get(_deadline)
+
+
+def in_asyncio_task() -> bool:
+    """Test whether the code is running in an asyncio task."""
+    try:
+        return asyncio.current_task() is not None
+    except RuntimeError:
+        return False
+
+
+class RateLimiter:
+    """Paces the requests sent to each host with a token bucket.
+
+    Each host's bucket refills at its rate limit and holds up to a second's
+    worth of requests, or one request for hosts limited to less than one a second.
+    A host can also be paused, as when it answers with a Retry-After header.
+
+    Args:
+        default_rate (float): requests a second for hosts without their own limit.
+            Zero means no limit. (default: WARN_RATE_LIMIT env var, or 10)
+        host_rates (dict): requests a second for particular hosts
+            (default: HOST_RATE_LIMITS, updated by the WARN_HOST_RATE_LIMITS env var)
+    """
+
+    def __init__(
+        self,
+        default_rate: float = DEFAULT_RATE_LIMIT,
+        host_rates: typing.Optional[typing.Dict[str, float]] = None,
+    ):
+        """Initialize a new instance."""
+        self.default_rate = default_rate
+        if host_rates is None:
+            host_rates = dict(HOST_RATE_LIMITS)
+            host_rates.update(
+                _parse_host_rates(os.environ.get("WARN_HOST_RATE_LIMITS", ""))
+            )
+        self.host_rates = host_rates
+        self._buckets: typing.Dict[str, typing.Tuple[float, float]] = {}
+        self._paused_until: typing.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, host: str) -> float:
+        """Get the requests a second allowed to a host."""
+        return self.host_rates.get(host, self.default_rate)
+
+    def acquire(self, host: str):
+        """Wait until a request can be sent to a host."""
+        while True:
+            wait = self.try_acquire(host)
+            if wait <= 0:
+                return
+            logger.debug(f"Waiting {wait:.2f} seconds to request {host}")
+            time.sleep(wait)
+
+    def try_acquire(self, host: str) -> float:
+        """Take a turn to request a host, if one is ready.
+
+        Returns: zero if the turn was taken, or else the seconds to wait before trying again
+        """
+        with self._lock:
+            wait = self._take(host, time.monotonic())
+        current = get_deadline()
+        if wait > 0 and current is not None and wait >= current.remaining():
+            raise DeadlineExceeded(
+                f"Out of time waiting {wait:.0f} seconds to request {host}"
+            )
+        return wait
+
+    def pause(self, host: str, seconds: float):
+        """Hold off on any requests to a host for a number of seconds."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[host] = max(self._paused_until.get(host, 0), until)
+
+    def _take(self, host: str, now: float) -> float:
+        """Take a token from a host's bucket, or return how long until there is one."""
+        paused = self._paused_until.get(host, 0) - now
+        if paused > 0:
+            return paused
+        rate = self.rate(host)
+        if not rate:
+            return 0
+        capacity = max(1.0, rate)
+        tokens, updated = self._buckets.get(host, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            self._buckets[host] = (tokens - 1, now)
+            return 0
+        self._buckets[host] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+
+class RetryPolicy:
+    """Decides whether to try a failed request again, and how long to wait first.
+
+    Connection errors, timeouts and the statuses in RETRY_STATUSES are retried.
+    Other errors, like a 404 for a year that hasn't been posted yet, are not.
+    Waits grow exponentially with full jitter, so workers that failed together
+    don't retry together, and are never shorter than a host's Retry-After header.
+
+    Args:
+        attempts (int): the most times to try a request
+            (default: WARN_RETRY_ATTEMPTS env var, or 3)
+        base_delay (float): the most seconds to wait before the first retry,
+            doubled with each retry after it
+        max_delay (float): the most seconds to wait before any one retry
+        budget (float): the most seconds to spend waiting on the retries of one request
+    """
+
+    def __init__(
+        self,
+        attempts: int = RETRY_ATTEMPTS,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        budget: float = 60.0,
+    ):
+        """Initialize a new instance."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def is_retryable(
+        self,
+        response: typing.Optional[requests.Response] = None,
+        error: typing.Optional[Exception] = None,
+    ) -> bool:
+        """Test whether a response or error is worth another try."""
+        if error is not None:
+            if isinstance(error, (CircuitOpenError, requests.exceptions.SSLError)):
+                return False
+            return isinstance(
+                error,
+                (
+                    requests.ConnectionError,
+                    requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                ),
+            )
+        return response is not None and response.status_code in RETRY_STATUSES
+
+    def delay(self, attempt: int, retry_after: typing.Optional[float] = None) -> float:
+        """Get the seconds to wait before a retry.
+
+        Args:
+            attempt (int): the number of tries made so far
+            retry_after (float): the seconds the host asked us to wait, if it did
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+        return delay
+
+    def gives_up(self, attempt: int, waited: float, delay: float) -> bool:
+        """Test whether to stop trying a request rather than wait to retry it.
+
+        Args:
+            attempt (int): the number of tries made so far
+            waited (float): the seconds already spent waiting on retries
+            delay (float): the seconds to wait before the next retry
+        """
+        if attempt >= self.attempts or waited + delay > self.budget:
+            return True
+        # Don't sleep through the deadline only to give up after
+        current = get_deadline()
+        return current is not None and delay >= current.remaining()
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host that keeps failing.
+
+    After a number of failures in a row, the host's circuit opens and its
+    requests fail right away with a CircuitOpenError. Once the cooldown has
+    passed, one request is let through to test the host. If it succeeds the
+    circuit closes, and if it fails the circuit opens again.
+
+    Args:
+        threshold (int): the failures in a row that open the circuit
+        cooldown (float): the seconds to wait before testing the host again
+    """
+
+    def __init__(
+        self,
+        threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = CIRCUIT_BREAKER_COOLDOWN,
+    ):
+        """Initialize a new instance."""
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures: typing.Dict[str, int] = {}
+        self._open_until: typing.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def check(self, host: str):
+        """Raise a CircuitOpenError if requests to a host should not be sent."""
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return
+            now = time.monotonic()
+            if now < open_until:
+                raise CircuitOpenError(
+                    f"Not requesting {host} for {open_until - now:.0f} more seconds "
+                    f"after {self._failures[host]} failures in a row"
+                )
+            # Let this request through to test the host, and hold the rest
+            self._open_until[host] = now + self.cooldown
+
+    def record_success(self, host: str):
+        """Close a host's circuit."""
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+    def record_failure(self, host: str):
+        """Count a failure, opening the host's circuit if there have been too many."""
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.threshold:
+                if host not in self._open_until:
+                    logger.warning(f"{host} failed {failures} times in a row")
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+
+class BaseHTTPClient:
+    """The rules shared by the HTTP clients, whatever they send requests with.
+
+    Every request waits its turn with the rate limiter for its host, is retried
+    according to the retry policy and is refused while its host's circuit
+    breaker is open. Under a deadline, timeouts and waits are cut to the time
+    that's left, and a request that can't be made in time raises a DeadlineExceeded.
+    The requests made, the bytes received and the conditional requests answered
+    with 304 Not Modified are tallied.
+
+    Args:
+        timeout (tuple): the default connect and read timeouts, in seconds
+        limiter (RateLimiter): paces the requests to each host (default: a new RateLimiter)
+        retry_policy (RetryPolicy): when to retry failed requests (default: a new RetryPolicy)
+        breaker (CircuitBreaker): cuts off failing hosts (default: a new CircuitBreaker)
+    """
+
+    def __init__(
+        self,
+        timeout: typing.Tuple[float, float] = REQUEST_TIMEOUT,
+        limiter: typing.Optional[RateLimiter] = None,
+        retry_policy: typing.Optional[RetryPolicy] = None,
+        breaker: typing.Optional[CircuitBreaker] = None,
+    ):
+        """Initialize a new instance."""
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.request_count = 0
+        self.byte_count = 0
+        self.not_modified_count = 0
+        self._lock = threading.Lock()
+
+    def count_bytes(self, size: int):
+        """Add to the tally of bytes received."""
+        with self._lock:
+            self.byte_count += size
+
+    def _start_attempt(self, host: str):
+        """Check a host's circuit breaker and count an attempt to request it."""
+        self.breaker.check(host)
+        with self._lock:
+            self.request_count += 1
+
+    def _retry_after_error(
+        self, host: str, url: str, error: Exception, attempt: int, waited: float
+    ) -> float:
+        """Decide whether to retry a request that raised an error.
+
+        Returns: the seconds to wait before trying again. The error is raised
+            again if the request shouldn't be retried.
+        """
+        # A request cut short by the deadline means we're out of time
+        current = get_deadline()
+        if current is not None and current.expired():
+            current.check()
+        if not self.retry_policy.is_retryable(error=error):
+            raise error
+        self.breaker.record_failure(host)
+        delay = self.retry_policy.delay(attempt)
+        if self.retry_policy.gives_up(attempt, waited, delay):
+            raise error
+        logger.debug(f"{error!r} from {url}")
+        logger.debug(f"Retrying {url} in {delay:.1f} seconds")
+        return delay
+
+    def _retry_after_response(
+        self,
+        host: str,
+        url: str,
+        response: requests.Response,
+        attempt: int,
+        waited: float,
+    ) -> typing.Optional[float]:
+        """Decide whether to retry a request that got a response.
+
+        Returns: the seconds to wait before trying again, or None to keep the response
+        """
+        # If the host asks us to back off, hold its other requests until it's ready
+        retry_after = None
+        if response.status_code in (429, 503):
+            retry_after = _retry_after_seconds(response.headers.get("Retry-After", ""))
+        if retry_after is not None:
+            logger.debug(f"{host} asked us to wait {retry_after:.0f} seconds")
+            self.limiter.pause(host, min(retry_after, MAX_RETRY_AFTER))
+
+        # A host that's answering, even to say slow down, is alive
+        if response.status_code >= 500:
+            self.breaker.record_failure(host)
+        else:
+            self.breaker.record_success(host)
+
+        if not self.retry_policy.is_retryable(response=response):
+            return None
+        delay = self.retry_policy.delay(attempt, retry_after)
+        if self.retry_policy.gives_up(attempt, waited, delay):
+            return None
+        logger.debug(f"Response code {response.status_code} from {url}")
+        logger.debug(f"Retrying {url} in {delay:.1f} seconds")
+        return delay
+
+    def _finish(self, response: requests.Response):
+        """Tally a response that is being handed back."""
+        if response.status_code == 304:
+            with self._lock:
+                self.not_modified_count += 1
+
+
+class HTTPClient(BaseHTTPClient):
+    """A pooled HTTP client shared by all of the scrapers in a process.
+
+    Keeps a pool of keep-alive connections for each host and sets the default
+    user-agent and timeouts. Requests follow the rules of BaseHTTPClient.
+
+    Args:
+        user_agent (str): the default user-agent header (default: biglocalnews.org)
+        timeout (tuple): the default connect and read timeouts, in seconds
+        pool_maxsize (int): the most connections to keep open to a single host
+        limiter (RateLimiter): paces the requests to each host (default: a new RateLimiter)
+        retry_policy (RetryPolicy): when to retry failed requests (default: a new RetryPolicy)
+        breaker (CircuitBreaker): cuts off failing hosts (default: a new CircuitBreaker)
+    """
+
+    def __init__(
+        self,
+        user_agent: str = USER_AGENT,
+        timeout: typing.Tuple[float, float] = REQUEST_TIMEOUT,
+        pool_maxsize: int = POOL_MAXSIZE,
+        limiter: typing.Optional[RateLimiter] = None,
+        retry_policy: typing.Optional[RetryPolicy] = None,
+        breaker: typing.Optional[CircuitBreaker] = None,
+    ):
+        """Initialize a new instance."""
+        super().__init__(timeout, limiter, retry_policy, breaker)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        session: typing.Optional[requests.Session] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Make an HTTP request and return the response.
+
+        Args:
+            method (str): the HTTP method to use, like GET or POST
+            url (str): the url to be requested
+            session (Session): a session to send the request with, like one holding
+                a site's cookies. It follows the same rules. (default: the client's own)
+            **kwargs: Additional arguments to pass to requests
+        """
+        session = session or self.session
+        timeout = kwargs.pop("timeout", self.timeout)
+        host = urlsplit(url).hostname or ""
+        attempt, waited = 0, 0.0
+        while True:
+            attempt += 1
+            self._start_attempt(host)
+            self.limiter.acquire(host)
+            kwargs["timeout"] = timeout_before_deadline(timeout, url)
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.RequestException as error:
+                delay = self._retry_after_error(host, url, error, attempt, waited)
+            else:
+                retry_delay = self._retry_after_response(
+                    host, url, response, attempt, waited
+                )
+                if retry_delay is None:
+                    break
+                delay = retry_delay
+                response.close()
+
+            # Wait a bit and try again
+            time.sleep(delay)
+            waited += delay
+
+        self._finish(response)
+        # Streamed bodies are tallied by whoever reads them
+        if not kwargs.get("stream"):
+            self.count_bytes(len(response.content))
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Make a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Make a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """Make a HEAD request. Like requests.head, redirects aren't followed."""
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+
+def timeout_before_deadline(timeout, url: str):
+    """Shorten a request's timeouts so it can't run past the current deadline."""
+    current = get_deadline()
+    if current is None:
+        return timeout
+    remaining = current.remaining()
+    if remaining <= 0:
+        logger.debug(f"Out of time to request {url}")
+        current.check()
+    if timeout is None:
+        return (remaining, remaining)
+    if isinstance(timeout, tuple):
+        return tuple(min(t, remaining) if t is not None else remaining for t in timeout)
+    return min(timeout, remaining)
+
+
+def _retry_after_seconds(value: str) -> typing.Optional[float]:
+    """Convert a Retry-After header, in seconds or as a date, to seconds from now."""
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _parse_host_rates(text: str) -> typing.Dict[str, float]:
+    """Parse per-host rate limits written like "host=0.5,other.host=2"."""
+    rates = {}
+    for item in text.split(","):
+        if "=" in item:
+            host, rate = item.split("=", 1)
+            rates[host.strip().lower()] = float(rate)
+    return rates
+
+
+_http_client: typing.Optional[HTTPClient] = None
+_http_client_pid: typing.Optional[int] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Get the HTTP client shared by this process, creating it if need be.
+
+    A forked worker process gets a fresh client rather than sharing sockets with its parent.
+    """
+    global _http_client, _http_client_pid
+    with _http_client_lock:
+        if _http_client is None or _http_client_pid != os.getpid():
+            _http_client = HTTPClient()
+            _http_client_pid = os.getpid()
+        return _http_client
+
+
+@contextlib.contextmanager
+def atomic_open(path: Path, mode: str, **kwargs):
+    """Open a temporary file that replaces the provided path once it is closed.
+
+    If anything goes wrong before then, the temporary file is removed and the
+    path is left as it was.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, mode, **kwargs) as fh:
+            yield fh
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+@contextlib.contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive lock on the provided file, waiting for it if need be.
+
+    The lock is shared with other threads and processes, including ones in other
+    runs using the same directory. The lock file is created if it doesn't exist.
+
+    Args:
+        path (Path): the lock file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if sys.platform == "win32":
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ten seconds, so keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
 
 def create_directory(path: Path, is_file: bool = False):
     """Create the filesystem directories for the provided Path objects.
@@ -60,13 +724,12 @@ def fetch_if_not_cached(filename, url, **kwargs):
     create_directory(Path(filename), is_file=True)
     if not os.path.exists(filename):
         logger.debug(f"Fetching {filename} from {url}")
-        response = requests.get(url, **kwargs)
+        response = get_http_client().get(url, **kwargs)
         if not response.ok:
             logger.error(f"Failed to fetch {url} to {filename}")
         else:
-            with open(filename, "wb") as outfile:
+            with atomic_open(Path(filename), "wb") as outfile:
                 outfile.write(response.content)
-        sleep(2)  # Pause between requests
     return
 
 
@@ -79,49 +742,96 @@ def save_if_good_url(filename, url, **kwargs):
     Notes: Should this even be in utils vs. cache? Should it exist?
     """
     create_directory(Path(filename), is_file=True)
-    response = requests.get(url, **kwargs)
+    response = get_http_client().get(url, **kwargs)
     if not response.ok:
         logger.error(f"URL {url} fetch failed with {response.status_code}")
         logger.error(f"Not saving to {filename}. Is a new year's URL not started?")
         success_flag = False
         content = False
     else:
-        with open(filename, "wb") as outfile:
+        with atomic_open(Path(filename), "wb") as outfile:
             outfile.write(response.content)
-            success_flag = True
-            content = response.content
-    sleep(2)  # Pause between requests
+        success_flag = True
+        content = response.content
     return success_flag, content
 
 
-def write_rows_to_csv(output_path: Path, rows: list, mode="w"):
-    """Write the provided list to the provided path as comma-separated values.
+def export_is_current(data_path: Path, source_path: Path, parser_version: str) -> bool:
+    """Test whether an export was made from the current copy of its source by the current parser.
+
+    The parser version is read from the stamp that stamp_export saves beside
+    the export once it's written, so a run that died in between, or a parser
+    that has changed since, means the export has to be made again.
 
     Args:
-        rows (list): the list to be saved
+        data_path (Path): the export
+        source_path (Path): the downloaded file the export is made from
+        parser_version (str): the version of the scraper's parsing
+    """
+    stamp_path = _export_stamp_path(data_path)
+    if not Path(data_path).exists() or not stamp_path.exists():
+        return False
+    if stamp_path.read_text(encoding="utf-8") != parser_version:
+        return False
+    return stamp_path.stat().st_mtime > Path(source_path).stat().st_mtime
+
+
+def stamp_export(data_path: Path, parser_version: str):
+    """Note the parser version an export was just made with. See export_is_current."""
+    with atomic_open(_export_stamp_path(data_path), "w", encoding="utf-8") as fh:
+        fh.write(parser_version)
+
+
+def _export_stamp_path(data_path: Path) -> Path:
+    """Get the path of the hidden file beside an export that notes its parser version."""
+    data_path = Path(data_path)
+    return data_path.with_name(f".{data_path.name}.version")
+
+
+def write_rows_to_csv(output_path: Path, rows: typing.Iterable, mode="w") -> int:
+    """Write the provided rows to the provided path as comma-separated values.
+
+    Rows are written as they are consumed, so ``rows`` can be a generator.
+
+    Args:
+        rows (Iterable): the rows to be saved
         output_path (Path): the Path were the result will be saved
         mode (str): the mode to be used when opening the file (default 'w')
+
+    Returns: the number of rows written
     """
     create_directory(output_path, is_file=True)
-    logger.debug(f"Writing {len(rows)} rows to {output_path}")
-    with open(output_path, mode, newline="") as f:
+    logger.debug(f"Writing rows to {output_path}")
+    row_count = 0
+    with _open_csv(output_path, mode) as f:
         writer = csv.writer(f)
-        writer.writerows(rows)
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    logger.debug(f"Wrote {row_count} rows to {output_path}")
+    return row_count
+
 
+def write_dict_rows_to_csv(
+    output_path, headers, rows: typing.Iterable, mode="w", extrasaction="raise"
+) -> int:
+    """Write the provided dictionaries to the provided path as comma-separated values.
 
-def write_dict_rows_to_csv(output_path, headers, rows, mode="w", extrasaction="raise"):
-    """Write the provided dictionary to the provided path as comma-separated values.
+    Rows are written as they are consumed, so ``rows`` can be a generator.
 
     Args:
         output_path (Path): the Path were the result will be saved
         headers (list): a list of the headers for the output file
-        rows (list): the dict to be saved
+        rows (Iterable): the dicts to be saved
         mode (str): the mode to be used when opening the file (default 'w')
         extrasaction (str): what to do if the if a field isn't in the headers (default 'raise')
+
+    Returns: the number of rows written
     """
     create_directory(output_path, is_file=True)
-    logger.debug(f"Writing {len(rows)} rows to {output_path}")
-    with open(output_path, mode, newline="") as f:
+    logger.debug(f"Writing rows to {output_path}")
+    row_count = 0
+    with _open_csv(output_path, mode) as f:
         # Create the writer object
         writer = csv.DictWriter(f, fieldnames=headers, extrasaction=extrasaction)
         # If we are writing a new row ...
@@ -131,6 +841,22 @@ def write_dict_rows_to_csv(output_path, headers, rows, mode="w", extrasaction="r
         # Loop through the dicts and write them in one by one.
         for row in rows:
             writer.writerow(row)
+            row_count += 1
+    logger.debug(f"Wrote {row_count} rows to {output_path}")
+    return row_count
+
+
+def _open_csv(output_path, mode):
+    """Open a CSV file for writing through a large buffer.
+
+    A new file is written to the side and only replaces the old one once it's
+    finished, so rows that fail partway through leave the last good copy alone.
+    Appending adds to the file as it is.
+    """
+    kwargs = dict(newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE)
+    if mode == "a":
+        return open(output_path, mode, **kwargs)
+    return atomic_open(Path(output_path), mode, **kwargs)
 
 
 def get_all_scrapers():
@@ -145,16 +871,16 @@ def get_all_scrapers():
     )
 
 
-@retry(tries=3, delay=15, backoff=2)
-def get_url(
-    url, user_agent="Big Local News (biglocalnews.org)", session=None, **kwargs
-):
+def get_url(url, user_agent=USER_AGENT, session=None, **kwargs):
     """Request the provided URL and return a response object.
 
+    The request goes through the shared HTTP client, which paces and retries
+    requests to each host. Errors that remain raise a requests.HTTPError.
+
     Args:
         url (str): the url to be requested
         user_agent (str): the user-agent header passed with the request (default: biglocalnews.org)
-        session: a session object to use when making the request. optional
+        session: a session object to send the request with, under the same rules. optional
     """
     logger.debug(f"Requesting {url}")
 
@@ -166,13 +892,11 @@ def get_url(
     # Go get it
     if session is not None:
         logger.debug(f"Requesting with session {session}")
-        response = session.get(url, **kwargs)
-    else:
-        response = requests.get(url, **kwargs)
+    response = get_http_client().get(url, session=session, **kwargs)
     logger.debug(f"Response code: {response.status_code}")
 
     # Verify that the response is 200
-    assert response.ok
+    response.raise_for_status()
 
     # Return the response
     return response
@@ -187,31 +911,312 @@ def parse_excel(excel_path: Path, keep_header: bool = True) -> typing.List[typin
 
     Returns: List of values ready to write.
     """
-    # Open it up
-    workbook = load_workbook(filename=excel_path)
+    rows = iter_excel_rows(excel_path, skip_rows=0 if keep_header else 1)
+    return list(rows)
 
-    # Get the first sheet
-    worksheet = workbook.worksheets[0]
 
-    # Convert the sheet to a list of lists
-    row_list = []
-    for i, r in enumerate(worksheet.rows):
-        # Skip the header row, if that's what the user wants
-        if i == 0 and not keep_header:
-            continue
+def iter_excel_rows(
+    excel_path: typing.Union[str, Path],
+    sheet: typing.Union[int, str, None] = 0,
+    skip_empty: bool = True,
+    skip_rows: int = 0,
+) -> typing.Iterator[typing.List]:
+    """Stream the rows of an Excel file as lists of values.
 
-        # Parse cells
-        cell_list = [cell.value for cell in r]
+    The workbook is opened in openpyxl's read-only mode, so rows are read from
+    the file one at a time rather than loading every cell into memory first.
 
-        # Skip empty rows
-        try:
-            # A list with only empty cells will throw an error
-            next(c for c in cell_list if c)
-        except StopIteration:
-            continue
+    Args:
+        excel_path (Path): The path to an XLSX file
+        sheet (int or str): The index or name of the worksheet to read.
+            Pass None to read every worksheet, one after another. Default 0.
+        skip_empty (bool): Whether to skip rows without any values. Default True.
+        skip_rows (int): How many rows to skip at the top of each worksheet,
+            before any empty rows are skipped. Default 0.
+
+    Yields: A list of cell values for each row, padded with None to the sheet's width
+    """
+    workbook = load_workbook(filename=excel_path, read_only=True)
+    try:
+        if sheet is None:
+            worksheets = workbook.worksheets
+        elif isinstance(sheet, str):
+            worksheets = [workbook[sheet]]
+        else:
+            worksheets = [workbook.worksheets[sheet]]
+
+        for worksheet in worksheets:
+            # Some files record their size wrong, which would cut rows short
+            if worksheet.max_row == worksheet.max_column == 1:
+                worksheet.reset_dimensions()
+
+            # Without a known size, rows stop at their last value, so pad them
+            # out to the widest row so far, which is usually the header
+            width = worksheet.max_column or 0
+            for i, row in enumerate(worksheet.iter_rows(values_only=True)):
+                cell_list = list(row)
+                width = max(width, len(cell_list))
+                cell_list.extend([None] * (width - len(cell_list)))
+
+                if i < skip_rows:
+                    continue
+
+                # Skip empty rows
+                if skip_empty and not any(cell_list):
+                    continue
+
+                yield cell_list
+    finally:
+        workbook.close()
+
+
+def excel_sheet_names(excel_path: Path) -> typing.List[str]:
+    """Get the names of the worksheets in an Excel file.
+
+    Args:
+        excel_path (Path): The path to an XLSX file
+
+    Returns: List of worksheet names, in order
+    """
+    workbook = load_workbook(filename=excel_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def skip_to_header(
+    rows: typing.Iterator[typing.List], is_header: typing.Callable
+) -> typing.List:
+    """Throw away rows until reaching the header.
+
+    The rows after the header are left in the iterator.
+
+    Args:
+        rows (iterator): Rows, like those from iter_excel_rows
+        is_header (callable): A function that returns True for the header row
+
+    Returns: The header row
+    """
+    for row in rows:
+        if is_header(row):
+            return row
+    raise ValueError("No header row found")
+
+
+def parse_pdf_pages(
+    pdf_path: Path,
+    parse_page: typing.Callable,
+    stitch: typing.Optional[typing.Callable] = None,
+    workers: typing.Optional[int] = None,
+    cache_dir: typing.Optional[Path] = None,
+    parser_version: str = "1",
+) -> list:
+    """Parse every page of a PDF, spreading the pages across a pool of processes.
+
+    Each worker opens the PDF on its own and parses a run of pages. Results are
+    then handed to stitch one page at a time, in page order, in this process,
+    so rows that spill across a page break can be put back together.
+
+    If a cache_dir is provided, the page results are saved there as JSON, along
+    with a hash of the file's contents and a fingerprint of each page, for each
+    PDF, page function and parser version. Parsing a file that hasn't changed
+    just loads them back up. When it has changed, as with a PDF that grows
+    through the year, only the pages that are new or different are parsed again.
+
+    Args:
+        pdf_path (Path): The path to a PDF file
+        parse_page (callable): A module-level function that takes a pdfplumber page
+            and its index and returns something that can be pickled, like rows of text
+        stitch (callable): A function that takes the rows so far, a page's result
+            and its index, and returns the rows so far. Defaults to adding the
+            page's rows to the end.
+        workers (int): The most processes to use. Defaults to get_pdf_workers().
+        cache_dir (Path): Where to cache page results. Optional. Results must
+            survive a round trip through JSON to be cached.
+        parser_version (str): Change this when the page function's output changes,
+            so results cached by older versions are left alone. Default "1".
+
+    Returns: The stitched rows
+    """
+    stitch = stitch or _append_page_rows
+    if cache_dir is None:
+        return _stitch_pages(_parse_pdf_pages(pdf_path, parse_page, workers), stitch)
+
+    # Load up the results from an earlier parse, if we have them
+    cache_path = _parsed_pdf_cache_path(pdf_path, parse_page, parser_version, cache_dir)
+    cached = _read_parsed_pdf(cache_path)
+    file_digest = _file_digest(pdf_path)
+    if cached.get("file") == file_digest:
+        logger.debug(f"Reading parsed pages of {pdf_path} from {cache_path}")
+        return _stitch_pages(cached["results"], stitch)
+
+    # Otherwise only parse the pages that are new or have changed
+    fingerprints = _pdf_page_fingerprints(pdf_path)
+    old_fingerprints = cached.get("fingerprints", [])
+    old_results = cached.get("results", [])
+    todo = [
+        i
+        for i, fingerprint in enumerate(fingerprints)
+        if i >= len(old_fingerprints) or old_fingerprints[i] != fingerprint
+    ]
+    logger.debug(
+        f"Reusing {len(fingerprints) - len(todo)} of {len(fingerprints)} "
+        f"parsed pages of {pdf_path}"
+    )
+    fresh = dict(zip(todo, _parse_pdf_pages(pdf_path, parse_page, workers, todo)))
+    page_results = [
+        fresh[i] if i in fresh else old_results[i] for i in range(len(fingerprints))
+    ]
+
+    # Save them for next time
+    logger.debug(f"Writing parsed pages of {pdf_path} to {cache_path}")
+    content = json.dumps(
+        {"file": file_digest, "fingerprints": fingerprints, "results": page_results}
+    )
+    create_directory(cache_path, is_file=True)
+    with atomic_open(cache_path, "w", encoding="utf-8") as fh:
+        fh.write(content)
+
+    # Stitch what a later run will load, so every run gets the same rows
+    return _stitch_pages(json.loads(content)["results"], stitch)
+
+
+def get_pdf_workers() -> int:
+    """Get the most processes to parse a PDF's pages with.
+
+    The WARN_PDF_WORKERS env var is read each time, so a runner that scrapes
+    several states at once can give each of its worker processes a share.
+    """
+    return int(os.environ.get("WARN_PDF_WORKERS") or PDF_WORKERS)
+
+
+def _parse_pdf_pages(
+    pdf_path: Path,
+    parse_page: typing.Callable,
+    workers: typing.Optional[int] = None,
+    page_indexes: typing.Optional[typing.List[int]] = None,
+) -> list:
+    """Parse the pages of a PDF, all of them by default, and return the results in order."""
+    if page_indexes is None:
+        with pdfplumber.open(pdf_path) as pdf:
+            page_indexes = list(range(len(pdf.pages)))
+    if not page_indexes:
+        return []
+    workers = min(workers or get_pdf_workers(), len(page_indexes))
+
+    # Parse in this process when there's nothing to gain,
+    # or when it's a daemon, which can't start processes of its own
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        return _parse_pdf_page_range(pdf_path, parse_page, page_indexes)
+
+    logger.debug(
+        f"Parsing {len(page_indexes)} pages of {pdf_path} in {workers} processes"
+    )
+    # A few runs of pages per worker, so one slow run doesn't hold up the rest
+    size = -(-len(page_indexes) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _parse_pdf_page_range,
+                pdf_path,
+                parse_page,
+                page_indexes[start : start + size],
+            )
+            for start in range(0, len(page_indexes), size)
+        ]
+        return [result for future in futures for result in future.result()]
+
+
+def _parsed_pdf_cache_path(
+    pdf_path: Path, parse_page: typing.Callable, parser_version: str, cache_dir: Path
+) -> Path:
+    """Get the path where the parsed pages of a PDF are cached."""
+    path_digest = hashlib.sha256(str(Path(pdf_path).resolve()).encode()).hexdigest()
+    parser = f"{parse_page.__module__}.{parse_page.__qualname__}"
+    file_name = f"{Path(pdf_path).stem}-{path_digest[:12]}-{parser}-v{parser_version}"
+    return Path(cache_dir) / "parsed_pdfs" / f"{file_name}.json"
+
+
+def _read_parsed_pdf(cache_path: Path) -> dict:
+    """Read the cached parse of a PDF, if there is a good one."""
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except ValueError:
+        logger.warning(f"Ignoring unreadable {cache_path}")
+        return {}
+
+
+def _file_digest(path: Path) -> str:
+    """Hash the contents of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _pdf_page_fingerprints(pdf_path: Path) -> typing.List[str]:
+    """Fingerprint each page of a PDF by its size, the content streams drawing it and its resources."""
+    fingerprints = []
+    # Fonts and forms are often shared by every page, so each is hashed once
+    memo: typing.Dict[int, str] = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            digest = hashlib.sha256(
+                repr((page.page_obj.mediabox, page.rotation)).encode()
+            )
+            for stream in page.page_obj.contents:
+                digest.update(resolve1(stream).get_data())
+            digest.update(_pdf_object_digest(page.page_obj.resources, memo).encode())
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def _pdf_object_digest(obj: typing.Any, memo: typing.Dict[int, str]) -> str:
+    """Hash a PDF object along with everything it refers to, like the fonts and forms of a page."""
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in memo:
+            # Mark the object first, so one that refers back to itself ends
+            memo[obj.objid] = ""
+            memo[obj.objid] = _pdf_object_digest(obj.resolve(), memo)
+        return memo[obj.objid]
+    digest = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        digest.update(_pdf_object_digest(obj.attrs, memo).encode())
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            digest.update(repr(key).encode())
+            digest.update(_pdf_object_digest(obj[key], memo).encode())
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            digest.update(_pdf_object_digest(item, memo).encode())
+    else:
+        digest.update(repr(obj).encode())
+    return digest.hexdigest()
+
+
+def _parse_pdf_page_range(
+    pdf_path: Path, parse_page: typing.Callable, page_indexes: typing.List[int]
+) -> list:
+    """Parse a run of pages from a PDF."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [parse_page(pdf.pages[i], i) for i in page_indexes]
+
+
+def _stitch_pages(pages: typing.Iterable, stitch: typing.Callable) -> list:
+    """Fold the results for each page, in order, into a list of rows."""
+    rows: list = []
+    for page_index, page_result in enumerate(pages):
+        rows = stitch(rows, page_result, page_index)
+    return rows
 
-        # Add to the master list
-        row_list.append(cell_list)
 
-    # Pass it back
-    return row_list
+def _append_page_rows(rows: list, page_rows: list, page_index: int) -> list:
+    """Add a page's rows to the end of the rows so far."""
+    rows.extend(page_rows)
+    return rows